@@ -99,5 +99,15 @@ def dev(
     )
 
 
+@app.command()
+def reindex_chats():
+    """Rebuild the chat search index, e.g. for chats saved while it was off"""
+    import open_webui.config  # runs the migrations creating the index
+    from open_webui.models.chats import Chats
+
+    count = Chats.reindex_chats()
+    typer.echo(f"Indexed {count} chats")
+
+
 if __name__ == "__main__":
     app()
@@ -3,6 +3,9 @@ import logging
 import os
 import shutil
 import base64
+import threading
+import time
+import uuid
 import redis
 
 from datetime import datetime
@@ -21,6 +24,7 @@ from open_webui.env import (
     REDIS_URL,
     REDIS_SENTINEL_HOSTS,
     REDIS_SENTINEL_PORT,
+    REDIS_CONFIG_REFRESH_INTERVAL,
     FRONTEND_BUILD_DIR,
     OFFLINE_MODE,
     OPEN_WEBUI_DIR,
@@ -209,53 +213,146 @@ class PersistentConfig(Generic[T]):
 
 
 class AppConfig:
+    """
+    The app's config values, shared between replicas through Redis.
+
+    Reads are served from the local values. A write stores the value in
+    Redis, bumps the config version and publishes the change, which the
+    other replicas apply as it arrives. While that subscription is down,
+    reads compare the version with Redis at most every
+    REDIS_CONFIG_REFRESH_INTERVAL seconds and reload all values on change.
+    """
+
     _state: dict[str, PersistentConfig]
     _redis: Optional[redis.Redis] = None
 
+    _REDIS_KEY_PREFIX = "open-webui:config:"
+    _REDIS_VERSION_KEY = "open-webui:config-version"
+    _REDIS_CHANNEL = "open-webui:config-updates"
+
     def __init__(
         self, redis_url: Optional[str] = None, redis_sentinels: Optional[list] = []
     ):
         super().__setattr__("_state", {})
+        # version of the last change applied per key
+        super().__setattr__("_versions", {})
+        # config version the local values are in sync with, None if unknown
+        super().__setattr__("_version", None)
+        super().__setattr__("_checked_at", 0.0)
+        super().__setattr__("_listening", False)
+        super().__setattr__("_id", str(uuid.uuid4()))
         if redis_url:
             super().__setattr__(
                 "_redis",
                 get_redis_connection(redis_url, redis_sentinels, decode_responses=True),
             )
+            threading.Thread(
+                target=self._listen, name="app-config", daemon=True
+            ).start()
 
     def __setattr__(self, key, value):
         if isinstance(value, PersistentConfig):
             self._state[key] = value
+            # Pick up its value from Redis on the next read
+            super().__setattr__("_version", None)
         else:
             self._state[key].value = value
             self._state[key].save()
 
             if self._redis:
-                redis_key = f"open-webui:config:{key}"
-                self._redis.set(redis_key, json.dumps(self._state[key].value))
+                serialized_value = json.dumps(self._state[key].value)
+                pipe = self._redis.pipeline()
+                pipe.set(f"{self._REDIS_KEY_PREFIX}{key}", serialized_value)
+                pipe.incr(self._REDIS_VERSION_KEY)
+                version = pipe.execute()[1]
+                self._versions[key] = version
+
+                self._redis.publish(
+                    self._REDIS_CHANNEL,
+                    json.dumps(
+                        {
+                            "origin": self._id,
+                            "key": key,
+                            "value": serialized_value,
+                            "version": version,
+                        }
+                    ),
+                )
 
     def __getattr__(self, key):
         if key not in self._state:
             raise AttributeError(f"Config key '{key}' not found")
 
-        # If Redis is available, check for an updated value
+        # If Redis is available, check for updated values
         if self._redis:
-            redis_key = f"open-webui:config:{key}"
-            redis_value = self._redis.get(redis_key)
-
-            if redis_value is not None:
-                try:
-                    decoded_value = json.loads(redis_value)
-
-                    # Update the in-memory value if different
-                    if self._state[key].value != decoded_value:
-                        self._state[key].value = decoded_value
-                        log.info(f"Updated {key} from Redis: {decoded_value}")
-
-                except json.JSONDecodeError:
-                    log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
+            self._sync()
 
         return self._state[key].value
 
+    def _set_value(self, key, redis_value):
+        try:
+            decoded_value = json.loads(redis_value)
+
+            # Update the in-memory value if different
+            if self._state[key].value != decoded_value:
+                self._state[key].value = decoded_value
+                log.info(f"Updated {key} from Redis: {decoded_value}")
+
+        except json.JSONDecodeError:
+            log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
+
+    def _sync(self):
+        """Reload all values from Redis if they may be outdated"""
+        if self._version is not None:
+            if self._listening:
+                return
+            if time.monotonic() - self._checked_at < REDIS_CONFIG_REFRESH_INTERVAL:
+                return
+
+        super().__setattr__("_checked_at", time.monotonic())
+        version = self._redis.get(self._REDIS_VERSION_KEY) or ""
+        if version == self._version:
+            return
+
+        keys = list(self._state)
+        redis_values = self._redis.mget(
+            [f"{self._REDIS_KEY_PREFIX}{key}" for key in keys]
+        )
+        for key, redis_value in zip(keys, redis_values):
+            if redis_value is not None:
+                self._set_value(key, redis_value)
+        super().__setattr__("_version", version)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                pubsub.subscribe(self._REDIS_CHANNEL)
+                for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        # Changes may have been missed until now
+                        super().__setattr__("_version", None)
+                        super().__setattr__("_listening", True)
+                    elif message["type"] == "message":
+                        self._apply_update(json.loads(message["data"]))
+            except Exception as e:
+                log.warning(f"Lost config update notifications: {e}")
+
+            super().__setattr__("_listening", False)
+            time.sleep(1)
+
+    def _apply_update(self, update: dict):
+        key = update.get("key")
+        if update.get("origin") == self._id or key not in self._state:
+            return
+
+        # Updates can arrive out of order, keep the latest write of a key
+        version = update.get("version", 0)
+        if version < self._versions.get(key, 0):
+            return
+        self._versions[key] = version
+        self._set_value(key, update["value"])
+
 
 ####################################
 # WEBUI_AUTH (Required for security)
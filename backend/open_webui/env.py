@@ -318,6 +318,44 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+# Send streamed content that only grew as "chat:message:delta" events with
+# the appended text instead of the full content on every token
+ENABLE_CHAT_MESSAGE_DELTA_EVENTS = (
+    os.environ.get("ENABLE_CHAT_MESSAGE_DELTA_EVENTS", "True").lower() == "true"
+)
+
+# The full content is still sent at least this often (seconds), so clients
+# that missed part of it, e.g. opened mid-stream, catch up
+CHAT_MESSAGE_DELTA_SNAPSHOT_INTERVAL = os.environ.get(
+    "CHAT_MESSAGE_DELTA_SNAPSHOT_INTERVAL", "2"
+)
+try:
+    CHAT_MESSAGE_DELTA_SNAPSHOT_INTERVAL = float(CHAT_MESSAGE_DELTA_SNAPSHOT_INTERVAL)
+except ValueError:
+    CHAT_MESSAGE_DELTA_SNAPSHOT_INTERVAL = 2.0
+
+# Streamed message updates are buffered in memory and written to the
+# database at most this often (seconds) ...
+CHAT_MESSAGE_FLUSH_INTERVAL = os.environ.get("CHAT_MESSAGE_FLUSH_INTERVAL", "2")
+try:
+    CHAT_MESSAGE_FLUSH_INTERVAL = max(float(CHAT_MESSAGE_FLUSH_INTERVAL), 0.0)
+except ValueError:
+    CHAT_MESSAGE_FLUSH_INTERVAL = 2.0
+
+# ... or as soon as this many characters changed since the last write
+CHAT_MESSAGE_FLUSH_MAX_SIZE = os.environ.get("CHAT_MESSAGE_FLUSH_MAX_SIZE", "65536")
+try:
+    CHAT_MESSAGE_FLUSH_MAX_SIZE = int(CHAT_MESSAGE_FLUSH_MAX_SIZE)
+except ValueError:
+    CHAT_MESSAGE_FLUSH_MAX_SIZE = 65536
+
+# Search chats through the full-text index kept in the chat_search table
+# instead of scanning the chat JSON. Run `open-webui reindex-chats` after
+# turning it back on, the index is not kept up to date while it is off.
+ENABLE_CHAT_SEARCH_INDEX = (
+    os.environ.get("ENABLE_CHAT_SEARCH_INDEX", "True").lower() == "true"
+)
+
 ####################################
 # REDIS
 ####################################
@@ -326,6 +364,14 @@ REDIS_URL = os.environ.get("REDIS_URL", "")
 REDIS_SENTINEL_HOSTS = os.environ.get("REDIS_SENTINEL_HOSTS", "")
 REDIS_SENTINEL_PORT = os.environ.get("REDIS_SENTINEL_PORT", "26379")
 
+# Seconds config values read from Redis may lag behind other replicas while
+# their update notifications can't be received
+REDIS_CONFIG_REFRESH_INTERVAL = os.environ.get("REDIS_CONFIG_REFRESH_INTERVAL", "5")
+try:
+    REDIS_CONFIG_REFRESH_INTERVAL = max(float(REDIS_CONFIG_REFRESH_INTERVAL), 0.0)
+except ValueError:
+    REDIS_CONFIG_REFRESH_INTERVAL = 5.0
+
 ####################################
 # UVICORN WORKERS
 ####################################
@@ -358,6 +404,31 @@ WEBUI_AUTH_SIGNOUT_REDIRECT_URL = os.environ.get(
     "WEBUI_AUTH_SIGNOUT_REDIRECT_URL", None
 )
 
+# Seconds an authenticated user is reused without reading it from the
+# database again, changes to the user drop it right away (0 to disable)
+USER_CACHE_TTL = os.environ.get("USER_CACHE_TTL", "30")
+try:
+    USER_CACHE_TTL = max(float(USER_CACHE_TTL), 0.0)
+except ValueError:
+    USER_CACHE_TTL = 30.0
+
+# Seconds the groups of a user and the permissions derived from them are
+# reused, any change to a group drops them right away (0 to disable)
+GROUP_CACHE_TTL = os.environ.get("GROUP_CACHE_TTL", "30")
+try:
+    GROUP_CACHE_TTL = max(float(GROUP_CACHE_TTL), 0.0)
+except ValueError:
+    GROUP_CACHE_TTL = 30.0
+
+# Seconds between writes of a user's last active time
+USER_LAST_ACTIVE_UPDATE_INTERVAL = os.environ.get(
+    "USER_LAST_ACTIVE_UPDATE_INTERVAL", "60"
+)
+try:
+    USER_LAST_ACTIVE_UPDATE_INTERVAL = max(float(USER_LAST_ACTIVE_UPDATE_INTERVAL), 0.0)
+except ValueError:
+    USER_LAST_ACTIVE_UPDATE_INTERVAL = 60.0
+
 ####################################
 # WEBUI_SECRET_KEY
 ####################################
@@ -451,6 +522,99 @@ AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL = (
     os.environ.get("AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL", "True").lower() == "true"
 )
 
+####################################
+# EMBEDDING CLIENT
+####################################
+
+# Batches sent to the Ollama/OpenAI embedding API at the same time
+RAG_EMBEDDING_CONCURRENT_REQUESTS = os.environ.get(
+    "RAG_EMBEDDING_CONCURRENT_REQUESTS", "4"
+)
+try:
+    RAG_EMBEDDING_CONCURRENT_REQUESTS = max(int(RAG_EMBEDDING_CONCURRENT_REQUESTS), 1)
+except ValueError:
+    RAG_EMBEDDING_CONCURRENT_REQUESTS = 4
+
+# Retries of a batch on rate limits (429), server errors (5xx) and
+# connection errors, with exponential backoff
+RAG_EMBEDDING_MAX_RETRIES = os.environ.get("RAG_EMBEDDING_MAX_RETRIES", "3")
+try:
+    RAG_EMBEDDING_MAX_RETRIES = max(int(RAG_EMBEDDING_MAX_RETRIES), 0)
+except ValueError:
+    RAG_EMBEDDING_MAX_RETRIES = 3
+
+# Embeddings of queries kept in memory, by engine, model, prefix and text
+# (0 to disable), and for how many seconds
+RAG_EMBEDDING_CACHE_SIZE = os.environ.get("RAG_EMBEDDING_CACHE_SIZE", "1000")
+try:
+    RAG_EMBEDDING_CACHE_SIZE = max(int(RAG_EMBEDDING_CACHE_SIZE), 0)
+except ValueError:
+    RAG_EMBEDDING_CACHE_SIZE = 1000
+
+RAG_EMBEDDING_CACHE_TTL = os.environ.get("RAG_EMBEDDING_CACHE_TTL", "86400")
+try:
+    RAG_EMBEDDING_CACHE_TTL = max(int(RAG_EMBEDDING_CACHE_TTL), 1)
+except ValueError:
+    RAG_EMBEDDING_CACHE_TTL = 86400
+
+# Also share cached embeddings between instances through REDIS_URL
+RAG_EMBEDDING_CACHE_REDIS = (
+    os.environ.get("RAG_EMBEDDING_CACHE_REDIS", "False").lower() == "true"
+)
+
+####################################
+# EMBEDDING STORE
+####################################
+
+# Keep the embeddings of ingested chunks on disk by content hash, so that
+# chunks seen before are not embedded again
+ENABLE_EMBEDDING_STORE = (
+    os.environ.get("ENABLE_EMBEDDING_STORE", "True").lower() == "true"
+)
+EMBEDDING_STORE_DIR = Path(
+    os.environ.get("EMBEDDING_STORE_DIR", DATA_DIR / "embedding_store")
+).resolve()
+
+# In bytes, least recently used embeddings are evicted above it
+EMBEDDING_STORE_MAX_SIZE = os.environ.get(
+    "EMBEDDING_STORE_MAX_SIZE", str(1024 * 1024 * 1024)
+)
+try:
+    EMBEDDING_STORE_MAX_SIZE = int(EMBEDDING_STORE_MAX_SIZE)
+except ValueError:
+    EMBEDDING_STORE_MAX_SIZE = 1024 * 1024 * 1024
+
+####################################
+# BM25 INDEX
+####################################
+
+# Keep a BM25 index of each collection on disk for hybrid search instead
+# of loading every chunk of the collection on each query. With several
+# replicas, set REDIS_URL so that a replica drops its index of a collection
+# changed by a replica with another BM25_INDEX_DIR
+ENABLE_BM25_INDEX = os.environ.get("ENABLE_BM25_INDEX", "True").lower() == "true"
+BM25_INDEX_DIR = Path(
+    os.environ.get("BM25_INDEX_DIR", DATA_DIR / "bm25_index")
+).resolve()
+
+####################################
+# RERANKING
+####################################
+
+# (query, chunk) pairs scored by a cross-encoder per batch
+RAG_RERANKING_BATCH_SIZE = os.environ.get("RAG_RERANKING_BATCH_SIZE", "32")
+try:
+    RAG_RERANKING_BATCH_SIZE = max(int(RAG_RERANKING_BATCH_SIZE), 1)
+except ValueError:
+    RAG_RERANKING_BATCH_SIZE = 32
+
+# Reranking scores kept for reuse (0 to disable)
+RAG_RERANKING_CACHE_SIZE = os.environ.get("RAG_RERANKING_CACHE_SIZE", "10000")
+try:
+    RAG_RERANKING_CACHE_SIZE = max(int(RAG_RERANKING_CACHE_SIZE), 0)
+except ValueError:
+    RAG_RERANKING_CACHE_SIZE = 10000
+
 
 ####################################
 # SENTENCE TRANSFORMERS
@@ -496,6 +660,148 @@ else:
     except Exception:
         SENTENCE_TRANSFORMERS_CROSS_ENCODER_MODEL_KWARGS = None
 
+####################################
+# CODE EXECUTION KERNEL POOL
+####################################
+
+# Number of warm, pre-imported kernels kept ready for new leases
+CODE_EXECUTION_KERNEL_POOL_SIZE = os.environ.get("CODE_EXECUTION_KERNEL_POOL_SIZE", "2")
+try:
+    CODE_EXECUTION_KERNEL_POOL_SIZE = max(int(CODE_EXECUTION_KERNEL_POOL_SIZE), 0)
+except ValueError:
+    CODE_EXECUTION_KERNEL_POOL_SIZE = 2
+
+# Hard limit on kernels (warm + leased) this worker keeps on the runner
+CODE_EXECUTION_KERNEL_POOL_MAX_KERNELS = os.environ.get(
+    "CODE_EXECUTION_KERNEL_POOL_MAX_KERNELS", "16"
+)
+try:
+    CODE_EXECUTION_KERNEL_POOL_MAX_KERNELS = max(
+        int(CODE_EXECUTION_KERNEL_POOL_MAX_KERNELS), 1
+    )
+except ValueError:
+    CODE_EXECUTION_KERNEL_POOL_MAX_KERNELS = 16
+
+# Recycle a kernel after this many executions
+CODE_EXECUTION_KERNEL_MAX_EXECUTIONS = os.environ.get(
+    "CODE_EXECUTION_KERNEL_MAX_EXECUTIONS", "100"
+)
+try:
+    CODE_EXECUTION_KERNEL_MAX_EXECUTIONS = max(
+        int(CODE_EXECUTION_KERNEL_MAX_EXECUTIONS), 1
+    )
+except ValueError:
+    CODE_EXECUTION_KERNEL_MAX_EXECUTIONS = 100
+
+# Recycle a leased kernel after it has been idle for this many seconds
+CODE_EXECUTION_KERNEL_IDLE_TTL = os.environ.get("CODE_EXECUTION_KERNEL_IDLE_TTL", "900")
+try:
+    CODE_EXECUTION_KERNEL_IDLE_TTL = max(int(CODE_EXECUTION_KERNEL_IDLE_TTL), 1)
+except ValueError:
+    CODE_EXECUTION_KERNEL_IDLE_TTL = 900
+
+# Bytes of output streamed to the client before the rest is spilled to a file
+CODE_EXECUTION_STREAM_MAX_OUTPUT_SIZE = os.environ.get(
+    "CODE_EXECUTION_STREAM_MAX_OUTPUT_SIZE", str(1024 * 1024)
+)
+try:
+    CODE_EXECUTION_STREAM_MAX_OUTPUT_SIZE = max(
+        int(CODE_EXECUTION_STREAM_MAX_OUTPUT_SIZE), 0
+    )
+except ValueError:
+    CODE_EXECUTION_STREAM_MAX_OUTPUT_SIZE = 1024 * 1024
+
+# Rich outputs (plots, HTML, JSON) larger than this many bytes are saved to
+# storage and returned as file references instead of inline payloads
+CODE_EXECUTION_ARTIFACT_INLINE_MAX_SIZE = os.environ.get(
+    "CODE_EXECUTION_ARTIFACT_INLINE_MAX_SIZE", "8192"
+)
+try:
+    CODE_EXECUTION_ARTIFACT_INLINE_MAX_SIZE = max(
+        int(CODE_EXECUTION_ARTIFACT_INLINE_MAX_SIZE), 0
+    )
+except ValueError:
+    CODE_EXECUTION_ARTIFACT_INLINE_MAX_SIZE = 8192
+
+####################################
+# TOOL CALLS
+####################################
+
+# Maximum number of tool calls of one response executed concurrently
+TOOL_CALL_CONCURRENCY = os.environ.get("TOOL_CALL_CONCURRENCY", "4")
+try:
+    TOOL_CALL_CONCURRENCY = max(int(TOOL_CALL_CONCURRENCY), 1)
+except ValueError:
+    TOOL_CALL_CONCURRENCY = 4
+
+# Default timeout in seconds for a single tool call, empty for no timeout.
+# Tools can override it with a `timeout` attribute on their module.
+TOOL_CALL_TIMEOUT = os.environ.get("TOOL_CALL_TIMEOUT", "")
+if TOOL_CALL_TIMEOUT == "":
+    TOOL_CALL_TIMEOUT = None
+else:
+    try:
+        TOOL_CALL_TIMEOUT = int(TOOL_CALL_TIMEOUT)
+    except ValueError:
+        TOOL_CALL_TIMEOUT = None
+
+# Maximum number of synchronous bioinformatics tools running at once, each in
+# its own worker process; further calls wait in a queue
+BIO_TOOL_EXECUTOR_MAX_WORKERS = os.environ.get("BIO_TOOL_EXECUTOR_MAX_WORKERS", "4")
+try:
+    BIO_TOOL_EXECUTOR_MAX_WORKERS = max(int(BIO_TOOL_EXECUTOR_MAX_WORKERS), 1)
+except ValueError:
+    BIO_TOOL_EXECUTOR_MAX_WORKERS = 4
+
+# Minimum seconds between two progress status events of a bioinformatics job
+TOOL_JOB_PROGRESS_INTERVAL = os.environ.get("TOOL_JOB_PROGRESS_INTERVAL", "1")
+try:
+    TOOL_JOB_PROGRESS_INTERVAL = max(float(TOOL_JOB_PROGRESS_INTERVAL), 0.1)
+except ValueError:
+    TOOL_JOB_PROGRESS_INTERVAL = 1.0
+
+# Running jobs refresh their database row this often (seconds); queued or
+# running jobs without a refresh for twice as long are picked up again
+TOOL_JOB_HEARTBEAT_INTERVAL = os.environ.get("TOOL_JOB_HEARTBEAT_INTERVAL", "30")
+try:
+    TOOL_JOB_HEARTBEAT_INTERVAL = max(int(TOOL_JOB_HEARTBEAT_INTERVAL), 1)
+except ValueError:
+    TOOL_JOB_HEARTBEAT_INTERVAL = 30
+
+# Results of bioinformatics tool calls, keyed by tool, arguments and the
+# content of their input files. Kept outside of the public cache directory.
+TOOL_RESULT_CACHE_ENABLED = (
+    os.environ.get("TOOL_RESULT_CACHE_ENABLED", "True").lower() == "true"
+)
+TOOL_RESULT_CACHE_DIR = Path(
+    os.environ.get("TOOL_RESULT_CACHE_DIR", DATA_DIR / "tool_result_cache")
+).resolve()
+
+# Least recently used results are evicted above this many bytes
+TOOL_RESULT_CACHE_MAX_SIZE = os.environ.get(
+    "TOOL_RESULT_CACHE_MAX_SIZE", str(1024 * 1024 * 1024)
+)
+try:
+    TOOL_RESULT_CACHE_MAX_SIZE = int(TOOL_RESULT_CACHE_MAX_SIZE)
+except ValueError:
+    TOOL_RESULT_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+# Only results of tools marked pure (`cache = True`) are cached, tools
+# writing output files must not be, a hit would not write them again.
+# Comma separated names of further tools whose results are cached
+TOOL_RESULT_CACHE_INCLUDED_TOOLS = [
+    name.strip()
+    for name in os.environ.get("TOOL_RESULT_CACHE_INCLUDED_TOOLS", "").split(",")
+    if name.strip()
+]
+
+# Comma separated names of tools whose results are never cached
+TOOL_RESULT_CACHE_EXCLUDED_TOOLS = [
+    name.strip()
+    for name in os.environ.get("TOOL_RESULT_CACHE_EXCLUDED_TOOLS", "").split(",")
+    if name.strip()
+]
+
 ####################################
 # OFFLINE_MODE
 ####################################
@@ -409,6 +409,11 @@ from open_webui.utils.auth import (
 from open_webui.utils.plugin import install_tool_and_function_dependencies
 from open_webui.utils.oauth import OAuthManager
 from open_webui.utils.security_headers import SecurityHeadersMiddleware
+from open_webui.utils.tool_executor import tool_executor
+from open_webui.utils.tool_jobs import tool_job_manager
+from open_webui.utils.message_buffer import message_buffer
+from open_webui.utils.last_active import last_active_writer
+from open_webui.retrieval.embeddings import embedding_client
 
 from open_webui.tasks import (
     list_task_ids_by_chat_id,
@@ -477,11 +482,10 @@ async def lifespan(app: FastAPI):
     # Load bioinformatics tools
     log.info("Loading all bioinformatics tools...")
     try:
-        from bio_mcp.tools.tool_manager import get_registered_tools
-        from open_webui.utils.tools_manager import tools_manager
+        from open_webui.utils.tools_manager import load_all_tools
 
-        loaded_tools = get_registered_tools()
-        tools_manager._initialize_tools(loaded_tools)
+        # Also builds the tool specs, once instead of on every chat request
+        loaded_tools = load_all_tools()
         log.info(f"Successfully loaded {len(loaded_tools)} bioinformatics tools")
     except Exception as e:
         log.error(f"Failed to load bioinformatics tools: {e}")
@@ -492,8 +496,20 @@ async def lifespan(app: FastAPI):
 
     asyncio.create_task(periodic_usage_pool_cleanup())
 
+    await code_execution.kernel_pool.start()
+    await tool_job_manager.start()
+    await message_buffer.start()
+    await last_active_writer.start()
+
     yield
 
+    await code_execution.kernel_pool.shutdown()
+    await tool_job_manager.shutdown()
+    tool_executor.shutdown()
+    await message_buffer.shutdown()
+    await last_active_writer.shutdown()
+    embedding_client.shutdown()
+
 
 app = FastAPI(
     title="Open WebUI",
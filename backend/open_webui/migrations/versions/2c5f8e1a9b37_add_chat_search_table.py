@@ -0,0 +1,180 @@
+"""Add chat search table
+
+Revision ID: 2c5f8e1a9b37
+Revises: 7b3e9d4c2a61
+Create Date: 2025-05-26 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+import json
+
+revision = "2c5f8e1a9b37"
+down_revision = "7b3e9d4c2a61"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "chat_search",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("chat_id", sa.String(), nullable=False),
+        # "" for the chat title
+        sa.Column("message_id", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.UniqueConstraint("chat_id", "message_id", name="uq_chat_search_message"),
+    )
+
+    dialect_name = op.get_bind().dialect.name
+    if dialect_name == "sqlite":
+        # FTS5 index over the table, kept in sync by triggers
+        op.execute(
+            """
+            CREATE VIRTUAL TABLE chat_search_fts USING fts5(
+                content,
+                content='chat_search',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER chat_search_ai AFTER INSERT ON chat_search BEGIN
+                INSERT INTO chat_search_fts(rowid, content)
+                VALUES (new.id, new.content);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER chat_search_ad AFTER DELETE ON chat_search BEGIN
+                INSERT INTO chat_search_fts(chat_search_fts, rowid, content)
+                VALUES ('delete', old.id, old.content);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER chat_search_au AFTER UPDATE ON chat_search BEGIN
+                INSERT INTO chat_search_fts(chat_search_fts, rowid, content)
+                VALUES ('delete', old.id, old.content);
+                INSERT INTO chat_search_fts(rowid, content)
+                VALUES (new.id, new.content);
+            END
+            """
+        )
+    elif dialect_name == "postgresql":
+        op.execute(
+            """
+            ALTER TABLE chat_search ADD COLUMN search tsvector
+            GENERATED ALWAYS AS (to_tsvector('simple', coalesce(content, ''))) STORED
+            """
+        )
+        op.create_index(
+            "idx_chat_search_search",
+            "chat_search",
+            ["search"],
+            postgresql_using="gin",
+        )
+
+    backfill_chat_search()
+
+
+def get_message_search_content(message) -> str:
+    content = (message or {}).get("content") or ""
+    if isinstance(content, list):
+        # Text parts of a message with images
+        content = "\n".join(
+            part.get("text") or ""
+            for part in content
+            if isinstance(part, dict) and part.get("type") == "text"
+        )
+    return content if isinstance(content, str) else ""
+
+
+def backfill_chat_search(batch_size: int = 100):
+    """Index the title and messages of existing chats, except shared copies"""
+    conn = op.get_bind()
+    chat = sa.table(
+        "chat",
+        sa.column("id", sa.String()),
+        sa.column("user_id", sa.String()),
+        sa.column("title", sa.Text()),
+        sa.column("chat", sa.JSON()),
+    )
+    chat_message = sa.table(
+        "chat_message",
+        sa.column("chat_id", sa.String()),
+        sa.column("message_id", sa.String()),
+        sa.column("message", sa.JSON()),
+    )
+    chat_search = sa.table(
+        "chat_search",
+        sa.column("chat_id", sa.String()),
+        sa.column("message_id", sa.String()),
+        sa.column("content", sa.Text()),
+    )
+
+    last_id = ""
+    while True:
+        chats = conn.execute(
+            sa.select(chat.c.id, chat.c.title, chat.c.chat)
+            .where(chat.c.id > last_id)
+            .where(~chat.c.user_id.startswith("shared-"))
+            .order_by(chat.c.id)
+            .limit(batch_size)
+        ).fetchall()
+        if not chats:
+            break
+        last_id = chats[-1].id
+
+        # Messages written separately and not yet folded into the chat JSON
+        messages_by_chat_id = {}
+        for row in conn.execute(
+            sa.select(chat_message).where(
+                chat_message.c.chat_id.in_([row.id for row in chats])
+            )
+        ).fetchall():
+            messages_by_chat_id.setdefault(row.chat_id, {})[
+                row.message_id
+            ] = row.message
+
+        rows = []
+        for row in chats:
+            data = row.chat
+            if isinstance(data, str):
+                data = json.loads(data)
+            messages = {
+                **((data or {}).get("history", {}).get("messages", {})),
+                **messages_by_chat_id.get(row.id, {}),
+            }
+
+            contents = {"": row.title or ""}
+            for message_id, message in messages.items():
+                contents[message_id] = get_message_search_content(message)
+
+            rows.extend(
+                {"chat_id": row.id, "message_id": message_id, "content": content}
+                for message_id, content in contents.items()
+                if content
+            )
+
+        if rows:
+            conn.execute(sa.insert(chat_search), rows)
+
+
+def downgrade():
+    dialect_name = op.get_bind().dialect.name
+    if dialect_name == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS chat_search_au")
+        op.execute("DROP TRIGGER IF EXISTS chat_search_ad")
+        op.execute("DROP TRIGGER IF EXISTS chat_search_ai")
+        op.execute("DROP TABLE IF EXISTS chat_search_fts")
+    elif dialect_name == "postgresql":
+        op.drop_index("idx_chat_search_search", table_name="chat_search")
+
+    op.drop_table("chat_search")
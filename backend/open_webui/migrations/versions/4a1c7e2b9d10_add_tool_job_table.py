@@ -0,0 +1,41 @@
+"""Add tool job table
+
+Revision ID: 4a1c7e2b9d10
+Revises: 9f0c9cd09105
+Create Date: 2025-05-20 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "4a1c7e2b9d10"
+down_revision = "9f0c9cd09105"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "tool_job",
+        sa.Column("id", sa.String(), nullable=False, primary_key=True),
+        sa.Column("user_id", sa.String(), nullable=True),
+        sa.Column("chat_id", sa.Text(), nullable=True),
+        sa.Column("message_id", sa.Text(), nullable=True),
+        sa.Column("tool_name", sa.Text(), nullable=True),
+        sa.Column("params", sa.JSON(), nullable=True),
+        sa.Column("status", sa.Text(), nullable=True),
+        sa.Column("progress", sa.Text(), nullable=True),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+    )
+    op.create_index("tool_job_status_idx", "tool_job", ["status", "updated_at"])
+    op.create_index("tool_job_user_id_idx", "tool_job", ["user_id"])
+
+
+def downgrade():
+    op.drop_index("tool_job_user_id_idx", table_name="tool_job")
+    op.drop_index("tool_job_status_idx", table_name="tool_job")
+    op.drop_table("tool_job")
@@ -0,0 +1,70 @@
+"""Add chat message table
+
+Revision ID: 7b3e9d4c2a61
+Revises: 4a1c7e2b9d10
+Create Date: 2025-05-22 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "7b3e9d4c2a61"
+down_revision = "4a1c7e2b9d10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "chat_message",
+        sa.Column("chat_id", sa.String(), nullable=False),
+        sa.Column("message_id", sa.String(), nullable=False),
+        sa.Column("message", sa.JSON(), nullable=True),
+        sa.Column("current_at", sa.BigInteger(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("chat_id", "message_id"),
+    )
+
+
+def downgrade():
+    # Fold the separately written messages back into the chat JSON first
+    conn = op.get_bind()
+    chat = sa.table(
+        "chat",
+        sa.column("id", sa.String()),
+        sa.column("chat", sa.JSON()),
+    )
+    chat_message = sa.table(
+        "chat_message",
+        sa.column("chat_id", sa.String()),
+        sa.column("message_id", sa.String()),
+        sa.column("message", sa.JSON()),
+        sa.column("current_at", sa.BigInteger()),
+    )
+
+    rows_by_chat_id = {}
+    for row in conn.execute(
+        sa.select(chat_message).order_by(chat_message.c.current_at)
+    ).fetchall():
+        rows_by_chat_id.setdefault(row.chat_id, []).append(row)
+
+    for chat_id, rows in rows_by_chat_id.items():
+        result = conn.execute(
+            sa.select(chat.c.chat).where(chat.c.id == chat_id)
+        ).fetchone()
+        if result is None or result.chat is None:
+            continue
+
+        data = result.chat
+        history = data.setdefault("history", {})
+        messages = history.setdefault("messages", {})
+        for row in rows:
+            messages[row.message_id] = row.message
+            if row.current_at:
+                history["currentId"] = row.message_id
+
+        conn.execute(sa.update(chat).where(chat.c.id == chat_id).values(chat=data))
+
+    op.drop_table("chat_message")
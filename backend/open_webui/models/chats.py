@@ -1,16 +1,28 @@
 import logging
 import json
+import re
 import time
 import uuid
-from typing import Optional
+from typing import Callable, Optional
 
 from open_webui.internal.db import Base, get_db
 from open_webui.models.tags import TagModel, Tag, Tags
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import ENABLE_CHAT_SEARCH_INDEX, SRC_LOG_LEVELS
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Float,
+    Integer,
+    String,
+    Text,
+    JSON,
+    UniqueConstraint,
+)
 from sqlalchemy import or_, func, select, and_, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import exists
 
 ####################
@@ -40,6 +52,92 @@ class Chat(Base):
     folder_id = Column(Text, nullable=True)
 
 
+class ChatMessage(Base):
+    """
+    Messages written since the chat's `chat` JSON was last saved as a whole.
+
+    Writing one message only touches its own row instead of rewriting the
+    whole chat. The rows are merged into `chat.history.messages` when a chat
+    is read and folded into the JSON the next time it is saved.
+    """
+
+    __tablename__ = "chat_message"
+
+    chat_id = Column(String, primary_key=True)
+    message_id = Column(String, primary_key=True)
+    message = Column(JSON)
+
+    # time in ns the message became the chat's current message
+    current_at = Column(BigInteger, nullable=True)
+
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+
+class ChatSearch(Base):
+    """
+    Full-text search index of chats, one row for the title of each chat
+    (with `message_id` "") and one for the content of each of its messages.
+
+    Rows are written along with the chat and its messages. The migration
+    adds an FTS5 table over them on SQLite and a `search` tsvector column
+    with a GIN index on PostgreSQL.
+    """
+
+    __tablename__ = "chat_search"
+    __table_args__ = (
+        UniqueConstraint("chat_id", "message_id", name="uq_chat_search_message"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chat_id = Column(String, nullable=False)
+    message_id = Column(String, nullable=False)
+    content = Column(Text)
+
+
+CHAT_SEARCH_WORD_PATTERN = re.compile(r"\w+")
+
+
+def get_message_search_content(message: dict) -> str:
+    content = (message or {}).get("content") or ""
+    if isinstance(content, list):
+        # Text parts of a message with images
+        content = "\n".join(
+            part.get("text") or ""
+            for part in content
+            if isinstance(part, dict) and part.get("type") == "text"
+        )
+    return content if isinstance(content, str) else ""
+
+
+def get_chat_search_contents(title: str, chat: dict) -> dict[str, str]:
+    """The text to index for a chat, by message id and "" for the title"""
+    contents = {"": title or ""}
+    for message_id, message in (
+        (chat or {}).get("history", {}).get("messages", {}).items()
+    ):
+        contents[message_id] = get_message_search_content(message)
+    return contents
+
+
+def apply_chat_messages(chat: dict, rows: list[ChatMessage]) -> dict:
+    """Return a copy of the chat JSON with the message rows merged in"""
+    history = {**chat.get("history", {})}
+    messages = {**history.get("messages", {})}
+
+    current = None
+    for row in rows:
+        messages[row.message_id] = row.message
+        if row.current_at and (current is None or row.current_at > current.current_at):
+            current = row
+
+    history["messages"] = messages
+    if current is not None:
+        history["currentId"] = current.message_id
+
+    return {**chat, "history": history}
+
+
 class ChatModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -105,6 +203,192 @@ class ChatTitleIdResponse(BaseModel):
 
 
 class ChatTable:
+    def _to_model(self, db, chat: Chat) -> ChatModel:
+        return self._to_models(db, [chat])[0]
+
+    def _to_models(self, db, chats: list[Chat]) -> list[ChatModel]:
+        models = [ChatModel.model_validate(chat) for chat in chats]
+
+        rows_by_chat_id = {}
+        chat_ids = [model.id for model in models]
+        for i in range(0, len(chat_ids), 500):
+            for row in (
+                db.query(ChatMessage)
+                .filter(ChatMessage.chat_id.in_(chat_ids[i : i + 500]))
+                .all()
+            ):
+                rows_by_chat_id.setdefault(row.chat_id, []).append(row)
+
+        for model in models:
+            if model.id in rows_by_chat_id:
+                model.chat = apply_chat_messages(model.chat, rows_by_chat_id[model.id])
+        return models
+
+    def _update_message(
+        self,
+        id: str,
+        message_id: str,
+        update: Callable[[dict], dict],
+        create: bool = True,
+        current: bool = False,
+    ) -> Optional[dict]:
+        for attempt in range(2):
+            try:
+                with get_db() as db:
+                    row = db.get(ChatMessage, (id, message_id))
+                    if row is None:
+                        # Start from the message as saved in the chat JSON
+                        chat = db.query(Chat.chat).filter_by(id=id).first()
+                        if chat is None:
+                            return None
+
+                        messages = (
+                            (chat[0] or {}).get("history", {}).get("messages", {})
+                        )
+                        if message_id not in messages and not create:
+                            return None
+
+                        row = ChatMessage(
+                            chat_id=id,
+                            message_id=message_id,
+                            message=messages.get(message_id, {}),
+                            created_at=int(time.time()),
+                        )
+                        db.add(row)
+
+                    row.message = update(dict(row.message or {}))
+                    row.updated_at = int(time.time())
+                    if current:
+                        row.current_at = time.time_ns()
+                    self._update_search_index(
+                        db,
+                        id,
+                        {message_id: get_message_search_content(row.message)},
+                    )
+                    db.commit()
+                    return row.message
+            except IntegrityError:
+                # A concurrent write created the row first, update that one
+                if attempt:
+                    raise
+
+    def _delete_messages(self, db, chat_ids) -> None:
+        db.query(ChatMessage).filter(ChatMessage.chat_id.in_(chat_ids)).delete(
+            synchronize_session=False
+        )
+
+    def _update_search_index(
+        self, db, chat_id: str, contents: dict[str, str], replace: bool = False
+    ) -> None:
+        """
+        Write the index rows of a chat whose text changed. With `replace`,
+        `contents` is the whole chat and rows not in it are removed.
+        """
+        if not ENABLE_CHAT_SEARCH_INDEX:
+            return
+
+        query = db.query(ChatSearch).filter(ChatSearch.chat_id == chat_id)
+        if not replace:
+            query = query.filter(ChatSearch.message_id.in_(list(contents)))
+        rows = {row.message_id: row for row in query.all()}
+
+        for message_id, content in contents.items():
+            row = rows.pop(message_id, None)
+            if row is None:
+                if content:
+                    db.add(
+                        ChatSearch(
+                            chat_id=chat_id, message_id=message_id, content=content
+                        )
+                    )
+            elif not content:
+                db.delete(row)
+            elif row.content != content:
+                row.content = content
+
+        if replace:
+            for row in rows.values():
+                db.delete(row)
+
+    def _delete_search_index(self, db, chat_ids) -> None:
+        if not ENABLE_CHAT_SEARCH_INDEX:
+            return
+
+        db.query(ChatSearch).filter(ChatSearch.chat_id.in_(chat_ids)).delete(
+            synchronize_session=False
+        )
+
+    def _get_search_ranking(self, db, search_text: str):
+        """
+        Subquery of the ids of chats matching all words of `search_text`,
+        each as a prefix, in the title or one message, with their `rank`
+        (lower is better). None if the index can't be used for the search.
+        """
+        if not ENABLE_CHAT_SEARCH_INDEX:
+            return None
+
+        words = CHAT_SEARCH_WORD_PATTERN.findall(search_text)
+        if not words:
+            return None
+
+        dialect_name = db.bind.dialect.name
+        if dialect_name == "sqlite":
+            statement = text(
+                """
+                SELECT chat_search.chat_id AS chat_id,
+                    MIN(chat_search_fts.rank) AS rank
+                FROM chat_search_fts
+                JOIN chat_search ON chat_search.id = chat_search_fts.rowid
+                WHERE chat_search_fts MATCH :query
+                GROUP BY chat_search.chat_id
+                """
+            ).bindparams(query=" ".join(f'"{word}"*' for word in words))
+        elif dialect_name == "postgresql":
+            statement = text(
+                """
+                SELECT chat_search.chat_id AS chat_id,
+                    -MAX(ts_rank(chat_search.search, query)) AS rank
+                FROM chat_search, to_tsquery('simple', :query) AS query
+                WHERE chat_search.search @@ query
+                GROUP BY chat_search.chat_id
+                """
+            ).bindparams(query=" & ".join(f"{word}:*" for word in words))
+        else:
+            return None
+
+        return statement.columns(chat_id=String, rank=Float).subquery()
+
+    def reindex_chats(self, batch_size: int = 100) -> int:
+        """Rebuild the search index of all chats, returns how many were indexed"""
+        count = 0
+        last_id = ""
+        while True:
+            with get_db() as db:
+                chats = (
+                    db.query(Chat)
+                    .filter(Chat.id > last_id)
+                    .filter(~Chat.user_id.startswith("shared-"))
+                    .order_by(Chat.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not chats:
+                    break
+
+                for chat in self._to_models(db, chats):
+                    self._update_search_index(
+                        db,
+                        chat.id,
+                        get_chat_search_contents(chat.title, chat.chat),
+                        replace=True,
+                    )
+                db.commit()
+
+                count += len(chats)
+                last_id = chats[-1].id
+
+        return count
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
@@ -125,6 +409,9 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            self._update_search_index(
+                db, id, get_chat_search_contents(chat.title, chat.chat)
+            )
             db.commit()
             db.refresh(result)
             return ChatModel.model_validate(result) if result else None
@@ -154,6 +441,9 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            self._update_search_index(
+                db, id, get_chat_search_contents(chat.title, chat.chat)
+            )
             db.commit()
             db.refresh(result)
             return ChatModel.model_validate(result) if result else None
@@ -165,6 +455,14 @@ class ChatTable:
                 chat_item.chat = chat
                 chat_item.title = chat["title"] if "title" in chat else "New Chat"
                 chat_item.updated_at = int(time.time())
+                # The saved chat supersedes the messages written separately
+                self._delete_messages(db, [id])
+                self._update_search_index(
+                    db,
+                    id,
+                    get_chat_search_contents(chat_item.title, chat),
+                    replace=True,
+                )
                 db.commit()
                 db.refresh(chat_item)
 
@@ -219,6 +517,11 @@ class ChatTable:
     def get_message_by_id_and_message_id(
         self, id: str, message_id: str
     ) -> Optional[dict]:
+        with get_db() as db:
+            row = db.get(ChatMessage, (id, message_id))
+            if row is not None:
+                return row.message
+
         chat = self.get_chat_by_id(id)
         if chat is None:
             return None
@@ -227,45 +530,60 @@ class ChatTable:
 
     def upsert_message_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, message: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
-        chat = chat.chat
-        history = chat.get("history", {})
-
-        if message_id in history.get("messages", {}):
-            history["messages"][message_id] = {
-                **history["messages"][message_id],
-                **message,
-            }
-        else:
-            history["messages"][message_id] = message
-
-        history["currentId"] = message_id
-
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+    ) -> Optional[dict]:
+        """
+        Merge `message` into the message and make it the current one.
+        Returns the updated message, or None if the chat does not exist.
+        """
+        return self._update_message(
+            id,
+            message_id,
+            lambda existing: {**existing, **message},
+            current=True,
+        )
 
     def add_message_status_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, status: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
+    ) -> Optional[dict]:
+        return self._update_message(
+            id,
+            message_id,
+            lambda existing: {
+                **existing,
+                "statusHistory": [*existing.get("statusHistory", []), status],
+            },
+            create=False,
+        )
+
+    def compact_messages_by_chat_id(self, id: str) -> Optional[ChatModel]:
+        """Fold the separately written messages into the chat JSON"""
+        try:
+            with get_db() as db:
+                # Write the chat first, which holds its row (on SQLite the
+                # database) until the commit, and lock the message rows, so
+                # that no concurrent write is folded in half or deleted
+                db.query(Chat).filter_by(id=id).update(
+                    {"updated_at": int(time.time())}, synchronize_session=False
+                )
+                chat_item = db.get(Chat, id)
+                rows = (
+                    db.query(ChatMessage).filter_by(chat_id=id).with_for_update().all()
+                )
+                if not rows:
+                    db.commit()
+                    return ChatModel.model_validate(chat_item)
+
+                chat_item.chat = apply_chat_messages(chat_item.chat, rows)
+                db.query(ChatMessage).filter(
+                    ChatMessage.chat_id == id,
+                    ChatMessage.message_id.in_([row.message_id for row in rows]),
+                ).delete(synchronize_session=False)
+                db.commit()
+                db.refresh(chat_item)
+                return ChatModel.model_validate(chat_item)
+        except Exception:
             return None
 
-        chat = chat.chat
-        history = chat.get("history", {})
-
-        if message_id in history.get("messages", {}):
-            status_history = history["messages"][message_id].get("statusHistory", [])
-            status_history.append(status)
-            history["messages"][message_id]["statusHistory"] = status_history
-
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
-
     def insert_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         with get_db() as db:
             # Get the existing chat to share
@@ -279,7 +597,7 @@ class ChatTable:
                     "id": str(uuid.uuid4()),
                     "user_id": f"shared-{chat_id}",
                     "title": chat.title,
-                    "chat": chat.chat,
+                    "chat": self._to_model(db, chat).chat,
                     "created_at": chat.created_at,
                     "updated_at": int(time.time()),
                 }
@@ -310,7 +628,7 @@ class ChatTable:
                     return self.insert_shared_chat_by_chat_id(chat_id)
 
                 shared_chat.title = chat.title
-                shared_chat.chat = chat.chat
+                shared_chat.chat = self._to_model(db, chat).chat
 
                 shared_chat.updated_at = int(time.time())
                 db.commit()
@@ -339,7 +657,7 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_model(db, chat)
         except Exception:
             return None
 
@@ -351,7 +669,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_model(db, chat)
         except Exception:
             return None
 
@@ -363,7 +681,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_model(db, chat)
         except Exception:
             return None
 
@@ -387,7 +705,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_models(db, all_chats)
 
     def get_chat_list_by_user_id(
         self,
@@ -409,7 +727,7 @@ class ChatTable:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_models(db, all_chats)
 
     def get_chat_title_id_list_by_user_id(
         self,
@@ -460,13 +778,13 @@ class ChatTable:
                 .order_by(Chat.updated_at.desc())
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_models(db, all_chats)
 
     def get_chat_by_id(self, id: str) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat = db.get(Chat, id)
-                return ChatModel.model_validate(chat)
+                return self._to_model(db, chat)
         except Exception:
             return None
 
@@ -488,7 +806,7 @@ class ChatTable:
         try:
             with get_db() as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                return self._to_model(db, chat)
         except Exception:
             return None
 
@@ -499,7 +817,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_models(db, all_chats)
 
     def get_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -508,7 +826,7 @@ class ChatTable:
                 .filter_by(user_id=user_id)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_models(db, all_chats)
 
     def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -517,7 +835,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, pinned=True, archived=False)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_models(db, all_chats)
 
     def get_archived_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -526,7 +844,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_models(db, all_chats)
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -537,7 +855,8 @@ class ChatTable:
         limit: int = 60,
     ) -> list[ChatModel]:
         """
-        Filters chats based on a search query using Python, allowing pagination using skip and limit.
+        Filters chats based on a search query, allowing pagination using skip and limit.
+        Uses the search index, ranking the best matches first, unless it is disabled.
         """
         search_text = search_text.lower().strip()
 
@@ -565,11 +884,19 @@ class ChatTable:
             if not include_archived:
                 query = query.filter(Chat.archived == False)
 
+            search_ranking = (
+                self._get_search_ranking(db, search_text) if search_text else None
+            )
+            if search_ranking is not None:
+                query = query.join(
+                    search_ranking, search_ranking.c.chat_id == Chat.id
+                ).order_by(search_ranking.c.rank)
+
             query = query.order_by(Chat.updated_at.desc())
 
             # Check if the database dialect is either 'sqlite' or 'postgresql'
             dialect_name = db.bind.dialect.name
-            if dialect_name == "sqlite":
+            if dialect_name == "sqlite" and search_ranking is None:
                 # SQLite case: using JSON1 extension for JSON searching
                 query = query.filter(
                     (
@@ -588,6 +915,7 @@ class ChatTable:
                     ).params(search_text=search_text)
                 )
 
+            if dialect_name == "sqlite":
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
                     query = query.filter(
@@ -619,23 +947,24 @@ class ChatTable:
                     )
 
             elif dialect_name == "postgresql":
-                # PostgreSQL relies on proper JSON query for search
-                query = query.filter(
-                    (
-                        Chat.title.ilike(
-                            f"%{search_text}%"
-                        )  # Case-insensitive search in title
-                        | text(
-                            """
-                            EXISTS (
-                                SELECT 1
-                                FROM json_array_elements(Chat.chat->'messages') AS message
-                                WHERE LOWER(message->>'content') LIKE '%' || :search_text || '%'
+                if search_ranking is None:
+                    # PostgreSQL relies on proper JSON query for search
+                    query = query.filter(
+                        (
+                            Chat.title.ilike(
+                                f"%{search_text}%"
+                            )  # Case-insensitive search in title
+                            | text(
+                                """
+                                EXISTS (
+                                    SELECT 1
+                                    FROM json_array_elements(Chat.chat->'messages') AS message
+                                    WHERE LOWER(message->>'content') LIKE '%' || :search_text || '%'
+                                )
+                                """
                             )
-                            """
-                        )
-                    ).params(search_text=search_text)
-                )
+                        ).params(search_text=search_text)
+                    )
 
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
@@ -677,7 +1006,7 @@ class ChatTable:
             log.info(f"The number of chats: {len(all_chats)}")
 
             # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_models(db, all_chats)
 
     def get_chats_by_folder_id_and_user_id(
         self, folder_id: str, user_id: str
@@ -690,7 +1019,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_models(db, all_chats)
 
     def get_chats_by_folder_ids_and_user_id(
         self, folder_ids: list[str], user_id: str
@@ -705,7 +1034,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_models(db, all_chats)
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str
@@ -718,7 +1047,7 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_model(db, chat)
         except Exception:
             return None
 
@@ -757,7 +1086,7 @@ class ChatTable:
 
             all_chats = query.all()
             log.debug(f"all_chats: {all_chats}")
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_models(db, all_chats)
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str
@@ -778,7 +1107,7 @@ class ChatTable:
 
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_model(db, chat)
         except Exception:
             return None
 
@@ -855,6 +1184,8 @@ class ChatTable:
         try:
             with get_db() as db:
                 db.query(Chat).filter_by(id=id).delete()
+                self._delete_messages(db, [id])
+                self._delete_search_index(db, [id])
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -864,7 +1195,9 @@ class ChatTable:
     def delete_chat_by_id_and_user_id(self, id: str, user_id: str) -> bool:
         try:
             with get_db() as db:
-                db.query(Chat).filter_by(id=id, user_id=user_id).delete()
+                if db.query(Chat).filter_by(id=id, user_id=user_id).delete():
+                    self._delete_messages(db, [id])
+                    self._delete_search_index(db, [id])
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -876,6 +1209,12 @@ class ChatTable:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
 
+                self._delete_messages(
+                    db, select(Chat.id).where(Chat.user_id == user_id)
+                )
+                self._delete_search_index(
+                    db, select(Chat.id).where(Chat.user_id == user_id)
+                )
                 db.query(Chat).filter_by(user_id=user_id).delete()
                 db.commit()
 
@@ -888,6 +1227,18 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
+                self._delete_messages(
+                    db,
+                    select(Chat.id).where(
+                        Chat.user_id == user_id, Chat.folder_id == folder_id
+                    ),
+                )
+                self._delete_search_index(
+                    db,
+                    select(Chat.id).where(
+                        Chat.user_id == user_id, Chat.folder_id == folder_id
+                    ),
+                )
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
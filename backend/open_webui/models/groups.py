@@ -1,11 +1,19 @@
 import json
 import logging
+import threading
 import time
 from typing import Optional
 import uuid
 
 from open_webui.internal.db import Base, get_db
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import (
+    GROUP_CACHE_TTL,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    REDIS_URL,
+    SRC_LOG_LEVELS,
+)
+from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
 
 from open_webui.models.files import FileMetadataResponse
 
@@ -87,7 +95,108 @@ class GroupUpdateForm(GroupForm):
     user_ids: Optional[list[str]] = None
 
 
+class MemberGroups:
+    """
+    The groups a user is a member of. `derived` holds values computed from
+    the groups, e.g. the merged permissions, which live as long as the entry.
+    """
+
+    def __init__(self, groups: list[GroupModel]):
+        self.groups = groups
+        self.ids = frozenset(group.id for group in groups)
+        self.derived: dict = {}
+
+
+class GroupCache:
+    """
+    The groups of each user, kept for `ttl` seconds.
+
+    Any change to a group drops all entries and bumps `version`, entries
+    read from the database while it changed are not kept. With Redis, the
+    changes are broadcast so every replica drops its entries, and nothing
+    is cached while that subscription is down.
+    """
+
+    CHANNEL = "open-webui:group-invalidate"
+
+    def __init__(self, ttl: float, redis_url: str = "", redis_sentinels=[]):
+        self.ttl = ttl
+        self.version = 0
+        # user id -> (groups, expiry time)
+        self._members: dict[str, tuple[MemberGroups, float]] = {}
+        self._redis = None
+        self._listening = False
+
+        if ttl > 0 and redis_url:
+            self._redis = get_redis_connection(
+                redis_url, redis_sentinels, decode_responses=True
+            )
+            threading.Thread(
+                target=self._listen, name="group-cache", daemon=True
+            ).start()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and (self._redis is None or self._listening)
+
+    def get(self, user_id: str) -> Optional[MemberGroups]:
+        if not self.enabled:
+            return None
+        entry = self._members.get(user_id)
+        if entry is None:
+            return None
+        member, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._members.pop(user_id, None)
+            return None
+        return member
+
+    def set(self, user_id: str, member: MemberGroups, version: int):
+        if self.enabled and version == self.version:
+            self._members[user_id] = (member, time.monotonic() + self.ttl)
+
+    def clear(self):
+        self.version += 1
+        self._members = {}
+
+    def invalidate(self):
+        self.clear()
+        if self._redis is not None:
+            try:
+                self._redis.publish(self.CHANNEL, "")
+            except Exception as e:
+                log.warning(f"Unable to broadcast change of groups: {e}")
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                pubsub.subscribe(self.CHANNEL)
+                for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        # Changes may have been missed until now
+                        self.clear()
+                        self._listening = True
+                    elif message["type"] == "message":
+                        self.clear()
+            except Exception as e:
+                log.warning(f"Lost group change notifications: {e}")
+
+            self._listening = False
+            self.clear()
+            time.sleep(1)
+
+
 class GroupTable:
+    def __init__(self):
+        self.cache = GroupCache(
+            GROUP_CACHE_TTL,
+            redis_url=REDIS_URL,
+            redis_sentinels=get_sentinels_from_env(
+                REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT
+            ),
+        )
+
     def insert_new_group(
         self, user_id: str, form_data: GroupForm
     ) -> Optional[GroupModel]:
@@ -107,6 +216,7 @@ class GroupTable:
                 db.add(result)
                 db.commit()
                 db.refresh(result)
+                self.cache.invalidate()
                 if result:
                     return GroupModel.model_validate(result)
                 else:
@@ -137,6 +247,21 @@ class GroupTable:
                 .all()
             ]
 
+    def get_member_groups(self, user_id: str) -> MemberGroups:
+        """
+        The groups of a user, reused for up to GROUP_CACHE_TTL seconds
+        unless a group changes. The groups must not be modified.
+        """
+        member = self.cache.get(user_id)
+        if member is None:
+            version = self.cache.version
+            member = MemberGroups(self.get_groups_by_member_id(user_id))
+            self.cache.set(user_id, member, version)
+        return member
+
+    def get_group_ids_by_member_id(self, user_id: str) -> frozenset[str]:
+        return self.get_member_groups(user_id).ids
+
     def get_group_by_id(self, id: str) -> Optional[GroupModel]:
         try:
             with get_db() as db:
@@ -164,6 +289,7 @@ class GroupTable:
                     }
                 )
                 db.commit()
+                self.cache.invalidate()
                 return self.get_group_by_id(id=id)
         except Exception as e:
             log.exception(e)
@@ -174,6 +300,7 @@ class GroupTable:
             with get_db() as db:
                 db.query(Group).filter_by(id=id).delete()
                 db.commit()
+                self.cache.invalidate()
                 return True
         except Exception:
             return False
@@ -183,6 +310,7 @@ class GroupTable:
             try:
                 db.query(Group).delete()
                 db.commit()
+                self.cache.invalidate()
 
                 return True
             except Exception:
@@ -203,6 +331,7 @@ class GroupTable:
                     )
                     db.commit()
 
+                self.cache.invalidate()
                 return True
             except Exception:
                 return False
@@ -0,0 +1,177 @@
+import logging
+import time
+import uuid
+from typing import Any, Optional
+
+from open_webui.internal.db import Base, get_db
+from open_webui.env import SRC_LOG_LEVELS
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import BigInteger, Column, String, Text, JSON
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+
+TOOL_JOB_PENDING_STATUSES = ["queued", "running"]
+TOOL_JOB_FINAL_STATUSES = ["completed", "failed", "cancelled"]
+
+####################
+# ToolJob DB Schema
+####################
+
+
+class ToolJob(Base):
+    __tablename__ = "tool_job"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String)
+
+    chat_id = Column(Text, nullable=True)
+    message_id = Column(Text, nullable=True)
+
+    tool_name = Column(Text)
+    params = Column(JSON, nullable=True)
+
+    # queued, running, completed, failed or cancelled
+    status = Column(Text)
+    progress = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+
+class ToolJobModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    user_id: str
+
+    chat_id: Optional[str] = None
+    message_id: Optional[str] = None
+
+    tool_name: str
+    params: Optional[dict] = None
+
+    status: str
+    progress: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+
+####################
+# Forms
+####################
+
+
+class ToolJobForm(BaseModel):
+    tool_name: str
+    params: Optional[dict] = None
+    chat_id: Optional[str] = None
+    message_id: Optional[str] = None
+
+
+class ToolJobsTable:
+    def insert_new_job(
+        self, user_id: str, form_data: ToolJobForm
+    ) -> Optional[ToolJobModel]:
+        with get_db() as db:
+            job = ToolJobModel(
+                **{
+                    **form_data.model_dump(),
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "status": "queued",
+                    "created_at": int(time.time()),
+                    "updated_at": int(time.time()),
+                }
+            )
+
+            try:
+                result = ToolJob(**job.model_dump())
+                db.add(result)
+                db.commit()
+                db.refresh(result)
+                return ToolJobModel.model_validate(result) if result else None
+            except Exception as e:
+                log.exception(f"Error inserting a new tool job: {e}")
+                return None
+
+    def get_job_by_id(self, id: str) -> Optional[ToolJobModel]:
+        with get_db() as db:
+            job = db.query(ToolJob).filter_by(id=id).first()
+            return ToolJobModel.model_validate(job) if job else None
+
+    def get_jobs_by_user_id(self, user_id: str) -> list[ToolJobModel]:
+        with get_db() as db:
+            return [
+                ToolJobModel.model_validate(job)
+                for job in db.query(ToolJob)
+                .filter_by(user_id=user_id)
+                .order_by(ToolJob.created_at.desc())
+                .all()
+            ]
+
+    def get_stale_pending_jobs(self, updated_before: int) -> list[ToolJobModel]:
+        with get_db() as db:
+            return [
+                ToolJobModel.model_validate(job)
+                for job in db.query(ToolJob)
+                .filter(ToolJob.status.in_(TOOL_JOB_PENDING_STATUSES))
+                .filter(ToolJob.updated_at < updated_before)
+                .order_by(ToolJob.created_at)
+                .all()
+            ]
+
+    def claim_job(self, id: str, updated_at: int) -> Optional[ToolJobModel]:
+        """
+        Take over a pending job, unless another worker refreshed it since it
+        was read with `updated_at`
+        """
+        with get_db() as db:
+            count = (
+                db.query(ToolJob)
+                .filter(
+                    ToolJob.id == id,
+                    ToolJob.updated_at == updated_at,
+                    ToolJob.status.in_(TOOL_JOB_PENDING_STATUSES),
+                )
+                .update(
+                    {"status": "queued", "updated_at": int(time.time())},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if not count:
+                return None
+            job = db.query(ToolJob).filter_by(id=id).first()
+            return ToolJobModel.model_validate(job)
+
+    def update_job_by_id(self, id: str, updated: dict) -> Optional[ToolJobModel]:
+        with get_db() as db:
+            try:
+                job = db.query(ToolJob).filter_by(id=id).first()
+                for key, value in updated.items():
+                    setattr(job, key, value)
+                job.updated_at = int(time.time())
+                db.commit()
+
+                return ToolJobModel.model_validate(job)
+            except Exception:
+                return None
+
+    def delete_job_by_id(self, id: str) -> bool:
+        with get_db() as db:
+            try:
+                db.query(ToolJob).filter_by(id=id).delete()
+                db.commit()
+                return True
+            except Exception:
+                return False
+
+
+ToolJobs = ToolJobsTable()
@@ -1,7 +1,18 @@
+import json
+import logging
+import threading
 import time
 from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
+from open_webui.env import (
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    REDIS_URL,
+    SRC_LOG_LEVELS,
+    USER_CACHE_TTL,
+)
+from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
 
 
 from open_webui.models.chats import Chats
@@ -10,7 +21,10 @@ from open_webui.models.groups import Groups
 
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Column, String, Text
-from sqlalchemy import or_
+from sqlalchemy import bindparam, or_
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
 
 
 ####################
@@ -101,7 +115,91 @@ class UserUpdateForm(BaseModel):
     password: Optional[str] = None
 
 
+class UserCache:
+    """
+    Users by id, kept for `ttl` seconds to authenticate requests without
+    reading the user every time.
+
+    A user is dropped as soon as it is changed. With Redis, the ids of
+    changed users are broadcast so every replica drops them, and nothing is
+    cached while that subscription is down.
+    """
+
+    CHANNEL = "open-webui:user-invalidate"
+
+    def __init__(self, ttl: float, redis_url: str = "", redis_sentinels=[]):
+        self.ttl = ttl
+        # user id -> (user, expiry time)
+        self._users: dict[str, tuple[UserModel, float]] = {}
+        self._redis = None
+        self._listening = False
+
+        if ttl > 0 and redis_url:
+            self._redis = get_redis_connection(
+                redis_url, redis_sentinels, decode_responses=True
+            )
+            threading.Thread(
+                target=self._listen, name="user-cache", daemon=True
+            ).start()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and (self._redis is None or self._listening)
+
+    def get(self, id: str) -> Optional[UserModel]:
+        if not self.enabled:
+            return None
+        entry = self._users.get(id)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._users.pop(id, None)
+            return None
+        return user.model_copy()
+
+    def set(self, user: UserModel):
+        if self.enabled:
+            self._users[user.id] = (user.model_copy(), time.monotonic() + self.ttl)
+
+    def invalidate(self, id: str):
+        self._users.pop(id, None)
+        if self._redis is not None:
+            try:
+                self._redis.publish(self.CHANNEL, json.dumps({"id": id}))
+            except Exception as e:
+                log.warning(f"Unable to broadcast change of user {id}: {e}")
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                pubsub.subscribe(self.CHANNEL)
+                for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        # Changes may have been missed until now
+                        self._users = {}
+                        self._listening = True
+                    elif message["type"] == "message":
+                        self._users.pop(json.loads(message["data"])["id"], None)
+            except Exception as e:
+                log.warning(f"Lost user change notifications: {e}")
+
+            self._listening = False
+            self._users = {}
+            time.sleep(1)
+
+
 class UsersTable:
+    def __init__(self):
+        self.cache = UserCache(
+            USER_CACHE_TTL,
+            redis_url=REDIS_URL,
+            redis_sentinels=get_sentinels_from_env(
+                REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT
+            ),
+        )
+
     def insert_new_user(
         self,
         id: str,
@@ -142,6 +240,15 @@ class UsersTable:
         except Exception:
             return None
 
+    def get_cached_user_by_id(self, id: str) -> Optional[UserModel]:
+        """The user, reused for up to USER_CACHE_TTL seconds unless changed"""
+        user = self.cache.get(id)
+        if user is None:
+            user = self.get_user_by_id(id)
+            if user is not None:
+                self.cache.set(user)
+        return user
+
     def get_user_by_api_key(self, api_key: str) -> Optional[UserModel]:
         try:
             with get_db() as db:
@@ -274,6 +381,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"role": role})
                 db.commit()
+                self.cache.invalidate(id)
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
         except Exception:
@@ -288,6 +396,7 @@ class UsersTable:
                     {"profile_image_url": profile_image_url}
                 )
                 db.commit()
+                self.cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -307,6 +416,25 @@ class UsersTable:
         except Exception:
             return None
 
+    def update_users_last_active_by_ids(self, last_active: dict[str, int]) -> bool:
+        """Write the last active time of many users in one statement"""
+        try:
+            with get_db() as db:
+                db.execute(
+                    User.__table__.update()
+                    .where(User.id == bindparam("user_id"))
+                    .values(last_active_at=bindparam("last_active_at")),
+                    [
+                        {"user_id": id, "last_active_at": last_active_at}
+                        for id, last_active_at in last_active.items()
+                    ],
+                )
+                db.commit()
+                return True
+        except Exception as e:
+            log.error(f"Unable to update the last active time of users: {e}")
+            return False
+
     def update_user_oauth_sub_by_id(
         self, id: str, oauth_sub: str
     ) -> Optional[UserModel]:
@@ -314,6 +442,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"oauth_sub": oauth_sub})
                 db.commit()
+                self.cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -325,6 +454,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update(updated)
                 db.commit()
+                self.cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -344,6 +474,7 @@ class UsersTable:
 
                 db.query(User).filter_by(id=id).update({"settings": user_settings})
                 db.commit()
+                self.cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -362,6 +493,7 @@ class UsersTable:
                     # Delete User
                     db.query(User).filter_by(id=id).delete()
                     db.commit()
+                self.cache.invalidate(id)
 
                 return True
             else:
@@ -374,6 +506,7 @@ class UsersTable:
             with get_db() as db:
                 result = db.query(User).filter_by(id=id).update({"api_key": api_key})
                 db.commit()
+                self.cache.invalidate(id)
                 return True if result == 1 else False
         except Exception:
             return False
@@ -0,0 +1,716 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from open_webui.env import (
+    BM25_INDEX_DIR,
+    ENABLE_BM25_INDEX,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    REDIS_URL,
+    SRC_LOG_LEVELS,
+)
+from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
+
+try:
+    import fcntl
+except ImportError:  # Windows, writes are only locked within the process
+    fcntl = None
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+TOKEN_PATTERN = re.compile(r"\w+")
+COLLECTION_NAME_PATTERN = re.compile(r"^[\w\-.]{1,128}$")
+
+# BM25 parameters, same as rank_bm25's BM25Okapi
+K1 = 1.5
+B = 0.75
+
+# Segments are merged into one above this many
+MAX_SEGMENTS = 8
+# A segment is rewritten once this share of its documents is deleted
+MAX_DELETED_RATIO = 0.5
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def normalize(vectors) -> np.ndarray:
+    """Rows scaled to unit length as float32, zero rows stay zero"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class Segment:
+    """
+    An immutable part of an index: the postings of a batch of documents
+    and the documents themselves, optionally with their embeddings. The
+    arrays are memory-mapped, documents are read from disk when they are
+    returned.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path / "terms.json") as f:
+            # term -> [start, end] of its postings
+            self.terms: dict[str, list[int]] = json.load(f)
+        self.postings = np.load(path / "postings.npy", mmap_mode="r")
+        self.frequencies = np.load(path / "frequencies.npy", mmap_mode="r")
+        self.lengths = np.load(path / "lengths.npy", mmap_mode="r")
+        self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        self.size = len(self.lengths)
+
+        # Normalized embeddings, zero rows for documents without one
+        self.vectors = None
+        if (path / "vectors.npy").exists():
+            self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+
+    def get_vector(self, idx: int) -> Optional[np.ndarray]:
+        if self.vectors is None:
+            return None
+        vector = np.asarray(self.vectors[idx])
+        return vector if vector.any() else None
+
+    def get_ids(self) -> list[str]:
+        with open(self.path / "ids.json") as f:
+            return json.load(f)
+
+    def get_documents(self, indices) -> list[dict]:
+        documents = []
+        with open(self.path / "documents.jsonl", "rb") as f:
+            for idx in indices:
+                f.seek(int(self.offsets[idx]))
+                documents.append(json.loads(f.readline()))
+        return documents
+
+    def iter_documents(self):
+        with open(self.path / "documents.jsonl", "rb") as f:
+            for line in f:
+                yield json.loads(line)
+
+    @staticmethod
+    def write(path: Path, documents: list[dict], vectors=None):
+        """
+        Write documents, dicts with "id", "text" and "metadata", and
+        optionally their embeddings to `path`
+        """
+        path.mkdir(parents=True)
+        if vectors is not None:
+            np.save(path / "vectors.npy", normalize(vectors))
+
+        postings: dict[str, tuple[list[int], list[int]]] = {}
+        lengths = []
+        offsets = [0]
+        with open(path / "documents.jsonl", "wb") as f:
+            for idx, document in enumerate(documents):
+                tokens = tokenize(document["text"])
+                lengths.append(len(tokens))
+                for term, count in Counter(tokens).items():
+                    indices, counts = postings.setdefault(term, ([], []))
+                    indices.append(idx)
+                    counts.append(count)
+
+                line = json.dumps(document).encode("utf-8") + b"\n"
+                f.write(line)
+                offsets.append(offsets[-1] + len(line))
+
+        terms = {}
+        all_indices = []
+        all_counts = []
+        for term in sorted(postings):
+            indices, counts = postings[term]
+            terms[term] = [len(all_indices), len(all_indices) + len(indices)]
+            all_indices.extend(indices)
+            all_counts.extend(counts)
+
+        np.save(path / "postings.npy", np.array(all_indices, dtype=np.int32))
+        np.save(path / "frequencies.npy", np.array(all_counts, dtype=np.float32))
+        np.save(path / "lengths.npy", np.array(lengths, dtype=np.int32))
+        np.save(path / "offsets.npy", np.array(offsets[:-1], dtype=np.int64))
+        with open(path / "ids.json", "w") as f:
+            json.dump([document["id"] for document in documents], f)
+        with open(path / "terms.json", "w") as f:
+            json.dump(terms, f)
+
+
+class LoadedIndex:
+    """The segments of an index as of one manifest, with live document stats"""
+
+    def __init__(self, path: Path, manifest: dict):
+        self.segments: list[tuple[Segment, np.ndarray]] = []
+        total_length = 0
+        self.size = 0
+
+        for entry in manifest["segments"]:
+            segment = Segment(path / entry["name"])
+            live = np.ones(segment.size, dtype=bool)
+            live[entry["deleted"]] = False
+
+            self.segments.append((segment, live))
+            self.size += int(live.sum())
+            total_length += int(segment.lengths[live].sum())
+
+        self.average_length = total_length / self.size if self.size else 0.0
+        # document id -> (segment index, document index), built on first use
+        self._positions: Optional[dict[str, tuple[int, int]]] = None
+
+    def get_vectors(self, ids: list[str]) -> dict[str, np.ndarray]:
+        if self._positions is None:
+            positions = {}
+            for segment_idx, (segment, live) in enumerate(self.segments):
+                if segment.vectors is None:
+                    continue
+                for idx, id in enumerate(segment.get_ids()):
+                    if live[idx]:
+                        positions[id] = (segment_idx, idx)
+            self._positions = positions
+
+        vectors = {}
+        for id in ids:
+            position = self._positions.get(id)
+            if position is not None:
+                segment_idx, idx = position
+                vector = self.segments[segment_idx][0].get_vector(idx)
+                if vector is not None:
+                    vectors[id] = vector
+        return vectors
+
+    def search(self, query: str, k: int) -> list[dict]:
+        terms = set(tokenize(query))
+        if not terms or not self.size:
+            return []
+
+        # Postings of the query terms, restricted to live documents
+        matches = []
+        document_frequencies = Counter()
+        for segment_idx, (segment, live) in enumerate(self.segments):
+            for term in terms:
+                span = segment.terms.get(term)
+                if span is None:
+                    continue
+                indices = np.asarray(segment.postings[span[0] : span[1]])
+                frequencies = np.asarray(segment.frequencies[span[0] : span[1]])
+                mask = live[indices]
+                matches.append((segment_idx, term, indices[mask], frequencies[mask]))
+                document_frequencies[term] += int(mask.sum())
+
+        scores = [None] * len(self.segments)
+        for segment_idx, term, indices, frequencies in matches:
+            if not len(indices):
+                continue
+            segment = self.segments[segment_idx][0]
+            if scores[segment_idx] is None:
+                scores[segment_idx] = np.zeros(segment.size, dtype=np.float32)
+
+            df = document_frequencies[term]
+            idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            lengths = segment.lengths[indices]
+            scores[segment_idx][indices] += (
+                idf
+                * frequencies
+                * (K1 + 1)
+                / (frequencies + K1 * (1 - B + B * lengths / self.average_length))
+            )
+
+        # Top k over all segments
+        candidates = []
+        for segment_idx, segment_scores in enumerate(scores):
+            if segment_scores is None:
+                continue
+            indices = np.flatnonzero(segment_scores)
+            if len(indices) > k:
+                indices = indices[np.argpartition(-segment_scores[indices], k - 1)[:k]]
+            candidates.extend(
+                (float(segment_scores[idx]), segment_idx, int(idx)) for idx in indices
+            )
+        candidates.sort(key=lambda candidate: -candidate[0])
+        candidates = candidates[:k]
+
+        results = []
+        for score, segment_idx, idx in candidates:
+            segment = self.segments[segment_idx][0]
+            document = segment.get_documents([idx])[0]
+            results.append(
+                {**document, "score": score, "vector": segment.get_vector(idx)}
+            )
+        return results
+
+
+class BM25Index:
+    """
+    BM25 indexes of vector DB collections, kept on disk so hybrid search
+    doesn't have to load and tokenize every chunk of a collection per query.
+
+    An index is a list of immutable segments plus a manifest of the
+    segments and their deleted documents. Adding documents writes a new
+    segment, deleting them only updates the manifest; segments are merged
+    or rewritten once there are many of them or they are mostly deleted.
+    Writers take a lock per collection, readers reload an index when its
+    manifest was replaced.
+
+    If an index can't be updated it is dropped, a collection without an
+    index is indexed again from the vector DB when it is searched. Changes
+    must be applied after writing to the vector DB: a collection's version
+    changes whenever it is written to without an index, and an index is
+    only built if the version didn't change since the collection was read.
+
+    With Redis, changes are broadcast so that instances with another index
+    directory drop their index of the collection. Indexes aren't used while
+    that subscription is down, and all are dropped once it is back.
+    """
+
+    CHANNEL = "open-webui:bm25-index-changed"
+
+    def __init__(
+        self,
+        path: Path,
+        enabled: bool = True,
+        redis_url: str = "",
+        redis_sentinels=[],
+    ):
+        self.path = path
+
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._collection_locks: dict[str, threading.Lock] = {}
+        # collection name -> (manifest stamp, loaded index)
+        self._loaded: dict[str, tuple[tuple, LoadedIndex]] = {}
+
+        self._redis = None
+        self._listening = False
+        if enabled and redis_url:
+            # Instances sharing the directory see each other's changes
+            self._store_id = self._get_store_id()
+            self._redis = get_redis_connection(
+                redis_url, redis_sentinels, decode_responses=True
+            )
+            threading.Thread(
+                target=self._listen, name="bm25-index", daemon=True
+            ).start()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled and (self._redis is None or self._listening)
+
+    def _get_store_id(self) -> str:
+        path = self.path / ".locks" / "store"
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"store.{uuid.uuid4().hex}")
+            tmp_path.write_text(uuid.uuid4().hex)
+            try:
+                # Fails if another instance created it first
+                os.link(tmp_path, path)
+            except FileExistsError:
+                pass
+            finally:
+                tmp_path.unlink()
+        return path.read_text()
+
+    def _publish(self, collection_name: Optional[str]):
+        """Tell other instances that an index changed, None for all of them"""
+        if self._redis is None:
+            return
+        try:
+            self._redis.publish(
+                self.CHANNEL,
+                json.dumps(
+                    {"store_id": self._store_id, "collection_name": collection_name}
+                ),
+            )
+        except Exception as e:
+            log.warning(f"Unable to broadcast change of BM25 index: {e}")
+
+    def _on_change(self, data: str):
+        change = json.loads(data)
+        if change["store_id"] == self._store_id:
+            return
+        if change["collection_name"] is None:
+            self._drop_all()
+        else:
+            self._drop(change["collection_name"])
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                pubsub.subscribe(self.CHANNEL)
+                for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        # Changes may have been missed until now
+                        self._drop_all()
+                        self._listening = True
+                    elif message["type"] == "message":
+                        self._on_change(message["data"])
+            except Exception as e:
+                log.warning(f"Lost BM25 index change notifications: {e}")
+
+            self._listening = False
+            time.sleep(1)
+
+    def _get_path(self, collection_name: str) -> Path:
+        if COLLECTION_NAME_PATTERN.match(collection_name):
+            return self.path / collection_name
+        return self.path / hashlib.sha256(collection_name.encode()).hexdigest()
+
+    @contextmanager
+    def _write_lock(self, collection_name: str):
+        with self._lock:
+            lock = self._collection_locks.setdefault(collection_name, threading.Lock())
+
+        with lock:
+            if fcntl is None:
+                yield
+                return
+
+            locks_path = self.path / ".locks"
+            locks_path.mkdir(parents=True, exist_ok=True)
+            with open(locks_path / self._get_path(collection_name).name, "w") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _get_version_path(self, collection_name: str) -> Path:
+        return self.path / ".locks" / f"{self._get_path(collection_name).name}.version"
+
+    def get_version(self, collection_name: str) -> str:
+        """Changes whenever the collection is written to without an index"""
+        try:
+            return self._get_version_path(collection_name).read_text()
+        except FileNotFoundError:
+            return ""
+
+    def _change_version(self, collection_name: str):
+        # Only called with the write lock held
+        path = self._get_version_path(collection_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(uuid.uuid4().hex)
+
+    @staticmethod
+    def _read_manifest(path: Path) -> Optional[dict]:
+        try:
+            with open(path / "manifest.json") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _write_manifest(path: Path, manifest: dict):
+        tmp_path = path / f"manifest.json.{uuid.uuid4().hex}"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path / "manifest.json")
+
+    @staticmethod
+    def _remove_unused_segments(path: Path, manifest: dict):
+        names = {entry["name"] for entry in manifest["segments"]}
+        for segment_path in path.glob("segment-*"):
+            if segment_path.name not in names:
+                shutil.rmtree(segment_path, ignore_errors=True)
+
+    @staticmethod
+    def _add_segment(path: Path, manifest: dict, documents: list[dict], vectors=None):
+        name = f"segment-{uuid.uuid4().hex}"
+        Segment.write(path / name, documents, vectors)
+        manifest["segments"].append(
+            {"name": name, "size": len(documents), "deleted": []}
+        )
+
+    def _compact(self, path: Path, manifest: dict):
+        """Merge segments if there are too many, rewrite mostly deleted ones"""
+        if len(manifest["segments"]) > MAX_SEGMENTS:
+            rewrite = manifest["segments"]
+        else:
+            rewrite = [
+                entry
+                for entry in manifest["segments"]
+                if len(entry["deleted"]) > entry["size"] * MAX_DELETED_RATIO
+            ]
+        if not rewrite:
+            return
+
+        documents = []
+        vectors = []
+        for entry in rewrite:
+            deleted = set(entry["deleted"])
+            segment = Segment(path / entry["name"])
+            for idx, document in enumerate(segment.iter_documents()):
+                if idx not in deleted:
+                    documents.append(document)
+                    vectors.append(segment.get_vector(idx))
+
+        # Keep the embeddings unless there are none or they don't match
+        dimensions = {len(vector) for vector in vectors if vector is not None}
+        if len(dimensions) == 1:
+            dimension = dimensions.pop()
+            vectors = [
+                vector if vector is not None else np.zeros(dimension, np.float32)
+                for vector in vectors
+            ]
+        else:
+            vectors = None
+
+        manifest["segments"] = [
+            entry for entry in manifest["segments"] if entry not in rewrite
+        ]
+        if documents:
+            self._add_segment(path, manifest, documents, vectors)
+
+    def _update(
+        self,
+        collection_name: str,
+        update,
+        create: bool = False,
+        version: Optional[str] = None,
+    ) -> bool:
+        """
+        Apply `update(path, manifest)` to the manifest of an index. With
+        `version`, only creates an index if there is none and the version
+        of the collection is still the same.
+        """
+        if not self._enabled:
+            return False
+
+        path = self._get_path(collection_name)
+        try:
+            with self._write_lock(collection_name):
+                manifest = self._read_manifest(path)
+                if version is not None:
+                    if manifest is not None:
+                        # Indexed since, from a newer read of the collection
+                        return True
+                    if self.get_version(collection_name) != version:
+                        # Written to since, the documents may be stale
+                        return False
+                if manifest is None:
+                    if not create:
+                        self._change_version(collection_name)
+                        return False
+                    shutil.rmtree(path, ignore_errors=True)
+                    path.mkdir(parents=True)
+                    manifest = {"collection_name": collection_name, "segments": []}
+
+                update(path, manifest)
+                self._compact(path, manifest)
+                self._write_manifest(path, manifest)
+                self._remove_unused_segments(path, manifest)
+                return True
+        except Exception as e:
+            log.exception(f"Error updating BM25 index of {collection_name}: {e}")
+            self._drop(collection_name)
+            return False
+
+    def has(self, collection_name: str) -> bool:
+        return (
+            self.enabled
+            and (self._get_path(collection_name) / "manifest.json").exists()
+        )
+
+    def build(
+        self,
+        collection_name: str,
+        ids: list[str],
+        texts: list[str],
+        metadatas: list[dict],
+        vectors: Optional[list] = None,
+        version: Optional[str] = None,
+    ) -> bool:
+        """
+        Index a whole collection, replacing its index. Pass the `version`
+        of the collection from before reading its documents, so the index
+        isn't built from documents that changed since. False if the index
+        can't be searched.
+        """
+        if not self.enabled:
+            return False
+
+        def update(path: Path, manifest: dict):
+            manifest["segments"] = []
+            documents = [
+                {"id": id, "text": text, "metadata": metadata}
+                for id, text, metadata in zip(ids, texts, metadatas)
+            ]
+            if documents:
+                self._add_segment(path, manifest, documents, vectors)
+
+        return self._update(collection_name, update, create=True, version=version)
+
+    def add(
+        self,
+        collection_name: str,
+        ids: list[str],
+        texts: list[str],
+        metadatas: list[dict],
+        vectors: Optional[list] = None,
+        create: bool = False,
+    ) -> bool:
+        """
+        Add documents, and optionally their embeddings, to the index of a
+        collection. Without `create`, collections that aren't indexed yet
+        are left to be indexed whole.
+        """
+
+        def update(path: Path, manifest: dict):
+            indexed = set()
+            for entry in manifest["segments"]:
+                indexed.update(Segment(path / entry["name"]).get_ids())
+
+            added = [idx for idx, id in enumerate(ids) if id not in indexed]
+            documents = [
+                {"id": ids[idx], "text": texts[idx], "metadata": metadatas[idx]}
+                for idx in added
+            ]
+            if documents:
+                self._add_segment(
+                    path,
+                    manifest,
+                    documents,
+                    [vectors[idx] for idx in added] if vectors is not None else None,
+                )
+
+        updated = self._update(collection_name, update, create=create)
+        self._publish(collection_name)
+        return updated
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ) -> bool:
+        """Delete documents by id, or whose metadata matches all of `filter`"""
+        ids = set(ids) if ids else None
+
+        def matches(document: dict) -> bool:
+            if ids is not None:
+                return document["id"] in ids
+            metadata = document.get("metadata") or {}
+            return all(metadata.get(key) == value for key, value in filter.items())
+
+        def update(path: Path, manifest: dict):
+            for entry in manifest["segments"]:
+                deleted = set(entry["deleted"])
+                segment = Segment(path / entry["name"])
+                for idx, document in enumerate(segment.iter_documents()):
+                    if idx not in deleted and matches(document):
+                        deleted.add(idx)
+                entry["deleted"] = sorted(deleted)
+
+        if ids is None and not filter:
+            return False
+        updated = self._update(collection_name, update)
+        self._publish(collection_name)
+        return updated
+
+    def drop(self, collection_name: str):
+        """Remove the index of a collection"""
+        self._drop(collection_name)
+        self._publish(collection_name)
+
+    def _drop(self, collection_name: str):
+        if not self._enabled:
+            return
+
+        path = self._get_path(collection_name)
+        self._loaded.pop(collection_name, None)
+
+        try:
+            with self._write_lock(collection_name):
+                self._change_version(collection_name)
+                shutil.rmtree(path, ignore_errors=True)
+        except Exception as e:
+            log.exception(f"Error dropping BM25 index of {collection_name}: {e}")
+        self._loaded.pop(collection_name, None)
+
+    def reset(self):
+        """Remove all indexes"""
+        self._drop_all()
+        self._publish(None)
+
+    def _drop_all(self):
+        for path in self.path.glob("*"):
+            if path.is_dir() and path.name != ".locks":
+                manifest = self._read_manifest(path)
+                if manifest is not None:
+                    self._drop(manifest["collection_name"])
+                else:
+                    shutil.rmtree(path, ignore_errors=True)
+        self._loaded = {}
+
+    def _load(self, collection_name: str) -> Optional[LoadedIndex]:
+        path = self._get_path(collection_name)
+        try:
+            stat = os.stat(path / "manifest.json")
+        except FileNotFoundError:
+            self._loaded.pop(collection_name, None)
+            return None
+
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        loaded = self._loaded.get(collection_name)
+        if loaded is not None and loaded[0] == stamp:
+            return loaded[1]
+
+        manifest = self._read_manifest(path)
+        if manifest is None:
+            return None
+        index = LoadedIndex(path, manifest)
+        self._loaded[collection_name] = (stamp, index)
+        return index
+
+    def get_vectors(self, collection_name: str, ids: list[str]) -> dict:
+        """Normalized embeddings of the documents that were indexed with one"""
+        if not self.enabled:
+            return {}
+        try:
+            index = self._load(collection_name)
+            return index.get_vectors(ids) if index is not None else {}
+        except Exception as e:
+            log.warning(f"Error reading embeddings of {collection_name}: {e}")
+            return {}
+
+    def search(self, collection_name: str, query: str, k: int) -> Optional[list]:
+        """
+        The `k` documents of a collection scoring highest for `query`, as
+        dicts with "id", "text", "metadata", "score" and "vector" (None if
+        not indexed with one). None if the collection isn't indexed.
+        """
+        if not self.enabled:
+            return None
+
+        for attempt in range(2):
+            index = self._load(collection_name)
+            if index is None:
+                return None
+            try:
+                return index.search(query, k)
+            except FileNotFoundError:
+                # Segments were replaced since the index was loaded
+                self._loaded.pop(collection_name, None)
+                if attempt:
+                    raise
+
+
+bm25_index = BM25Index(
+    BM25_INDEX_DIR,
+    enabled=ENABLE_BM25_INDEX,
+    redis_url=REDIS_URL,
+    redis_sentinels=get_sentinels_from_env(REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT),
+)
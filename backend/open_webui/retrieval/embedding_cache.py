@@ -0,0 +1,368 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from open_webui.env import (
+    EMBEDDING_STORE_DIR,
+    EMBEDDING_STORE_MAX_SIZE,
+    ENABLE_EMBEDDING_STORE,
+    RAG_EMBEDDING_CACHE_REDIS,
+    RAG_EMBEDDING_CACHE_SIZE,
+    RAG_EMBEDDING_CACHE_TTL,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    REDIS_URL,
+    SRC_LOG_LEVELS,
+)
+from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+REDIS_KEY_PREFIX = "open-webui:embedding:"
+# Keys per SQL statement, below SQLite's limit of bound parameters
+STORE_QUERY_SIZE = 500
+
+
+def get_key(engine: str, model: str, prefix: Optional[str], text: str) -> str:
+    key = "\0".join([engine, model, prefix or "", text])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Embeddings of texts, keyed by engine, model, prefix and text hash.
+
+    Up to `max_size` embeddings are kept in memory for `ttl` seconds and
+    evicted least recently used first. With a Redis URL they are also
+    stored in Redis for `ttl` seconds, so that instances share them and
+    they survive restarts. Redis errors only count as misses.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: int = 86400,
+        redis_url: Optional[str] = None,
+        redis_sentinels: Optional[list] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._embeddings: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._redis = None
+        if redis_url and max_size:
+            self._redis = get_redis_connection(
+                redis_url, redis_sentinels, decode_responses=False
+            )
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.calls_saved = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._embeddings),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "calls_saved": self.calls_saved,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._embeddings.clear()
+
+    def _set_local(self, embeddings: dict[str, np.ndarray]):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, embedding in embeddings.items():
+                self._embeddings[key] = (expires_at, embedding)
+                self._embeddings.move_to_end(key)
+            while len(self._embeddings) > self.max_size:
+                self._embeddings.popitem(last=False)
+
+    def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        """The cached embeddings of `keys`, missing keys are left out"""
+        if not self.max_size:
+            return {}
+
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._embeddings.get(key)
+                if entry is None:
+                    continue
+                if entry[0] < now:
+                    del self._embeddings[key]
+                    continue
+                self._embeddings.move_to_end(key)
+                found[key] = entry[1]
+
+        missing = [key for key in keys if key not in found]
+        if self._redis is not None and missing:
+            try:
+                values = self._redis.mget([REDIS_KEY_PREFIX + key for key in missing])
+            except Exception as e:
+                log.warning(f"Error reading embeddings from Redis: {e}")
+                values = []
+
+            fetched = {
+                key: np.frombuffer(value, dtype=np.float32)
+                for key, value in zip(missing, values)
+                if value is not None
+            }
+            self.redis_hits += len(fetched)
+            self._set_local(fetched)
+            found.update(fetched)
+
+        return found
+
+    def set_many(self, embeddings: dict[str, np.ndarray]):
+        if not self.max_size or not embeddings:
+            return
+
+        self._set_local(embeddings)
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for key, embedding in embeddings.items():
+                    pipe.set(REDIS_KEY_PREFIX + key, embedding.tobytes(), ex=self.ttl)
+                pipe.execute()
+            except Exception as e:
+                log.warning(f"Error writing embeddings to Redis: {e}")
+
+    def wrap(self, embedding_function: Callable, engine: str, model: str) -> Callable:
+        """
+        Wrap an embedding function `(query, prefix=None, user=None)` so that
+        only texts without a cached embedding are embedded, in one call.
+        """
+        if not self.max_size:
+            return embedding_function
+
+        def cached_embedding_function(query, prefix=None, user=None):
+            texts = query if isinstance(query, list) else [query]
+            keys = [get_key(engine, model, prefix, text) for text in texts]
+
+            embeddings = self.get_many(keys)
+
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in embeddings:
+                    missing.setdefault(key, text)
+
+            lookups = len(set(keys))
+            self.hits += lookups - len(missing)
+            self.misses += len(missing)
+
+            if missing:
+                computed = embedding_function(
+                    list(missing.values()), prefix=prefix, user=user
+                )
+                if computed is None:
+                    return None
+
+                computed = {
+                    key: np.asarray(embedding, dtype=np.float32)
+                    for key, embedding in zip(missing.keys(), computed)
+                }
+                self.set_many(computed)
+                embeddings.update(computed)
+            elif keys:
+                self.calls_saved += 1
+
+            result = [embeddings[key].tolist() for key in keys]
+            return result if isinstance(query, list) else result[0]
+
+        return cached_embedding_function
+
+
+class EmbeddingStore(EmbeddingCache):
+    """
+    Embeddings of texts on disk, keyed like EmbeddingCache, in a SQLite
+    database in `store_dir`. Least recently used embeddings are evicted
+    once they take more than `max_size` bytes. Database errors only count
+    as misses.
+    """
+
+    def __init__(self, store_dir: Path, max_size: int):
+        self.store_dir = Path(store_dir)
+        self.max_size = max_size
+
+        self._conn: Optional[sqlite3.Connection] = None
+        # Bytes of stored embeddings, approximate when several processes
+        # share the store and recounted before evicting
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.calls_saved = 0
+        self.evictions = 0
+
+    def _get_conn(self) -> sqlite3.Connection:
+        # Only called with the lock held
+        if self._conn is None:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.store_dir / "embeddings.db", timeout=30, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding ("
+                "key TEXT PRIMARY KEY, embedding BLOB NOT NULL, used_at INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS embedding_used_at ON embedding (used_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _count_size(self, conn: sqlite3.Connection) -> int:
+        return conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(embedding)), 0) FROM embedding"
+        ).fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            try:
+                conn = self._get_conn()
+                entries = conn.execute("SELECT COUNT(*) FROM embedding").fetchone()[0]
+                self._size = self._count_size(conn)
+            except sqlite3.Error as e:
+                log.warning(f"Error reading embedding store: {e}")
+                entries = None
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "calls_saved": self.calls_saved,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size": self._size,
+            "max_size": self.max_size,
+        }
+
+    def clear(self):
+        with self._lock:
+            try:
+                conn = self._get_conn()
+                conn.execute("DELETE FROM embedding")
+                conn.commit()
+                self._size = 0
+            except sqlite3.Error as e:
+                log.warning(f"Error clearing embedding store: {e}")
+
+    def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        if not self.max_size:
+            return {}
+
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            try:
+                conn = self._get_conn()
+                for i in range(0, len(keys), STORE_QUERY_SIZE):
+                    batch = keys[i : i + STORE_QUERY_SIZE]
+                    placeholders = ",".join("?" * len(batch))
+                    for key, embedding in conn.execute(
+                        f"SELECT key, embedding FROM embedding WHERE key IN ({placeholders})",
+                        batch,
+                    ):
+                        found[key] = np.frombuffer(embedding, dtype=np.float32)
+
+                used = list(found)
+                for i in range(0, len(used), STORE_QUERY_SIZE):
+                    batch = used[i : i + STORE_QUERY_SIZE]
+                    placeholders = ",".join("?" * len(batch))
+                    conn.execute(
+                        f"UPDATE embedding SET used_at = ? WHERE key IN ({placeholders})",
+                        [int(time.time()), *batch],
+                    )
+                conn.commit()
+            except sqlite3.Error as e:
+                log.warning(f"Error reading embedding store: {e}")
+
+        return found
+
+    def set_many(self, embeddings: dict[str, np.ndarray]):
+        if not self.max_size or not embeddings:
+            return
+
+        with self._lock:
+            try:
+                conn = self._get_conn()
+                if self._size is None:
+                    self._size = self._count_size(conn)
+
+                now = int(time.time())
+                for key, embedding in embeddings.items():
+                    data = embedding.tobytes()
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO embedding (key, embedding, used_at) VALUES (?, ?, ?)",
+                        (key, data, now),
+                    )
+                    self._size += len(data) * cursor.rowcount
+                conn.commit()
+
+                if self._size > self.max_size:
+                    self._evict(conn)
+            except sqlite3.Error as e:
+                log.warning(f"Error writing embedding store: {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Evict down to 90% of max_size, so that not every insert evicts
+        self._size = self._count_size(conn)
+        excess = self._size - int(self.max_size * 0.9)
+        if self._size <= self.max_size or excess <= 0:
+            return
+
+        evicted = []
+        cursor = conn.execute(
+            "SELECT key, LENGTH(embedding) FROM embedding ORDER BY used_at"
+        )
+        for key, size in cursor:
+            evicted.append(key)
+            excess -= size
+            self._size -= size
+            if excess <= 0:
+                break
+        cursor.close()
+
+        for i in range(0, len(evicted), STORE_QUERY_SIZE):
+            batch = evicted[i : i + STORE_QUERY_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            conn.execute(f"DELETE FROM embedding WHERE key IN ({placeholders})", batch)
+        conn.commit()
+
+        self.evictions += len(evicted)
+        log.info(f"Evicted {len(evicted)} embeddings from the embedding store")
+
+
+embedding_cache = EmbeddingCache(
+    max_size=RAG_EMBEDDING_CACHE_SIZE,
+    ttl=RAG_EMBEDDING_CACHE_TTL,
+    redis_url=REDIS_URL if RAG_EMBEDDING_CACHE_REDIS else None,
+    redis_sentinels=get_sentinels_from_env(REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT),
+)
+
+embedding_store = EmbeddingStore(
+    EMBEDDING_STORE_DIR,
+    max_size=EMBEDDING_STORE_MAX_SIZE if ENABLE_EMBEDDING_STORE else 0,
+)
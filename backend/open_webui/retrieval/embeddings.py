@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import random
+import threading
+from typing import Any, Coroutine, Optional
+
+import aiohttp
+
+from open_webui.env import (
+    AIOHTTP_CLIENT_SESSION_SSL,
+    AIOHTTP_CLIENT_TIMEOUT,
+    RAG_EMBEDDING_CONCURRENT_REQUESTS,
+    RAG_EMBEDDING_MAX_RETRIES,
+    SRC_LOG_LEVELS,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+# Longest wait between two attempts of a request, in seconds
+MAX_RETRY_DELAY = 30.0
+
+
+class EmbeddingClient:
+    """
+    Sends requests to embedding APIs over one pooled aiohttp session.
+
+    The session lives on an event loop in a background thread, which lets
+    synchronous callers (`run`) and coroutines on other loops (`arun`)
+    share its connections. At most `concurrency` requests are in flight,
+    requests failing with 429, 5xx or a connection error are retried up to
+    `max_retries` times with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        max_retries: int = 3,
+        timeout: Optional[int] = None,
+    ):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=loop.run_forever, name="embedding-client", daemon=True
+                )
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro: Coroutine) -> Any:
+        """Run a coroutine on the client's loop and wait for its result"""
+        loop = self._get_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("EmbeddingClient.run called from its own loop")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def arun(self, coro: Coroutine) -> Any:
+        """Run a coroutine on the client's loop from another event loop"""
+        loop = self._get_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Only called on the client's loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trust_env=True,
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    def _get_retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_DELAY)
+            except ValueError:
+                pass
+        # Exponential backoff with jitter, so retries of concurrent
+        # batches don't hit the API at the same time again
+        return min(0.5 * 2**attempt, MAX_RETRY_DELAY) * random.uniform(0.5, 1.0)
+
+    async def post(self, url: str, headers: dict, json: dict) -> dict:
+        """POST `json` to `url` and return the JSON response"""
+        session = self._get_session()
+
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    async with session.post(
+                        url, headers=headers, json=json, ssl=AIOHTTP_CLIENT_SESSION_SSL
+                    ) as r:
+                        if r.status == 429 or r.status >= 500:
+                            retry_after = r.headers.get("Retry-After")
+                            error = f"{r.status} {r.reason}"
+                        else:
+                            r.raise_for_status()
+                            return await r.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+
+            if attempt >= self.max_retries:
+                raise Exception(f"Request to {url} failed: {error}")
+
+            delay = self._get_retry_delay(attempt, retry_after)
+            attempt += 1
+            log.warning(
+                f"Request to {url} failed ({error}), retry {attempt}/{self.max_retries} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+    def shutdown(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+
+        async def close_session():
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_session(), loop).result(timeout=5)
+        except Exception as e:
+            log.warning(f"Error closing embedding client session: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+
+embedding_client = EmbeddingClient(
+    concurrency=RAG_EMBEDDING_CONCURRENT_REQUESTS,
+    max_retries=RAG_EMBEDDING_MAX_RETRIES,
+    timeout=AIOHTTP_CLIENT_TIMEOUT,
+)
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from open_webui.env import (
+    RAG_RERANKING_BATCH_SIZE,
+    RAG_RERANKING_CACHE_SIZE,
+    SRC_LOG_LEVELS,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+def get_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Reranker:
+    """
+    Scores (query, chunk) pairs with a reranking model, e.g. a CrossEncoder.
+
+    Pairs passed to one `predict` call are deduplicated and sent to the
+    model in one call, in batches of `batch_size`. Scores are kept in an
+    LRU cache of `cache_size` entries keyed by model, query hash and chunk
+    hash (chunks have no stable id across retrievers, so identical chunk
+    text shares a score).
+
+    Models that score one query at a time, like ColBERT or an external
+    reranker API, get one call per distinct query (`single_query`).
+    """
+
+    def __init__(
+        self,
+        reranking_function: Any,
+        model: str,
+        single_query: bool = False,
+        batch_size: int = RAG_RERANKING_BATCH_SIZE,
+        cache_size: int = RAG_RERANKING_CACHE_SIZE,
+    ):
+        self.reranking_function = reranking_function
+        self.model = model
+        self.single_query = single_query
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+
+        self._scores: OrderedDict[Tuple[str, str, str], float] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._scores),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _get_cached(self, key) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+            return score
+
+    def _set_cached(self, scores: dict):
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._scores.update(scores)
+            for key in scores:
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+
+    def _score(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        if self.single_query:
+            queries: dict[str, list[int]] = {}
+            for idx, (query, _) in enumerate(pairs):
+                queries.setdefault(query, []).append(idx)
+
+            scores = [0.0] * len(pairs)
+            for query, indices in queries.items():
+                query_scores = self.reranking_function.predict(
+                    [pairs[idx] for idx in indices]
+                )
+                if query_scores is None:
+                    raise Exception(f"Reranking with {self.model} failed")
+                for idx, score in zip(indices, list(query_scores)):
+                    scores[idx] = float(score)
+            return scores
+
+        scores = self.reranking_function.predict(pairs, batch_size=self.batch_size)
+        if scores is None:
+            raise Exception(f"Reranking with {self.model} failed")
+        return [float(score) for score in scores]
+
+    def predict(self, sentences: List[Tuple[str, str]]) -> List[float]:
+        """Scores of (query, chunk) pairs, in order"""
+        query_hashes = {}
+        keys = []
+        for query, document in sentences:
+            if query not in query_hashes:
+                query_hashes[query] = get_hash(query)
+            keys.append((self.model, query_hashes[query], get_hash(document)))
+
+        scores = {}
+        missing = {}
+        for key, pair in zip(keys, sentences):
+            if key in scores or key in missing:
+                continue
+            score = self._get_cached(key)
+            if score is None:
+                missing[key] = pair
+            else:
+                scores[key] = score
+
+        self.hits += len(scores)
+        self.misses += len(missing)
+        if missing:
+            log.debug(
+                f"Reranker:predict:model {self.model} {len(missing)} of {len(sentences)} pairs"
+            )
+            computed = dict(zip(missing.keys(), self._score(list(missing.values()))))
+            self._set_cached(computed)
+            scores.update(computed)
+
+        return [scores[key] for key in keys]
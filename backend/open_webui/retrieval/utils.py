@@ -1,8 +1,8 @@
+import asyncio
 import logging
 import os
 from typing import Optional, Union
 
-import requests
 import hashlib
 from concurrent.futures import ThreadPoolExecutor
 
@@ -18,6 +18,9 @@ from open_webui.models.users import UserModel
 from open_webui.models.files import Files
 
 from open_webui.retrieval.vector.main import GetResult
+from open_webui.retrieval.bm25 import bm25_index, normalize
+from open_webui.retrieval.embedding_cache import EmbeddingCache, embedding_cache
+from open_webui.retrieval.embeddings import embedding_client
 
 
 from open_webui.env import (
@@ -45,6 +48,9 @@ class VectorSearchRetriever(BaseRetriever):
     collection_name: Any
     embedding_function: Any
     top_k: int
+    # Embeddings of the queries and of the documents found, if given
+    query_vectors: Optional[dict] = None
+    vectors: Optional[dict] = None
 
     def _get_relevant_documents(
         self,
@@ -52,9 +58,13 @@ class VectorSearchRetriever(BaseRetriever):
         *,
         run_manager: CallbackManagerForRetrieverRun,
     ) -> list[Document]:
+        query_vector = self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)
+        if self.query_vectors is not None:
+            self.query_vectors[query] = query_vector
+
         result = VECTOR_DB_CLIENT.search(
             collection_name=self.collection_name,
-            vectors=[self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)],
+            vectors=[query_vector],
             limit=self.top_k,
         )
 
@@ -62,10 +72,15 @@ class VectorSearchRetriever(BaseRetriever):
         metadatas = result.metadatas[0]
         documents = result.documents[0]
 
+        if self.vectors is not None:
+            # Vector DBs don't return the embeddings, the BM25 index has them
+            self.vectors.update(bm25_index.get_vectors(self.collection_name, ids))
+
         results = []
         for idx in range(len(ids)):
             results.append(
                 Document(
+                    id=ids[idx],
                     metadata=metadatas[idx],
                     page_content=documents[idx],
                 )
@@ -73,6 +88,34 @@ class VectorSearchRetriever(BaseRetriever):
         return results
 
 
+class BM25IndexRetriever(BaseRetriever):
+    collection_name: Any
+    k: int
+    # Embeddings of the documents found, if given
+    vectors: Optional[dict] = None
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        results = bm25_index.search(self.collection_name, query, self.k) or []
+        if self.vectors is not None:
+            for result in results:
+                if result["vector"] is not None:
+                    self.vectors[result["id"]] = result["vector"]
+
+        return [
+            Document(
+                id=result["id"],
+                metadata=result["metadata"] or {},
+                page_content=result["text"],
+            )
+            for result in results
+        ]
+
+
 def query_doc(
     collection_name: str, query_embedding: list[float], k: int, user: UserModel = None
 ):
@@ -107,63 +150,101 @@ def get_doc(collection_name: str, user: UserModel = None):
         raise e
 
 
-def query_doc_with_hybrid_search(
+def get_hybrid_search_retriever(
     collection_name: str,
-    collection_result: GetResult,
-    query: str,
+    collection_result: Optional[GetResult],
     embedding_function,
     k: int,
-    reranking_function,
-    k_reranker: int,
-    r: float,
-) -> dict:
-    try:
-        log.debug(f"query_doc_with_hybrid_search:doc {collection_name}")
+    query_vectors: Optional[dict] = None,
+    vectors: Optional[dict] = None,
+) -> EnsembleRetriever:
+    """
+    BM25 and vector search combined. Embeddings of the queries and the
+    documents found are added to `query_vectors` and `vectors` if given.
+    """
+    if collection_result is None:
+        # Collection is indexed, see bm25_index
+        bm25_retriever = BM25IndexRetriever(
+            collection_name=collection_name, k=k, vectors=vectors
+        )
+    else:
         bm25_retriever = BM25Retriever.from_texts(
             texts=collection_result.documents[0],
             metadatas=collection_result.metadatas[0],
         )
         bm25_retriever.k = k
 
-        vector_search_retriever = VectorSearchRetriever(
-            collection_name=collection_name,
-            embedding_function=embedding_function,
-            top_k=k,
+    vector_search_retriever = VectorSearchRetriever(
+        collection_name=collection_name,
+        embedding_function=embedding_function,
+        top_k=k,
+        query_vectors=query_vectors,
+        vectors=vectors,
+    )
+
+    return EnsembleRetriever(
+        retrievers=[bm25_retriever, vector_search_retriever], weights=[0.5, 0.5]
+    )
+
+
+def get_hybrid_search_result(documents: list[Document], k: int, k_reranker: int):
+    distances = [d.metadata.get("score") for d in documents]
+    contents = [d.page_content for d in documents]
+    metadatas = [d.metadata for d in documents]
+
+    # retrieve only min(k, k_reranker) items, sort and cut by distance if k < k_reranker
+    if k < k_reranker and documents:
+        sorted_items = sorted(
+            zip(distances, metadatas, contents), key=lambda x: x[0], reverse=True
         )
+        sorted_items = sorted_items[:k]
+        distances, metadatas, contents = map(list, zip(*sorted_items))
+
+    return {
+        "distances": [distances],
+        "documents": [contents],
+        "metadatas": [metadatas],
+    }
+
 
-        ensemble_retriever = EnsembleRetriever(
-            retrievers=[bm25_retriever, vector_search_retriever], weights=[0.5, 0.5]
+def query_doc_with_hybrid_search(
+    collection_name: str,
+    collection_result: Optional[GetResult],
+    query: str,
+    embedding_function,
+    k: int,
+    reranking_function,
+    k_reranker: int,
+    r: float,
+) -> dict:
+    try:
+        log.debug(f"query_doc_with_hybrid_search:doc {collection_name}")
+        query_vectors = {}
+        vectors = {}
+        ensemble_retriever = get_hybrid_search_retriever(
+            collection_name,
+            collection_result,
+            embedding_function,
+            k,
+            query_vectors=query_vectors,
+            vectors=vectors,
         )
         compressor = RerankCompressor(
             embedding_function=embedding_function,
             top_n=k_reranker,
             reranking_function=reranking_function,
             r_score=r,
+            query_vectors=query_vectors,
+            vectors=vectors,
         )
 
         compression_retriever = ContextualCompressionRetriever(
             base_compressor=compressor, base_retriever=ensemble_retriever
         )
 
-        result = compression_retriever.invoke(query)
-
-        distances = [d.metadata.get("score") for d in result]
-        documents = [d.page_content for d in result]
-        metadatas = [d.metadata for d in result]
-
-        # retrieve only min(k, k_reranker) items, sort and cut by distance if k < k_reranker
-        if k < k_reranker:
-            sorted_items = sorted(
-                zip(distances, metadatas, documents), key=lambda x: x[0], reverse=True
-            )
-            sorted_items = sorted_items[:k]
-            distances, documents, metadatas = map(list, zip(*sorted_items))
-
-        result = {
-            "distances": [distances],
-            "documents": [documents],
-            "metadatas": [metadatas],
-        }
+        result = get_hybrid_search_result(
+            compression_retriever.invoke(query), k, k_reranker
+        )
 
         log.info(
             "query_doc_with_hybrid_search:result "
@@ -316,10 +397,18 @@ def query_collection_with_hybrid_search(
 ) -> dict:
     results = []
     error = False
-    # Fetch collection data once per collection sequentially
+    # Fetch collection data once per collection sequentially, unless the
+    # collection has a BM25 index. Collections without one are indexed so
+    # later queries don't need to fetch them.
     # Avoid fetching the same data multiple times later
     collection_results = {}
+    indexed_collection_names = set()
     for collection_name in collection_names:
+        if bm25_index.has(collection_name):
+            indexed_collection_names.add(collection_name)
+            continue
+
+        version = bm25_index.get_version(collection_name)
         try:
             log.debug(
                 f"query_collection_with_hybrid_search:VECTOR_DB_CLIENT.get:collection {collection_name}"
@@ -330,24 +419,42 @@ def query_collection_with_hybrid_search(
         except Exception as e:
             log.exception(f"Failed to fetch collection {collection_name}: {e}")
             collection_results[collection_name] = None
+            continue
+
+        collection_result = collection_results[collection_name]
+        if collection_result is not None and bm25_index.build(
+            collection_name,
+            collection_result.ids[0],
+            collection_result.documents[0],
+            collection_result.metadatas[0],
+            version=version,
+        ):
+            indexed_collection_names.add(collection_name)
 
     log.info(
         f"Starting hybrid search for {len(queries)} queries in {len(collection_names)} collections..."
     )
 
+    # Embeddings found along the way, reused to score the candidates
+    # when there is no reranking function
+    query_vectors = {}
+    vectors = {}
+
     def process_query(collection_name, query):
         try:
-            result = query_doc_with_hybrid_search(
-                collection_name=collection_name,
-                collection_result=collection_results[collection_name],
-                query=query,
-                embedding_function=embedding_function,
-                k=k,
-                reranking_function=reranking_function,
-                k_reranker=k_reranker,
-                r=r,
+            retriever = get_hybrid_search_retriever(
+                collection_name,
+                (
+                    None
+                    if collection_name in indexed_collection_names
+                    else collection_results[collection_name]
+                ),
+                embedding_function,
+                k,
+                query_vectors=query_vectors,
+                vectors=vectors,
             )
-            return result, None
+            return retriever.invoke(query), None
         except Exception as e:
             log.exception(f"Error when querying the collection with hybrid_search: {e}")
             return None, e
@@ -357,7 +464,7 @@ def query_collection_with_hybrid_search(
     tasks = [
         (cn, q)
         for cn in collection_names
-        if collection_results[cn] is not None
+        if cn in indexed_collection_names or collection_results[cn] is not None
         for q in queries
     ]
 
@@ -365,11 +472,29 @@ def query_collection_with_hybrid_search(
         future_results = [executor.submit(process_query, cn, q) for cn, q in tasks]
         task_results = [future.result() for future in future_results]
 
-    for result, err in task_results:
+    candidates = []
+    for (_, query), (documents, err) in zip(tasks, task_results):
         if err is not None:
             error = True
-        elif result is not None:
-            results.append(result)
+        elif documents is not None:
+            candidates.append((query, documents))
+
+    # Rerank the candidates of all tasks at once, so chunks found for
+    # several queries or collections are scored once and in one batch
+    compressor = RerankCompressor(
+        embedding_function=embedding_function,
+        top_n=k_reranker,
+        reranking_function=reranking_function,
+        r_score=r,
+        query_vectors=query_vectors,
+        vectors=vectors,
+    )
+    try:
+        for documents in compressor.compress_queries(candidates):
+            results.append(get_hybrid_search_result(documents, k, k_reranker))
+    except Exception as e:
+        log.exception(f"Error when reranking hybrid search results: {e}")
+        error = True
 
     if error and not results:
         raise Exception(
@@ -386,43 +511,37 @@ def get_embedding_function(
     url,
     key,
     embedding_batch_size,
+    cache: Optional[EmbeddingCache] = embedding_cache,
 ):
+    """
+    The embedding function of an engine and model. Unless `cache` is None,
+    embeddings are looked up in the cache first and only missing texts are
+    embedded.
+    """
     if embedding_engine == "":
-        return lambda query, prefix=None, user=None: embedding_function.encode(
+        func = lambda query, prefix=None, user=None: embedding_function.encode(
             query, **({"prompt": prefix} if prefix else {})
         ).tolist()
     elif embedding_engine in ["ollama", "openai"]:
+        # Lists are split into batches of embedding_batch_size, which are
+        # sent concurrently
         func = lambda query, prefix=None, user=None: generate_embeddings(
             engine=embedding_engine,
             model=embedding_model,
             text=query,
             prefix=prefix,
+            batch_size=embedding_batch_size,
             url=url,
             key=key,
             user=user,
         )
-
-        def generate_multiple(query, prefix, user, func):
-            if isinstance(query, list):
-                embeddings = []
-                for i in range(0, len(query), embedding_batch_size):
-                    embeddings.extend(
-                        func(
-                            query[i : i + embedding_batch_size],
-                            prefix=prefix,
-                            user=user,
-                        )
-                    )
-                return embeddings
-            else:
-                return func(query, prefix, user)
-
-        return lambda query, prefix=None, user=None: generate_multiple(
-            query, prefix, user, func
-        )
     else:
         raise ValueError(f"Unknown embedding engine: {embedding_engine}")
 
+    if cache is None:
+        return func
+    return cache.wrap(func, embedding_engine, embedding_model)
+
 
 def get_sources_from_files(
     request,
@@ -636,7 +755,24 @@ def get_model_path(model: str, update_model: bool = False):
         return model
 
 
-def generate_openai_batch_embeddings(
+def get_embedding_headers(key: str = "", user: UserModel = None) -> dict:
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {key}",
+        **(
+            {
+                "X-OpenWebUI-User-Name": user.name,
+                "X-OpenWebUI-User-Id": user.id,
+                "X-OpenWebUI-User-Email": user.email,
+                "X-OpenWebUI-User-Role": user.role,
+            }
+            if ENABLE_FORWARD_USER_INFO_HEADERS and user
+            else {}
+        ),
+    }
+
+
+async def agenerate_openai_batch_embeddings(
     model: str,
     texts: list[str],
     url: str = "https://api.openai.com/v1",
@@ -652,36 +788,21 @@ def generate_openai_batch_embeddings(
         if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
             json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
 
-        r = requests.post(
+        data = await embedding_client.post(
             f"{url}/embeddings",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {key}",
-                **(
-                    {
-                        "X-OpenWebUI-User-Name": user.name,
-                        "X-OpenWebUI-User-Id": user.id,
-                        "X-OpenWebUI-User-Email": user.email,
-                        "X-OpenWebUI-User-Role": user.role,
-                    }
-                    if ENABLE_FORWARD_USER_INFO_HEADERS and user
-                    else {}
-                ),
-            },
+            headers=get_embedding_headers(key, user),
             json=json_data,
         )
-        r.raise_for_status()
-        data = r.json()
         if "data" in data:
             return [elem["embedding"] for elem in data["data"]]
         else:
-            raise "Something went wrong :/"
+            raise Exception("Something went wrong :/")
     except Exception as e:
         log.exception(f"Error generating openai batch embeddings: {e}")
         return None
 
 
-def generate_ollama_batch_embeddings(
+async def agenerate_ollama_batch_embeddings(
     model: str,
     texts: list[str],
     url: str,
@@ -697,43 +818,40 @@ def generate_ollama_batch_embeddings(
         if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
             json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
 
-        r = requests.post(
+        data = await embedding_client.post(
             f"{url}/api/embed",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {key}",
-                **(
-                    {
-                        "X-OpenWebUI-User-Name": user.name,
-                        "X-OpenWebUI-User-Id": user.id,
-                        "X-OpenWebUI-User-Email": user.email,
-                        "X-OpenWebUI-User-Role": user.role,
-                    }
-                    if ENABLE_FORWARD_USER_INFO_HEADERS
-                    else {}
-                ),
-            },
+            headers=get_embedding_headers(key, user),
             json=json_data,
         )
-        r.raise_for_status()
-        data = r.json()
-
         if "embeddings" in data:
             return data["embeddings"]
         else:
-            raise "Something went wrong :/"
+            raise Exception("Something went wrong :/")
     except Exception as e:
         log.exception(f"Error generating ollama batch embeddings: {e}")
         return None
 
 
-def generate_embeddings(
+def generate_openai_batch_embeddings(*args, **kwargs) -> Optional[list[list[float]]]:
+    return embedding_client.run(agenerate_openai_batch_embeddings(*args, **kwargs))
+
+
+def generate_ollama_batch_embeddings(*args, **kwargs) -> Optional[list[list[float]]]:
+    return embedding_client.run(agenerate_ollama_batch_embeddings(*args, **kwargs))
+
+
+async def agenerate_embeddings(
     engine: str,
     model: str,
     text: Union[str, list[str]],
     prefix: Union[str, None] = None,
+    batch_size: Optional[int] = None,
     **kwargs,
 ):
+    """
+    Embed a text, or a list of texts in batches of `batch_size` that are
+    sent concurrently. Returns None if any batch fails.
+    """
     url = kwargs.get("url", "")
     key = kwargs.get("key", "")
     user = kwargs.get("user")
@@ -745,39 +863,40 @@ def generate_embeddings(
             text = f"{prefix}{text}"
 
     if engine == "ollama":
-        if isinstance(text, list):
-            embeddings = generate_ollama_batch_embeddings(
-                **{
-                    "model": model,
-                    "texts": text,
-                    "url": url,
-                    "key": key,
-                    "prefix": prefix,
-                    "user": user,
-                }
-            )
-        else:
-            embeddings = generate_ollama_batch_embeddings(
-                **{
-                    "model": model,
-                    "texts": [text],
-                    "url": url,
-                    "key": key,
-                    "prefix": prefix,
-                    "user": user,
-                }
-            )
-        return embeddings[0] if isinstance(text, str) else embeddings
+        generate_batch_embeddings = agenerate_ollama_batch_embeddings
     elif engine == "openai":
-        if isinstance(text, list):
-            embeddings = generate_openai_batch_embeddings(
-                model, text, url, key, prefix, user
-            )
-        else:
-            embeddings = generate_openai_batch_embeddings(
-                model, [text], url, key, prefix, user
+        generate_batch_embeddings = agenerate_openai_batch_embeddings
+    else:
+        raise ValueError(f"Unknown embedding engine: {engine}")
+
+    texts = text if isinstance(text, list) else [text]
+    batch_size = batch_size or len(texts) or 1
+    batches = await asyncio.gather(
+        *(
+            generate_batch_embeddings(
+                model, texts[i : i + batch_size], url, key, prefix, user
             )
-        return embeddings[0] if isinstance(text, str) else embeddings
+            for i in range(0, len(texts), batch_size)
+        )
+    )
+
+    if any(batch is None for batch in batches):
+        return None
+
+    embeddings = [embedding for batch in batches for embedding in batch]
+    return embeddings[0] if isinstance(text, str) else embeddings
+
+
+def generate_embeddings(
+    engine: str,
+    model: str,
+    text: Union[str, list[str]],
+    prefix: Union[str, None] = None,
+    **kwargs,
+):
+    return embedding_client.run(
+        agenerate_embeddings(engine, model, text, prefix=prefix, **kwargs)
+    )
 
 
 import operator
@@ -792,6 +911,10 @@ class RerankCompressor(BaseDocumentCompressor):
     top_n: int
     reranking_function: Any
     r_score: float
+    # Known embeddings of queries and of documents by id, the rest are
+    # embedded when scoring without a reranking function
+    query_vectors: Optional[dict] = None
+    vectors: Optional[dict] = None
 
     class Config:
         extra = "forbid"
@@ -803,24 +926,112 @@ class RerankCompressor(BaseDocumentCompressor):
         query: str,
         callbacks: Optional[Callbacks] = None,
     ) -> Sequence[Document]:
+        return self.compress_queries([(query, documents)])[0]
+
+    def compress_queries(
+        self, items: Sequence[tuple[str, Sequence[Document]]]
+    ) -> list[list[Document]]:
+        """
+        Rerank the documents of several queries. With a reranking function
+        all (query, document) pairs are scored in one call.
+        """
         reranking = self.reranking_function is not None
 
         if reranking:
-            scores = self.reranking_function.predict(
-                [(query, doc.page_content) for doc in documents]
-            )
+            pairs = [
+                (query, doc.page_content)
+                for query, documents in items
+                for doc in documents
+            ]
+            scores = self.reranking_function.predict(pairs) if pairs else []
+            if not isinstance(scores, list):
+                scores = scores.tolist()
+
+            item_scores = []
+            position = 0
+            for _, documents in items:
+                item_scores.append(scores[position : position + len(documents)])
+                position += len(documents)
         else:
-            from sentence_transformers import util
-
-            query_embedding = self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)
-            document_embedding = self.embedding_function(
-                [doc.page_content for doc in documents], RAG_EMBEDDING_CONTENT_PREFIX
+            item_scores = self._get_similarity_scores(items)
+
+        return [
+            self._select(documents, scores)
+            for (_, documents), scores in zip(items, item_scores)
+        ]
+
+    def _get_similarity_scores(
+        self, items: Sequence[tuple[str, Sequence[Document]]]
+    ) -> list[list[float]]:
+        """
+        Cosine similarity of each query to its documents, computed in one
+        matrix product. Only embeddings that aren't known are generated.
+        """
+        query_vectors = dict(self.query_vectors or {})
+        queries = list(dict.fromkeys(query for query, _ in items))
+        missing = [query for query in queries if query not in query_vectors]
+        if missing:
+            query_vectors.update(
+                zip(
+                    missing,
+                    self.embedding_function(missing, RAG_EMBEDDING_QUERY_PREFIX),
+                )
             )
-            scores = util.cos_sim(query_embedding, document_embedding)[0]
-
-        docs_with_scores = list(
-            zip(documents, scores.tolist() if not isinstance(scores, list) else scores)
-        )
+        query_matrix = normalize([query_vectors[query] for query in queries])
+        dimension = query_matrix.shape[-1]
+
+        # Rows of the document matrix by document id, or content if the
+        # embedding of the document isn't known
+        vectors = self.vectors or {}
+        rows = {}
+        row_vectors = []
+        missing = []
+        for _, documents in items:
+            for doc in documents:
+                key = self._get_vector_key(doc, vectors, dimension)
+                if key in rows:
+                    continue
+                rows[key] = len(row_vectors)
+                if key == doc.id:
+                    row_vectors.append(vectors[doc.id])
+                else:
+                    row_vectors.append(None)
+                    missing.append(key)
+
+        if missing:
+            for key, vector in zip(
+                missing,
+                self.embedding_function(missing, RAG_EMBEDDING_CONTENT_PREFIX),
+            ):
+                row_vectors[rows[key]] = vector
+        if not row_vectors:
+            return [[] for _ in items]
+
+        scores = normalize(row_vectors) @ query_matrix.T
+
+        query_columns = {query: idx for idx, query in enumerate(queries)}
+        return [
+            scores[
+                [
+                    rows[self._get_vector_key(doc, vectors, dimension)]
+                    for doc in documents
+                ],
+                query_columns[query],
+            ].tolist()
+            for query, documents in items
+        ]
+
+    @staticmethod
+    def _get_vector_key(doc: Document, vectors: dict, dimension: int) -> str:
+        vector = vectors.get(doc.id) if doc.id is not None else None
+        if vector is not None and len(vector) == dimension:
+            return doc.id
+        return doc.page_content
+
+    def _select(
+        self, documents: Sequence[Document], scores: list[float]
+    ) -> list[Document]:
+        docs_with_scores = list(zip(documents, scores))
         if self.r_score:
             docs_with_scores = [
                 (d, s) for d, s in docs_with_scores if s >= self.r_score
@@ -829,8 +1040,8 @@ class RerankCompressor(BaseDocumentCompressor):
         result = sorted(docs_with_scores, key=operator.itemgetter(1), reverse=True)
         final_results = []
         for doc, doc_score in result[: self.top_n]:
-            metadata = doc.metadata
-            metadata["score"] = doc_score
+            # Documents can be shared between queries, don't score them in place
+            metadata = {**doc.metadata, "score": doc_score}
             doc = Document(
                 page_content=doc.page_content,
                 metadata=metadata,
@@ -399,13 +399,14 @@ async def update_chat_message_by_id(
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
 
-    chat = Chats.upsert_message_to_chat_by_id_and_message_id(
+    Chats.upsert_message_to_chat_by_id_and_message_id(
         id,
         message_id,
         {
             "content": form_data.content,
         },
     )
+    chat = Chats.get_chat_by_id(id)
 
     event_emitter = get_event_emitter(
         {
@@ -1,17 +1,29 @@
+import asyncio
 import json
 import logging
-import uuid
+import tempfile
 import time
-import threading
-from typing import Optional, Dict, Any, List
+import uuid
+from typing import Optional, Dict, Any, List, Tuple
 from pydantic import BaseModel
 
-import requests
-import websocket
+import aiohttp
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 
+from open_webui.models.files import Files, FileForm
+from open_webui.storage.provider import Storage
 from open_webui.utils.auth import get_verified_user
+from open_webui.utils.code_artifacts import extract_rich_output
+from open_webui.utils.code_interpreter import JupyterKernelClient
+from open_webui.utils.kernel_pool import KernelPool, preamble_fingerprint
+from open_webui.env import (
+    CODE_EXECUTION_KERNEL_POOL_SIZE,
+    CODE_EXECUTION_KERNEL_POOL_MAX_KERNELS,
+    CODE_EXECUTION_KERNEL_MAX_EXECUTIONS,
+    CODE_EXECUTION_KERNEL_IDLE_TTL,
+    CODE_EXECUTION_STREAM_MAX_OUTPUT_SIZE,
+)
 
 
 log = logging.getLogger(__name__)
@@ -26,6 +38,7 @@ class CodeExecutionRequest(BaseModel):
     code: str
     timeout: Optional[int] = 30
     kernel_type: Optional[str] = "python3"
+    chat_id: Optional[str] = None
 
 
 class CodeExecutionResponse(BaseModel):
@@ -34,167 +47,150 @@ class CodeExecutionResponse(BaseModel):
     error: Optional[str] = None
     execution_time: Optional[float] = None
     kernel_id: Optional[str] = None
+    outputs: List[Dict[str, Any]] = []
 
 
-class JupyterKernelClient:
-    def __init__(self, base_url: str):
-        self.base_url = base_url
-        self.kernel_id = None
-        self.ws = None
-        self.messages = []
-        self.output_lines = []
-        self.execution_complete = False
-        self.error_occurred = False
-        self.error_message = None
-        
-    def create_kernel(self) -> str:
-        """Create a new kernel"""
-        try:
-            response = requests.post(f"{self.base_url}/api/kernels", timeout=10)
-            response.raise_for_status()
-            kernel_data = response.json()
-            self.kernel_id = kernel_data['id']
-            log.info(f"Created kernel: {self.kernel_id}")
-            return self.kernel_id
-        except Exception as e:
-            log.error(f"Failed to create kernel: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to create kernel: {e}")
-        
-    def connect_websocket(self):
-        """Connect to kernel WebSocket"""
-        ws_url = f"ws://{self.base_url.split('//')[1]}/api/kernels/{self.kernel_id}/channels"
-        
-        def on_message(ws, message):
-            try:
-                data = json.loads(message)
-                self.messages.append(data)
-                
-                # Handle execution results
-                if data.get('msg_type') == 'stream':
-                    content = data.get('content', {})
-                    if 'text' in content:
-                        self.output_lines.append(content['text'].strip())
-                        
-                elif data.get('msg_type') == 'execute_result':
-                    content = data.get('content', {})
-                    if 'data' in content:
-                        text_data = content['data'].get('text/plain', '')
-                        if text_data:
-                            self.output_lines.append(f"Result: {text_data}")
-                            
-                elif data.get('msg_type') == 'error':
-                    content = data.get('content', {})
-                    self.error_occurred = True
-                    self.error_message = f"{content.get('ename', 'Error')}: {content.get('evalue', 'Unknown error')}"
-                    self.output_lines.append(f"ERROR: {self.error_message}")
-                    
-                elif data.get('msg_type') == 'status':
-                    content = data.get('content', {})
-                    if content.get('execution_state') == 'idle':
-                        self.execution_complete = True
-                        
-            except Exception as e:
-                log.error(f"Error processing WebSocket message: {e}")
-        
-        def on_error(ws, error):
-            log.error(f"WebSocket error: {error}")
-            self.error_occurred = True
-            self.error_message = str(error)
-            
-        def on_close(ws, close_status_code, close_msg):
-            log.info("WebSocket connection closed")
-            
-        try:
-            self.ws = websocket.WebSocketApp(
-                ws_url,
-                on_message=on_message,
-                on_error=on_error,
-                on_close=on_close
-            )
-            
-            # Start WebSocket in a separate thread
-            ws_thread = threading.Thread(target=self.ws.run_forever)
-            ws_thread.daemon = True
-            ws_thread.start()
-            
-            # Wait for connection
-            time.sleep(2)
-            
-        except Exception as e:
-            log.error(f"Failed to connect WebSocket: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to connect to kernel: {e}")
-        
-    def execute_code(self, code: str, timeout: int = 30) -> Dict[str, Any]:
-        """Execute code on the kernel"""
-        if not self.ws:
-            raise HTTPException(status_code=500, detail="WebSocket not connected")
-            
-        # Reset state
-        self.output_lines = []
-        self.execution_complete = False
-        self.error_occurred = False
-        self.error_message = None
-        
-        msg_id = str(uuid.uuid4())
-        
-        message = {
-            "header": {
-                "msg_id": msg_id,
-                "msg_type": "execute_request",
-                "username": "webui_user",
-                "session": str(uuid.uuid4()),
-                "date": time.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
-                "version": "5.3"
-            },
-            "parent_header": {},
-            "metadata": {},
-            "content": {
-                "code": code,
-                "silent": False,
-                "store_history": True,
-                "user_expressions": {},
-                "allow_stdin": False,
-                "stop_on_error": True
-            },
-            "msg_id": msg_id,
-            "msg_type": "execute_request"
-        }
-        
-        start_time = time.time()
-        
-        try:
-            self.ws.send(json.dumps(message))
-            
-            # Wait for execution to complete
-            elapsed = 0
-            while not self.execution_complete and elapsed < timeout:
-                time.sleep(0.1)
-                elapsed = time.time() - start_time
-                
-            execution_time = time.time() - start_time
-            
-            return {
-                "success": not self.error_occurred,
-                "output": self.output_lines,
-                "error": self.error_message if self.error_occurred else None,
-                "execution_time": execution_time,
-                "kernel_id": self.kernel_id
-            }
-            
-        except Exception as e:
-            log.error(f"Error executing code: {e}")
-            return {
-                "success": False,
-                "output": [],
-                "error": str(e),
-                "execution_time": time.time() - start_time,
-                "kernel_id": self.kernel_id
-            }
-    
-    def cleanup(self):
-        """Clean up resources"""
-        if self.ws:
-            self.ws.close()
+async def run_code(client: JupyterKernelClient, code: str, timeout: int, user) -> Dict[str, Any]:
+    """
+    Execute code on a connected kernel and collect its output lines and rich
+    outputs; large plots, HTML and JSON payloads become storage references.
+    """
+    output_lines = []
+    outputs = []
+    error_message = None
+    start_time = time.time()
+
+    try:
+        async for message in client.iter_execute(code, timeout):
+            msg_type = message.get('msg_type')
+            content = message.get('content', {})
+
+            if msg_type == 'stream':
+                if 'text' in content:
+                    output_lines.append(content['text'].strip())
+
+            elif msg_type in ('execute_result', 'display_data'):
+                data = await asyncio.to_thread(extract_rich_output, content.get('data', {}), user)
+                outputs.append({"type": msg_type, "data": data})
+
+                text_data = data.get('text/plain', '')
+                if msg_type == 'execute_result' and text_data:
+                    output_lines.append(f"Result: {text_data}")
+
+            elif msg_type == 'error':
+                error_message = f"{content.get('ename', 'Error')}: {content.get('evalue', 'Unknown error')}"
+                output_lines.append(f"ERROR: {error_message}")
+
+    except asyncio.TimeoutError:
+        error_message = f"Execution timed out after {timeout}s"
+
+    except Exception as e:
+        log.error(f"Error executing code: {e}")
+        error_message = str(e)
+
+    return {
+        "success": error_message is None,
+        "output": output_lines,
+        "error": error_message,
+        "execution_time": time.time() - start_time,
+        "kernel_id": client.kernel_id,
+        "outputs": outputs
+    }
+
+
+kernel_pool = KernelPool(
+    lambda: JupyterKernelClient(JUPYTER_VM_URL),
+    size=CODE_EXECUTION_KERNEL_POOL_SIZE,
+    max_kernels=CODE_EXECUTION_KERNEL_POOL_MAX_KERNELS,
+    max_executions=CODE_EXECUTION_KERNEL_MAX_EXECUTIONS,
+    idle_ttl=CODE_EXECUTION_KERNEL_IDLE_TTL,
+)
+
+
+# Bioinformatics environment setup, executed once per kernel
+BIOINFORMATICS_PREAMBLE = """
+# Bioinformatics environment setup
+import os
+import sys
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+# Set up matplotlib for headless execution
+plt.switch_backend('Agg')
+
+# Common bioinformatics libraries (if available)
+try:
+    import scipy
+    import sklearn
+    print("✓ Scientific computing libraries loaded")
+except ImportError as e:
+    print(f"Some scientific libraries not available: {e}")
+
+# Set working directory to user files (already mounted by start_runner.sh)
+os.chdir('/user-files_host')
+print(f"📂 Working directory: {os.getcwd()}")
+
+# List available files
+print("📁 Available files and directories:")
+try:
+    for item in os.listdir('.'):
+        if os.path.isfile(item):
+            size = os.path.getsize(item)
+            print(f"  📄 {item} ({size:,} bytes)")
+        elif os.path.isdir(item):
+            print(f"  📁 {item}/")
+    if not os.listdir('.'):
+        print("  (no files found - upload files first)")
+except Exception as e:
+    print(f"  Error listing files: {e}")
+
+# Helper functions for file operations
+def list_files(pattern="*"):
+    import glob
+    return glob.glob(pattern)
+
+def load_csv(filename):
+    if os.path.exists(filename):
+        return pd.read_csv(filename)
+    else:
+        print(f"File {filename} not found")
+        return None
+
+def load_tsv(filename):
+    if os.path.exists(filename):
+        return pd.read_csv(filename, sep='\\t')
+    else:
+        print(f"File {filename} not found")
+        return None
+
+print("✅ Helper functions: list_files(), load_csv(), load_tsv()")
+print("🧬 Bioinformatics environment ready!")
+"""
+
+BIOINFORMATICS_PREAMBLE_FINGERPRINT = preamble_fingerprint(BIOINFORMATICS_PREAMBLE)
+
+
+def get_lease_key(request: CodeExecutionRequest, user) -> str:
+    """Kernels are leased per chat when a chat id is given, otherwise per user"""
+    if request.chat_id:
+        return get_chat_lease_key(request.chat_id, user)
+    return f"user:{user.id}"
+
+
+def get_chat_lease_key(chat_id: str, user) -> str:
+    return f"chat:{user.id}:{chat_id}"
+
+
+def lease_kernel(request: CodeExecutionRequest, user):
+    """
+    Chat-scoped kernels are persistent: variables (loaded DataFrames, AnnData
+    objects) survive across turns until the chat's kernel goes idle.
+    """
+    return kernel_pool.lease(
+        get_lease_key(request, user), persistent=bool(request.chat_id)
+    )
 
 
 @router.post("/execute", response_model=CodeExecutionResponse)
@@ -207,29 +203,20 @@ async def execute_code(
     """
     log.info(f"Code execution request from user {user.email}: {len(request.code)} characters")
     
-    client = None
     try:
-        # Create Jupyter client
-        client = JupyterKernelClient(JUPYTER_VM_URL)
-        
-        # Create kernel and connect
-        client.create_kernel()
-        client.connect_websocket()
-        
-        # Execute code
-        result = client.execute_code(request.code, request.timeout or 30)
+        async with lease_kernel(request, user) as kernel:
+            result = await run_code(kernel.client, request.code, request.timeout or 30, user)
         
         log.info(f"Code execution completed: success={result['success']}, time={result['execution_time']:.2f}s")
         
         return CodeExecutionResponse(**result)
         
+    except HTTPException:
+        raise
+
     except Exception as e:
         log.error(f"Code execution failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-        
-    finally:
-        if client:
-            client.cleanup()
 
 
 @router.get("/status")
@@ -238,13 +225,18 @@ async def get_vm_status(user=Depends(get_verified_user)):
     Check if the remote VM is accessible
     """
     try:
-        response = requests.get(f"{JUPYTER_VM_URL}/api/kernels", timeout=5)
-        response.raise_for_status()
-        kernels = response.json()
+        async with aiohttp.ClientSession(trust_env=True) as session:
+            async with session.get(
+                f"{JUPYTER_VM_URL}/api/kernels",
+                timeout=aiohttp.ClientTimeout(total=5),
+            ) as response:
+                response.raise_for_status()
+                kernels = await response.json()
         
         return {
             "status": "online",
             "active_kernels": len(kernels),
+            "pool": kernel_pool.status(),
             "vm_url": JUPYTER_VM_URL
         }
         
@@ -257,42 +249,162 @@ async def get_vm_status(user=Depends(get_verified_user)):
         }
 
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Frame one server-sent event; `type` is kept in the payload for older clients"""
+    return f"event: {event}\ndata: {json.dumps({'type': event, **data})}\n\n"
+
+
+class OutputSpill:
+    """
+    Tracks how much output was streamed to the client and, once `max_size`
+    bytes are exceeded, diverts the rest into a file saved to storage.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.sent = 0
+        self.file = None
+
+    def accept(self, size: int) -> bool:
+        """Whether `size` more bytes may still be sent to the client"""
+        if self.file is None and self.sent + size <= self.max_size:
+            self.sent += size
+            return True
+        return False
+
+    def write(self, text: str):
+        if self.file is None:
+            self.file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        self.file.write(text.encode('utf-8'))
+
+    def save(self, user) -> Optional[Dict[str, Any]]:
+        """Upload the spilled output and register it as a file owned by `user`"""
+        if self.file is None:
+            return None
+
+        try:
+            size = self.file.tell()
+            self.file.seek(0)
+
+            id = str(uuid.uuid4())
+            name = "code-output.txt"
+            tags = {
+                "OpenWebUI-User-Email": user.email,
+                "OpenWebUI-User-Id": user.id,
+                "OpenWebUI-User-Name": user.name,
+                "OpenWebUI-File-Id": id,
+            }
+            _, file_path = Storage.upload_file(self.file, f"{id}_{name}", tags)
+            Files.insert_new_file(
+                user.id,
+                FileForm(
+                    id=id,
+                    filename=name,
+                    path=file_path,
+                    meta={"name": name, "content_type": "text/plain", "size": size},
+                ),
+            )
+            return {"id": id, "url": f"/api/v1/files/{id}/content", "size": size}
+        finally:
+            self.file.close()
+
+
+def message_to_event(message: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any], str]]:
+    """
+    Map an iopub message to (event, payload, plain text). The plain text is
+    what gets written to the spill file once the output cap is reached.
+    """
+    msg_type = message.get('msg_type')
+    content = message.get('content', {})
+
+    if msg_type == 'stream':
+        text = content.get('text', '')
+        return 'output', {'name': content.get('name', 'stdout'), 'content': text}, text
+
+    if msg_type in ('display_data', 'execute_result'):
+        data = content.get('data', {})
+        text = data.get('text/plain') or f"[{', '.join(data.keys())} output]"
+        return 'result', {'msg_type': msg_type, 'data': data}, f"{text}\n"
+
+    if msg_type == 'error':
+        error = f"{content.get('ename', 'Error')}: {content.get('evalue', 'Unknown error')}"
+        return 'error', {'content': error, 'traceback': content.get('traceback', [])}, f"{error}\n"
+
+    return None
+
+
 @router.post("/execute/stream")
 async def execute_code_stream(
     request: CodeExecutionRequest,
     user=Depends(get_verified_user)
 ):
     """
-    Execute code with streaming response
+    Execute code and stream iopub output as server-sent events while it runs.
+
+    Output beyond CODE_EXECUTION_STREAM_MAX_OUTPUT_SIZE bytes is no longer
+    sent to the client but saved to a file, referenced in the `complete` event.
     """
     async def generate():
-        client = None
+        timeout = request.timeout or 30
+        spill = OutputSpill(CODE_EXECUTION_STREAM_MAX_OUTPUT_SIZE)
+        success = True
+        start_time = time.time()
+
         try:
-            client = JupyterKernelClient(JUPYTER_VM_URL)
-            client.create_kernel()
-            client.connect_websocket()
-            
-            yield f"data: {json.dumps({'type': 'status', 'message': 'Execution started'})}\n\n"
-            
-            result = client.execute_code(request.code, request.timeout or 30)
-            
-            # Stream output line by line
-            for line in result['output']:
-                yield f"data: {json.dumps({'type': 'output', 'content': line})}\n\n"
-            
-            if result['error']:
-                yield f"data: {json.dumps({'type': 'error', 'content': result['error']})}\n\n"
-            
-            yield f"data: {json.dumps({'type': 'complete', 'success': result['success'], 'execution_time': result['execution_time']})}\n\n"
-            
+            async with lease_kernel(request, user) as kernel:
+                yield sse_event('status', {'message': 'Execution started', 'kernel_id': kernel.kernel_id})
+
+                try:
+                    # Each yield waits for the client, so a slow reader throttles
+                    # the kernel websocket instead of buffering output here
+                    async for message in kernel.client.iter_execute(request.code, timeout):
+                        if message.get('msg_type') in ('display_data', 'execute_result'):
+                            content = message.get('content', {})
+                            content['data'] = await asyncio.to_thread(
+                                extract_rich_output, content.get('data', {}), user
+                            )
+                        mapped = message_to_event(message)
+                        if mapped is None:
+                            continue
+                        event, payload, text = mapped
+                        if event == 'error':
+                            success = False
+
+                        frame = sse_event(event, payload)
+                        if spill.accept(len(frame.encode('utf-8'))):
+                            yield frame
+                            continue
+
+                        if spill.file is None:
+                            yield sse_event('truncated', {
+                                'message': f"Output exceeded {spill.max_size} bytes, the rest is saved to a file"
+                            })
+                        spill.write(text)
+
+                        # errors are always reported to the client
+                        if event == 'error':
+                            yield frame
+
+                except asyncio.TimeoutError:
+                    success = False
+                    yield sse_event('error', {'content': f"Execution timed out after {timeout}s"})
+
+            output_file = await asyncio.to_thread(spill.save, user)
+            yield sse_event('complete', {
+                'success': success,
+                'execution_time': time.time() - start_time,
+                'output_file': output_file,
+            })
+
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
-            
-        finally:
-            if client:
-                client.cleanup()
-    
-    return StreamingResponse(generate(), media_type="text/plain")
+            log.error(f"Streaming code execution failed: {e}")
+            yield sse_event('error', {'content': str(e)})
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # Bioinformatics-specific endpoints
@@ -302,78 +414,48 @@ async def execute_bioinformatics_code(
     user=Depends(get_verified_user)
 ):
     """
-    Execute bioinformatics code with pre-configured environment setup
+    Execute bioinformatics code with pre-configured environment setup.
+
+    The setup preamble runs once per kernel; with a chat_id the kernel is
+    kept for the chat so later cells reuse its imports and variables.
     """
-    # Add common bioinformatics imports and setup
-    setup_code = """
-# Bioinformatics environment setup
-import os
-import sys
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+    log.info(f"Bioinformatics code execution request from user {user.email}: {len(request.code)} characters")
 
-# Set up matplotlib for headless execution
-plt.switch_backend('Agg')
+    timeout = request.timeout or 30
+    try:
+        async with lease_kernel(request, user) as kernel:
+            output, outputs = [], []
+            setup_time = 0.0
+            if BIOINFORMATICS_PREAMBLE_FINGERPRINT not in kernel.preambles:
+                setup = await run_code(kernel.client, BIOINFORMATICS_PREAMBLE, timeout, user)
+                if not setup['success']:
+                    return CodeExecutionResponse(**setup)
+                kernel.preambles.add(BIOINFORMATICS_PREAMBLE_FINGERPRINT)
+                output = setup['output']
+                outputs = setup['outputs']
+                setup_time = setup['execution_time']
 
-# Common bioinformatics libraries (if available)
-try:
-    import scipy
-    import sklearn
-    print("✓ Scientific computing libraries loaded")
-except ImportError as e:
-    print(f"Some scientific libraries not available: {e}")
+            result = await run_code(kernel.client, request.code, timeout, user)
 
-# Set working directory to user files (already mounted by start_runner.sh)
-os.chdir('/user-files_host')
-print(f"📂 Working directory: {os.getcwd()}")
+        result['output'] = output + result['output']
+        result['outputs'] = outputs + result['outputs']
+        result['execution_time'] += setup_time
 
-# List available files
-print("📁 Available files and directories:")
-try:
-    for item in os.listdir('.'):
-        if os.path.isfile(item):
-            size = os.path.getsize(item)
-            print(f"  📄 {item} ({size:,} bytes)")
-        elif os.path.isdir(item):
-            print(f"  📁 {item}/")
-    if not os.listdir('.'):
-        print("  (no files found - upload files first)")
-except Exception as e:
-    print(f"  Error listing files: {e}")
+        log.info(f"Bioinformatics code execution completed: success={result['success']}, time={result['execution_time']:.2f}s")
 
-# Helper functions for file operations
-def list_files(pattern="*"):
-    import glob
-    return glob.glob(pattern)
+        return CodeExecutionResponse(**result)
 
-def load_csv(filename):
-    if os.path.exists(filename):
-        return pd.read_csv(filename)
-    else:
-        print(f"File {filename} not found")
-        return None
+    except HTTPException:
+        raise
 
-def load_tsv(filename):
-    if os.path.exists(filename):
-        return pd.read_csv(filename, sep='\\t')
-    else:
-        print(f"File {filename} not found")
-        return None
+    except Exception as e:
+        log.error(f"Bioinformatics code execution failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-print("✅ Helper functions: list_files(), load_csv(), load_tsv()")
-print("🧬 Bioinformatics environment ready!")
-"""
-    
-    # Combine setup code with user code
-    full_code = setup_code + "\n\n# User code:\n" + request.code
-    
-    # Create modified request
-    bio_request = CodeExecutionRequest(
-        code=full_code,
-        timeout=request.timeout,
-        kernel_type=request.kernel_type
-    )
-    
-    return await execute_code(bio_request, user) 
\ No newline at end of file
+
+@router.delete("/sessions/{chat_id}")
+async def delete_chat_session(chat_id: str, user=Depends(get_verified_user)):
+    """
+    Discard the persistent kernel (and its variables) of a chat
+    """
+    return {"status": await kernel_pool.release(get_chat_lease_key(chat_id, user))}
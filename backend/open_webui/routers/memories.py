@@ -5,6 +5,7 @@ from typing import Optional
 
 from open_webui.models.memories import Memories, MemoryModel
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import bm25_index
 from open_webui.utils.auth import get_verified_user
 from open_webui.env import SRC_LOG_LEVELS
 
@@ -64,6 +65,9 @@ async def add_memory(
             }
         ],
     )
+    # After writing to the vector DB, so that it is not indexed again from
+    # the collection without the memory in the meantime
+    bm25_index.drop(f"user-memory-{user.id}")
 
     return memory
 
@@ -118,6 +122,7 @@ async def reset_memory_from_vector_db(
             for memory in memories
         ],
     )
+    bm25_index.drop(f"user-memory-{user.id}")
 
     return True
 
@@ -136,6 +141,7 @@ async def delete_memory_by_user_id(user=Depends(get_verified_user)):
             VECTOR_DB_CLIENT.delete_collection(f"user-memory-{user.id}")
         except Exception as e:
             log.error(e)
+        bm25_index.drop(f"user-memory-{user.id}")
         return True
 
     return False
@@ -176,6 +182,7 @@ async def update_memory_by_id(
                 }
             ],
         )
+        bm25_index.drop(f"user-memory-{user.id}")
 
     return memory
 
@@ -193,6 +200,7 @@ async def delete_memory_by_id(memory_id: str, user=Depends(get_verified_user)):
         VECTOR_DB_CLIENT.delete(
             collection_name=f"user-memory-{user.id}", ids=[memory_id]
         )
+        bm25_index.delete(f"user-memory-{user.id}", ids=[memory_id])
         return True
 
     return False
@@ -37,6 +37,9 @@ from open_webui.storage.provider import Storage
 
 
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import bm25_index
+from open_webui.retrieval.reranking import Reranker
+from open_webui.retrieval.embedding_cache import embedding_cache, embedding_store
 
 # Document loaders
 from open_webui.retrieval.loaders.main import Loader
@@ -149,9 +152,13 @@ def get_rf(
             try:
                 from open_webui.retrieval.models.colbert import ColBERT
 
-                rf = ColBERT(
-                    get_model_path(reranking_model, auto_update),
-                    env="docker" if DOCKER else None,
+                rf = Reranker(
+                    ColBERT(
+                        get_model_path(reranking_model, auto_update),
+                        env="docker" if DOCKER else None,
+                    ),
+                    model=reranking_model,
+                    single_query=True,
                 )
 
             except Exception as e:
@@ -162,10 +169,14 @@ def get_rf(
                 try:
                     from open_webui.retrieval.models.external import ExternalReranker
 
-                    rf = ExternalReranker(
-                        url=external_reranker_url,
-                        api_key=external_reranker_api_key,
+                    rf = Reranker(
+                        ExternalReranker(
+                            url=external_reranker_url,
+                            api_key=external_reranker_api_key,
+                            model=reranking_model,
+                        ),
                         model=reranking_model,
+                        single_query=True,
                     )
                 except Exception as e:
                     log.error(f"ExternalReranking: {e}")
@@ -174,12 +185,15 @@ def get_rf(
                 import sentence_transformers
 
                 try:
-                    rf = sentence_transformers.CrossEncoder(
-                        get_model_path(reranking_model, auto_update),
-                        device=DEVICE_TYPE,
-                        trust_remote_code=RAG_RERANKING_MODEL_TRUST_REMOTE_CODE,
-                        backend=SENTENCE_TRANSFORMERS_CROSS_ENCODER_BACKEND,
-                        model_kwargs=SENTENCE_TRANSFORMERS_CROSS_ENCODER_MODEL_KWARGS,
+                    rf = Reranker(
+                        sentence_transformers.CrossEncoder(
+                            get_model_path(reranking_model, auto_update),
+                            device=DEVICE_TYPE,
+                            trust_remote_code=RAG_RERANKING_MODEL_TRUST_REMOTE_CODE,
+                            backend=SENTENCE_TRANSFORMERS_CROSS_ENCODER_BACKEND,
+                            model_kwargs=SENTENCE_TRANSFORMERS_CROSS_ENCODER_MODEL_KWARGS,
+                        ),
+                        model=reranking_model,
                     )
                 except Exception as e:
                     log.error(f"CrossEncoder: {e}")
@@ -252,6 +266,28 @@ class OllamaConfigForm(BaseModel):
     key: str
 
 
+@router.get("/embedding/cache")
+async def get_embedding_cache_stats(user=Depends(get_admin_user)):
+    return embedding_cache.stats()
+
+
+@router.delete("/embedding/cache", response_model=bool)
+async def clear_embedding_cache(user=Depends(get_admin_user)):
+    embedding_cache.clear()
+    return True
+
+
+@router.get("/embedding/store")
+async def get_embedding_store_stats(user=Depends(get_admin_user)):
+    return await asyncio.to_thread(embedding_store.stats)
+
+
+@router.delete("/embedding/store", response_model=bool)
+async def clear_embedding_store(user=Depends(get_admin_user)):
+    await asyncio.to_thread(embedding_store.clear)
+    return True
+
+
 class EmbeddingModelUpdateForm(BaseModel):
     openai_config: Optional[OpenAIConfigForm] = None
     ollama_config: Optional[OllamaConfigForm] = None
@@ -1023,11 +1059,16 @@ def save_docs_to_vector_db(
                 metadata[key] = str(value)
 
     try:
-        if VECTOR_DB_CLIENT.has_collection(collection_name=collection_name):
+        has_collection = VECTOR_DB_CLIENT.has_collection(
+            collection_name=collection_name
+        )
+        if has_collection:
             log.info(f"collection {collection_name} already exists")
 
             if overwrite:
                 VECTOR_DB_CLIENT.delete_collection(collection_name=collection_name)
+                bm25_index.drop(collection_name)
+                has_collection = False
                 log.info(f"deleting existing collection {collection_name}")
             elif add is False:
                 log.info(
@@ -1051,6 +1092,9 @@ def save_docs_to_vector_db(
                 else request.app.state.config.RAG_OLLAMA_API_KEY
             ),
             request.app.state.config.RAG_EMBEDDING_BATCH_SIZE,
+            # Chunks embedded before, e.g. of a file added to several
+            # knowledge bases, are taken from the embedding store
+            cache=embedding_store,
         )
 
         embeddings = embedding_function(
@@ -1074,6 +1118,16 @@ def save_docs_to_vector_db(
             items=items,
         )
 
+        # Existing collections without an index are indexed when searched
+        bm25_index.add(
+            collection_name,
+            [item["id"] for item in items],
+            texts,
+            metadatas,
+            vectors=embeddings,
+            create=not has_collection,
+        )
+
         return True
     except Exception as e:
         log.exception(e)
@@ -1110,6 +1164,7 @@ def process_file(
             except:
                 # Audio file upload pipeline
                 pass
+            bm25_index.drop(f"file-{file.id}")
 
             docs = [
                 Document(
@@ -1755,9 +1810,12 @@ def query_doc_handler(
     try:
         if request.app.state.config.ENABLE_RAG_HYBRID_SEARCH:
             collection_results = {}
-            collection_results[form_data.collection_name] = VECTOR_DB_CLIENT.get(
-                collection_name=form_data.collection_name
-            )
+            if bm25_index.has(form_data.collection_name):
+                collection_results[form_data.collection_name] = None
+            else:
+                collection_results[form_data.collection_name] = VECTOR_DB_CLIENT.get(
+                    collection_name=form_data.collection_name
+                )
             return query_doc_with_hybrid_search(
                 collection_name=form_data.collection_name,
                 collection_result=collection_results[form_data.collection_name],
@@ -1774,7 +1832,6 @@ def query_doc_handler(
                     if form_data.r
                     else request.app.state.config.RELEVANCE_THRESHOLD
                 ),
-                user=user,
             )
         else:
             return query_doc(
@@ -1867,6 +1924,7 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
                 collection_name=form_data.collection_name,
                 metadata={"hash": hash},
             )
+            bm25_index.delete(form_data.collection_name, filter={"hash": hash})
             return {"status": True}
         else:
             return {"status": False}
@@ -1878,6 +1936,7 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
 @router.post("/reset/db")
 def reset_vector_db(user=Depends(get_admin_user)):
     VECTOR_DB_CLIENT.reset()
+    bm25_index.reset()
     Knowledges.delete_all_knowledge()
 
 
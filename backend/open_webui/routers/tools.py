@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from pathlib import Path
 from typing import Optional
@@ -14,12 +15,16 @@ from open_webui.utils.plugin import load_tool_module_by_id, replace_imports
 from open_webui.config import CACHE_DIR
 from open_webui.constants import ERROR_MESSAGES
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from open_webui.utils.tools import get_tool_specs
+from open_webui.utils.tools import get_tool_specs, invalidate_tool_specs
 from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.utils.access_control import has_access, has_permission
 from open_webui.env import SRC_LOG_LEVELS
 
 from open_webui.utils.tools import get_tool_servers_data
+from open_webui.utils.tool_executor import tool_executor
+from open_webui.utils.tool_cache import tool_result_cache
+from open_webui.utils.tool_jobs import tool_job_manager
+from open_webui.models.tool_jobs import ToolJobModel, ToolJobs
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
@@ -136,6 +141,60 @@ async def get_tool_list(user=Depends(get_verified_user)):
     return tools
 
 
+############################
+# Bioinformatics Tool Executor
+############################
+
+
+@router.get("/bioinformatics/executor")
+async def get_bioinformatics_tool_executor_stats(user=Depends(get_admin_user)):
+    return tool_executor.stats()
+
+
+@router.get("/bioinformatics/cache")
+async def get_bioinformatics_tool_result_cache_stats(user=Depends(get_admin_user)):
+    return tool_result_cache.stats()
+
+
+@router.delete("/bioinformatics/cache", response_model=bool)
+async def clear_bioinformatics_tool_result_cache(user=Depends(get_admin_user)):
+    await asyncio.to_thread(tool_result_cache.clear)
+    return True
+
+
+############################
+# Bioinformatics Tool Jobs
+############################
+
+
+def get_tool_job_for_user(id: str, user) -> ToolJobModel:
+    job = ToolJobs.get_job_by_id(id)
+    if job is None or (job.user_id != user.id and user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+    return job
+
+
+@router.get("/bioinformatics/jobs", response_model=list[ToolJobModel])
+async def get_bioinformatics_tool_jobs(user=Depends(get_verified_user)):
+    return ToolJobs.get_jobs_by_user_id(user.id)
+
+
+@router.get("/bioinformatics/jobs/{id}", response_model=ToolJobModel)
+async def get_bioinformatics_tool_job_by_id(id: str, user=Depends(get_verified_user)):
+    return get_tool_job_for_user(id, user)
+
+
+@router.post("/bioinformatics/jobs/{id}/cancel", response_model=bool)
+async def cancel_bioinformatics_tool_job_by_id(
+    id: str, user=Depends(get_verified_user)
+):
+    get_tool_job_for_user(id, user)
+    return tool_job_manager.cancel(id)
+
+
 ############################
 # ExportTools
 ############################
@@ -282,6 +341,7 @@ async def update_tools_by_id(
 
         log.debug(updated)
         tools = Tools.update_tool_by_id(id, updated)
+        invalidate_tool_specs(id)
 
         if tools:
             return tools
@@ -329,6 +389,7 @@ async def delete_tools_by_id(
         TOOLS = request.app.state.TOOLS
         if id in TOOLS:
             del TOOLS[id]
+        invalidate_tool_specs(id)
 
     return result
 
@@ -8,6 +8,7 @@ from redis import asyncio as aioredis
 from open_webui.models.users import Users, UserNameResponse
 from open_webui.models.channels import Channels
 from open_webui.models.chats import Chats
+from open_webui.utils.message_buffer import message_buffer
 from open_webui.utils.redis import (
     get_sentinels_from_env,
     get_sentinel_url_from_env,
@@ -76,16 +77,19 @@ if WEBSOCKET_MANAGER == "redis":
         "open-webui:session_pool",
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
+        cache=True,
     )
     USER_POOL = RedisDict(
         "open-webui:user_pool",
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
+        cache=True,
     )
     USAGE_POOL = RedisDict(
         "open-webui:usage_pool",
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
+        cache=True,
     )
 
     clean_up_lock = RedisLock(
@@ -117,24 +121,29 @@ async def periodic_usage_pool_cleanup():
 
             now = int(time.time())
             send_usage = False
-            for model_id, connections in list(USAGE_POOL.items()):
-                # Creating a list of sids to remove if they have timed out
-                expired_sids = [
-                    sid
-                    for sid, details in connections.items()
-                    if now - details["updated_at"] > TIMEOUT_DURATION
-                ]
+            if isinstance(USAGE_POOL, RedisDict):
+                # Models not used for TIMEOUT_DURATION are removed by a
+                # script on the Redis server, without reading the pool
+                send_usage = bool(USAGE_POOL.expire())
+            else:
+                for model_id, connections in list(USAGE_POOL.items()):
+                    # Creating a list of sids to remove if they have timed out
+                    expired_sids = [
+                        sid
+                        for sid, details in connections.items()
+                        if now - details["updated_at"] > TIMEOUT_DURATION
+                    ]
 
-                for sid in expired_sids:
-                    del connections[sid]
+                    for sid in expired_sids:
+                        del connections[sid]
 
-                if not connections:
-                    log.debug(f"Cleaning up model {model_id} from usage pool")
-                    del USAGE_POOL[model_id]
-                else:
-                    USAGE_POOL[model_id] = connections
+                    if not connections:
+                        log.debug(f"Cleaning up model {model_id} from usage pool")
+                        del USAGE_POOL[model_id]
+                    else:
+                        USAGE_POOL[model_id] = connections
 
-                send_usage = True
+                    send_usage = True
 
             if send_usage:
                 # Emit updated usage information after cleaning
@@ -165,10 +174,17 @@ async def usage(sid, data):
         current_time = int(time.time())
 
         # Store the new usage data and task
-        USAGE_POOL[model_id] = {
-            **(USAGE_POOL[model_id] if model_id in USAGE_POOL else {}),
-            sid: {"updated_at": current_time},
+        connections = {
+            _sid: details
+            for _sid, details in USAGE_POOL.get(model_id, {}).items()
+            if current_time - details["updated_at"] <= TIMEOUT_DURATION
         }
+        connections[sid] = {"updated_at": current_time}
+
+        if isinstance(USAGE_POOL, RedisDict):
+            USAGE_POOL.set(model_id, connections, ttl=TIMEOUT_DURATION)
+        else:
+            USAGE_POOL[model_id] = connections
 
         # Broadcast the usage data to all clients
         await sio.emit("usage", {"models": get_models_in_use()})
@@ -340,16 +356,15 @@ def get_event_emitter(request_info, update_db=True):
                 )
 
             if "type" in event_data and event_data["type"] == "message":
-                message = Chats.get_message_by_id_and_message_id(
+                content = message_buffer.get_content(
                     request_info["chat_id"],
                     request_info["message_id"],
                 )
 
-                if message:
-                    content = message.get("content", "")
+                if content is not None:
                     content += event_data.get("data", {}).get("content", "")
 
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                    message_buffer.update(
                         request_info["chat_id"],
                         request_info["message_id"],
                         {
@@ -360,7 +375,7 @@ def get_event_emitter(request_info, update_db=True):
             if "type" in event_data and event_data["type"] == "replace":
                 content = event_data.get("data", {}).get("content", "")
 
-                Chats.upsert_message_to_chat_by_id_and_message_id(
+                message_buffer.update(
                     request_info["chat_id"],
                     request_info["message_id"],
                     {
@@ -1,7 +1,31 @@
 import json
+import logging
+import threading
+import time
 import uuid
+from open_webui.env import SRC_LOG_LEVELS
 from open_webui.utils.redis import get_redis_connection
 
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["SOCKET"])
+
+# Cached keys per RedisDict, including ones known to be missing
+REDIS_DICT_CACHE_MAX_SIZE = 10000
+
+# Removes the entries whose TTL passed from the hash and the expiry set,
+# announcing them like any other write. Returns the removed keys.
+REDIS_DICT_EXPIRE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, 1000)
+if #expired > 0 then
+    redis.call('HDEL', KEYS[1], unpack(expired))
+    redis.call('ZREM', KEYS[2], unpack(expired))
+    if ARGV[3] ~= '' then
+        redis.call('PUBLISH', ARGV[3], cjson.encode({origin = ARGV[2], keys = expired}))
+    end
+end
+return expired
+"""
+
 
 class RedisLock:
     def __init__(self, redis_url, lock_name, timeout_secs, redis_sentinels=[]):
@@ -33,41 +57,248 @@ class RedisLock:
 
 
 class RedisDict:
-    def __init__(self, name, redis_url, redis_sentinels=[]):
+    """
+    A dict stored in a Redis hash, with JSON encoded values.
+
+    With `cache`, reads are served from a local copy of the hash that is
+    kept valid by an invalidation message published along with every write,
+    so only writes and the first read of a key go to Redis. Until the
+    subscription to these messages is up, every read goes to Redis.
+
+    Entries written with a `ttl` are tracked in a sorted set by expiry time
+    and removed by `expire()`, which runs as a script on the Redis server.
+    """
+
+    def __init__(self, name, redis_url, redis_sentinels=[], cache=False):
         self.name = name
         self.redis = get_redis_connection(
             redis_url, redis_sentinels, decode_responses=True
         )
+        self.expires_name = f"{name}:expires"
+        self.channel = f"{name}:invalidate"
+        self._expire_script = self.redis.register_script(REDIS_DICT_EXPIRE_SCRIPT)
+
+        self.cache = cache
+        self.id = str(uuid.uuid4())
+        # key -> serialized value, None if the key is known to be missing
+        self._cache = {}
+        # whether _cache holds every key of the hash
+        self._complete = False
+        # bumped whenever cached keys are invalidated by another writer
+        self._generation = 0
+        self._listening = False
+        self._lock = threading.Lock()
+
+        if cache:
+            threading.Thread(
+                target=self._listen, name=f"redis-dict-{name}", daemon=True
+            ).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis.pubsub()
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        # Writes may have been missed until now
+                        self._invalidate(None)
+                        self._listening = True
+                    elif message["type"] == "message":
+                        data = json.loads(message["data"])
+                        if data.get("origin") != self.id:
+                            self._invalidate(data.get("keys"))
+            except Exception as e:
+                log.warning(f"Lost invalidation messages of {self.name}: {e}")
+
+            self._listening = False
+            self._invalidate(None)
+            time.sleep(1)
+
+    def _invalidate(self, keys):
+        with self._lock:
+            self._generation += 1
+            self._complete = False
+            if keys is None:
+                self._cache = {}
+            else:
+                for key in keys:
+                    self._cache.pop(key, None)
+
+    def _store(self, values, generation, complete=False):
+        """Cache values read from Redis, unless invalidated since the read"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            if complete:
+                self._cache = dict(values)
+                self._complete = True
+                return
+            if len(self._cache) + len(values) > REDIS_DICT_CACHE_MAX_SIZE:
+                self._cache = {}
+                self._complete = False
+            self._cache.update(values)
+
+    def _use_cache(self):
+        return self.cache and self._listening
+
+    def _get_serialized_many(self, keys):
+        keys = list(keys)
+        values = {}
+        generation = None
+        if self._use_cache():
+            with self._lock:
+                for key in keys:
+                    if key in self._cache:
+                        values[key] = self._cache[key]
+                    elif self._complete:
+                        values[key] = None
+                generation = self._generation
+
+        missing = [key for key in keys if key not in values]
+        if missing:
+            fetched = dict(zip(missing, self.redis.hmget(self.name, missing)))
+            if generation is not None:
+                self._store(fetched, generation)
+            values.update(fetched)
+        return values
+
+    def _get_serialized_all(self):
+        generation = None
+        if self._use_cache():
+            with self._lock:
+                if self._complete:
+                    return {k: v for k, v in self._cache.items() if v is not None}
+                generation = self._generation
+
+        values = self.redis.hgetall(self.name)
+        if generation is not None:
+            self._store(values, generation, complete=True)
+        return values
+
+    def _write(self, commands, values):
+        """
+        Run the write `commands` on a pipeline in one round trip, announce
+        the written keys and apply `values` (key -> serialized value, None
+        if deleted, or None for all keys) to the cache.
+        """
+        generation = self._generation
+        pipe = self.redis.pipeline(transaction=False)
+        commands(pipe)
+        if self.cache:
+            pipe.publish(
+                self.channel,
+                json.dumps(
+                    {
+                        "origin": self.id,
+                        "keys": list(values) if values is not None else None,
+                    }
+                ),
+            )
+        results = pipe.execute()
+
+        if self.cache:
+            with self._lock:
+                if values is None:
+                    self._cache = {}
+                    self._complete = generation == self._generation
+                elif generation == self._generation:
+                    self._cache.update(values)
+                else:
+                    # Written concurrently with another writer, read it again
+                    self._complete = False
+                    for key in values:
+                        self._cache.pop(key, None)
+        return results
+
+    def set(self, key, value, ttl=None):
+        """Set `key`, removed by `expire()` after `ttl` seconds if given"""
+        self.set_many({key: value}, ttl=ttl)
+
+    def set_many(self, mapping, ttl=None):
+        """Set all keys of `mapping` in one round trip"""
+        if not mapping:
+            return
+        serialized = {k: json.dumps(v) for k, v in mapping.items()}
+
+        def commands(pipe):
+            pipe.hset(self.name, mapping=serialized)
+            if ttl is not None:
+                expires_at = time.time() + ttl
+                pipe.zadd(self.expires_name, {k: expires_at for k in serialized})
+            else:
+                pipe.zrem(self.expires_name, *serialized)
+
+        self._write(commands, serialized)
+
+    def get_many(self, keys):
+        """The values of the `keys` that exist, read in one round trip"""
+        return {
+            key: json.loads(value)
+            for key, value in self._get_serialized_many(keys).items()
+            if value is not None
+        }
+
+    def delete_many(self, keys):
+        """Delete `keys` in one round trip, returns how many existed"""
+        keys = list(keys)
+        if not keys:
+            return 0
+
+        def commands(pipe):
+            pipe.hdel(self.name, *keys)
+            pipe.zrem(self.expires_name, *keys)
+
+        return self._write(commands, {key: None for key in keys})[0]
+
+    def expire(self):
+        """Remove the entries whose TTL passed, returns their keys"""
+        generation = self._generation
+        expired = self._expire_script(
+            keys=[self.name, self.expires_name],
+            args=[time.time(), self.id, self.channel if self.cache else ""],
+        )
+        if expired and self.cache:
+            with self._lock:
+                if generation == self._generation:
+                    self._cache.update({key: None for key in expired})
+                else:
+                    self._complete = False
+                    for key in expired:
+                        self._cache.pop(key, None)
+        return expired
 
     def __setitem__(self, key, value):
-        serialized_value = json.dumps(value)
-        self.redis.hset(self.name, key, serialized_value)
+        self.set(key, value)
 
     def __getitem__(self, key):
-        value = self.redis.hget(self.name, key)
+        value = self._get_serialized_many([key])[key]
         if value is None:
             raise KeyError(key)
         return json.loads(value)
 
     def __delitem__(self, key):
-        result = self.redis.hdel(self.name, key)
-        if result == 0:
+        if self.delete_many([key]) == 0:
             raise KeyError(key)
 
     def __contains__(self, key):
-        return self.redis.hexists(self.name, key)
+        return self._get_serialized_many([key])[key] is not None
 
     def __len__(self):
+        if self._use_cache():
+            return len(self._get_serialized_all())
         return self.redis.hlen(self.name)
 
     def keys(self):
+        if self._use_cache():
+            return list(self._get_serialized_all().keys())
         return self.redis.hkeys(self.name)
 
     def values(self):
-        return [json.loads(v) for v in self.redis.hvals(self.name)]
+        return [json.loads(v) for v in self._get_serialized_all().values()]
 
     def items(self):
-        return [(k, json.loads(v)) for k, v in self.redis.hgetall(self.name).items()]
+        return [(k, json.loads(v)) for k, v in self._get_serialized_all().items()]
 
     def get(self, key, default=None):
         try:
@@ -76,14 +307,18 @@ class RedisDict:
             return default
 
     def clear(self):
-        self.redis.delete(self.name)
+        self._write(
+            lambda pipe: pipe.delete(self.name, self.expires_name),
+            None,
+        )
 
     def update(self, other=None, **kwargs):
+        mapping = {}
         if other is not None:
             for k, v in other.items() if hasattr(other, "items") else other:
-                self[k] = v
-        for k, v in kwargs.items():
-            self[k] = v
+                mapping[k] = v
+        mapping.update(kwargs)
+        self.set_many(mapping)
 
     def setdefault(self, key, default=None):
         if key not in self:
@@ -0,0 +1,315 @@
+import json
+import math
+import queue
+import random
+import time
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from open_webui.retrieval import bm25
+from open_webui.retrieval.bm25 import MAX_SEGMENTS, BM25Index, tokenize
+
+QUERIES = ["w1 w7", "w3", "w12 w40 w2", "w90 w91", "unknown w5"]
+
+
+class LuceneBM25(BM25Okapi):
+    """rank_bm25's BM25Okapi with the idf of the index, which is never negative"""
+
+    def _calc_idf(self, nd):
+        for word, freq in nd.items():
+            self.idf[word] = math.log(
+                1 + (self.corpus_size - freq + 0.5) / (freq + 0.5)
+            )
+
+
+def make_documents(count, start=0, seed=0):
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(100)]
+    weights = [1 / (i + 1) for i in range(100)]
+    return [
+        {
+            "id": f"doc{i}",
+            "text": " ".join(rng.choices(vocabulary, weights, k=rng.randint(5, 40))),
+            "metadata": {"file_id": f"file{i % 5}", "i": i},
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def build(index, documents, **kwargs):
+    return index.build(
+        "kb",
+        [document["id"] for document in documents],
+        [document["text"] for document in documents],
+        [document["metadata"] for document in documents],
+        **kwargs,
+    )
+
+
+def add(index, documents, **kwargs):
+    return index.add(
+        "kb",
+        [document["id"] for document in documents],
+        [document["text"] for document in documents],
+        [document["metadata"] for document in documents],
+        **kwargs,
+    )
+
+
+def assert_same_ranking(index, documents, k=10):
+    reference = LuceneBM25([tokenize(document["text"]) for document in documents])
+    for query in QUERIES:
+        scores = reference.get_scores(tokenize(query))
+        expected = sorted((score for score in scores if score > 0), reverse=True)[:k]
+        scores_by_id = {
+            document["id"]: score for document, score in zip(documents, scores)
+        }
+
+        results = index.search("kb", query, k)
+
+        assert [result["score"] for result in results] == pytest.approx(
+            expected, rel=1e-4
+        )
+        for result in results:
+            assert result["score"] == pytest.approx(
+                scores_by_id[result["id"]], rel=1e-4
+            )
+
+
+def get_segments(index):
+    with open(index.path / "kb" / "manifest.json") as f:
+        return json.load(f)["segments"]
+
+
+@pytest.fixture
+def index(tmp_path):
+    return BM25Index(tmp_path)
+
+
+def test_build_matches_rank_bm25(index):
+    documents = make_documents(300)
+    assert build(index, documents)
+
+    assert_same_ranking(index, documents)
+    result = index.search("kb", "w3", 1)[0]
+    document = next(d for d in documents if d["id"] == result["id"])
+    assert result["text"] == document["text"]
+    assert result["metadata"] == document["metadata"]
+    assert result["vector"] is None
+
+
+def test_add_and_delete_match_rank_bm25(index):
+    documents = make_documents(200)
+    build(index, documents)
+
+    added = make_documents(50, start=200, seed=1)
+    assert add(index, added)
+    # Documents that are indexed already are skipped
+    assert add(index, added[:10] + documents[:10])
+    documents += added
+    assert len(get_segments(index)) == 2
+    assert_same_ranking(index, documents)
+
+    assert index.delete("kb", filter={"file_id": "file3"})
+    assert index.delete("kb", ids=["doc0", "doc1", "doc210"])
+    documents = [
+        document
+        for document in documents
+        if document["metadata"]["file_id"] != "file3"
+        and document["id"] not in ("doc0", "doc1", "doc210")
+    ]
+    assert_same_ranking(index, documents)
+    assert all(
+        result["metadata"]["file_id"] != "file3"
+        for result in index.search("kb", "w1 w2 w3", 1000)
+    )
+
+
+def test_compaction_keeps_ranking(index):
+    documents = make_documents(40)
+    for i in range(0, len(documents), 4):
+        add(index, documents[i : i + 4], create=True)
+
+    # Merged into one segment once there are more than MAX_SEGMENTS
+    segments = get_segments(index)
+    assert len(segments) == len(documents) // 4 - MAX_SEGMENTS
+    assert sum(segment["size"] for segment in segments) == len(documents)
+    assert len(list((index.path / "kb").glob("segment-*"))) == len(segments)
+    assert_same_ranking(index, documents)
+
+    # A mostly deleted segment is rewritten without its deleted documents
+    last = [document["id"] for document in documents[-4:]]
+    index.delete("kb", ids=last[:3])
+    documents = [d for d in documents if d["id"] not in last[:3]]
+    assert len(get_segments(index)) == len(segments)
+    assert all(not segment["deleted"] for segment in get_segments(index))
+    assert_same_ranking(index, documents)
+
+
+def test_vectors(index):
+    documents = make_documents(10)
+    vectors = np.random.default_rng(0).normal(size=(10, 8))
+    vectors[3] = 0
+    add(index, documents, vectors=vectors, create=True)
+
+    # Zero vectors stand for documents added without an embedding
+    found = index.get_vectors("kb", ["doc2", "doc3", "missing"])
+    assert set(found) == {"doc2"}
+    assert np.allclose(found["doc2"], vectors[2] / np.linalg.norm(vectors[2]))
+    assert index.get_vectors("other", ["doc2"]) == {}
+
+
+def test_not_indexed(index):
+    assert index.search("kb", "w1", 5) is None
+    assert not add(index, make_documents(5))
+    assert not index.has("kb")
+    assert not index.delete("kb", ids=["doc1"])
+
+    add(index, make_documents(5), create=True)
+    assert index.has("kb")
+    index.drop("kb")
+    assert index.search("kb", "w1", 5) is None
+
+    add(index, make_documents(5), create=True)
+    index.reset()
+    assert not index.has("kb")
+
+
+def test_build_from_stale_read(index):
+    documents = make_documents(10)
+
+    # Written to between reading the collection and building its index
+    version = index.get_version("kb")
+    assert not add(index, make_documents(1, start=10))
+    assert not build(index, documents, version=version)
+    assert not index.has("kb")
+
+    # Dropped between reading the collection and building its index
+    version = index.get_version("kb")
+    index.drop("kb")
+    assert not build(index, documents, version=version)
+
+    version = index.get_version("kb")
+    assert build(index, documents, version=version)
+    assert index.has("kb")
+
+    # An index built from a newer read is kept
+    assert build(index, documents[:1], version=version)
+    assert len(index.search("kb", "w1 w2 w3", 100)) > 1
+
+
+def test_disabled(tmp_path):
+    index = BM25Index(tmp_path, enabled=False)
+
+    assert not add(index, make_documents(5), create=True)
+    assert index.search("kb", "w1", 5) is None
+    assert index.get_vectors("kb", ["doc1"]) == {}
+
+
+class FakeRedis:
+    """Pub/sub within the process, shared by the connections to one bus"""
+
+    def __init__(self, bus: list):
+        self.bus = bus
+
+    def publish(self, channel, data):
+        for subscriber in list(self.bus):
+            subscriber.put({"type": "message", "data": data})
+
+    def pubsub(self):
+        return FakePubSub(self.bus)
+
+
+class FakePubSub:
+    def __init__(self, bus: list):
+        self.bus = bus
+        self.queue = queue.Queue()
+
+    def subscribe(self, channel):
+        self.queue.put({"type": "subscribe"})
+        self.bus.append(self.queue)
+
+    def listen(self):
+        while True:
+            message = self.queue.get()
+            try:
+                if message is None:
+                    self.bus.remove(self.queue)
+                    raise ConnectionError("Connection closed")
+                yield message
+            finally:
+                # Done once the listener asks for the next message
+                self.queue.task_done()
+
+
+def deliver(bus):
+    """Wait until every subscriber handled the messages published so far"""
+    for subscriber in list(bus):
+        subscriber.join()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = []
+    monkeypatch.setattr(
+        bm25, "get_redis_connection", lambda *args, **kwargs: FakeRedis(bus)
+    )
+    return bus
+
+
+def test_changes_are_broadcast(tmp_path, bus):
+    index = BM25Index(tmp_path / "a", redis_url="redis://")
+    # Another process with the same directory, and another replica
+    same_store = BM25Index(tmp_path / "a", redis_url="redis://")
+    replica = BM25Index(tmp_path / "b", redis_url="redis://")
+    wait_for(lambda: index.enabled and same_store.enabled and replica.enabled)
+    deliver(bus)
+
+    documents = make_documents(20)
+    build(index, documents)
+    build(replica, documents)
+
+    index.delete("kb", ids=["doc1"])
+    deliver(bus)
+    assert not replica.has("kb")
+    ids = {result["id"] for result in same_store.search("kb", "w1 w2 w3", 100)}
+    assert "doc1" not in ids and "doc2" in ids
+
+    for change in [
+        lambda: add(index, make_documents(1, start=20)),
+        lambda: index.drop("kb"),
+        lambda: index.reset(),
+    ]:
+        build(index, documents)
+        build(replica, documents)
+        change()
+        deliver(bus)
+        assert not replica.has("kb")
+        assert same_store.has("kb") == index.has("kb")
+
+
+def test_not_searched_without_broadcasts(tmp_path, bus):
+    index = BM25Index(tmp_path, redis_url="redis://")
+    wait_for(lambda: index.enabled)
+    documents = make_documents(20)
+    build(index, documents)
+
+    bus[0].put(None)
+    wait_for(lambda: not index.enabled)
+    assert index.search("kb", "w1", 5) is None
+    assert not index.has("kb")
+    assert not build(index, documents)
+
+    # Changes of other replicas may have been missed meanwhile
+    wait_for(lambda: index.enabled)
+    deliver(bus)
+    assert not index.has("kb")
@@ -0,0 +1,190 @@
+import pytest
+
+from open_webui.retrieval import embedding_cache
+from open_webui.retrieval.embedding_cache import EmbeddingCache, EmbeddingStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+class EmbeddingFunction:
+    """Embeds a text as [its length, its number of words], recording calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, query, prefix=None, user=None):
+        self.calls.append(query)
+        texts = query if isinstance(query, list) else [query]
+        embeddings = [[float(len(text)), float(len(text.split()))] for text in texts]
+        return embeddings if isinstance(query, list) else embeddings[0]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(embedding_cache, "time", clock)
+    return clock
+
+
+def test_wrap_embeds_only_missing_texts(clock):
+    cache = EmbeddingCache(max_size=100)
+    embed = EmbeddingFunction()
+    cached = cache.wrap(embed, "openai", "model")
+
+    assert cached(["a b", "cde"]) == [[3.0, 2.0], [3.0, 1.0]]
+    assert cached(["cde", "f", "f", "a b"]) == [
+        [3.0, 1.0],
+        [1.0, 1.0],
+        [1.0, 1.0],
+        [3.0, 2.0],
+    ]
+    # A single query is embedded as one, and returned as one
+    assert cached("cde") == [3.0, 1.0]
+
+    assert embed.calls == [["a b", "cde"], ["f"]]
+    assert cache.stats() == {
+        "size": 3,
+        "hits": 3,
+        "redis_hits": 0,
+        "misses": 3,
+        "hit_ratio": 0.5,
+        "calls_saved": 1,
+    }
+
+
+def test_wrap_keys(clock):
+    cache = EmbeddingCache(max_size=100)
+    embed = EmbeddingFunction()
+
+    cache.wrap(embed, "openai", "model")("text")
+    cache.wrap(embed, "openai", "model")("text", prefix="query: ")
+    cache.wrap(embed, "openai", "other")("text")
+    cache.wrap(embed, "ollama", "model")("text")
+    cache.wrap(embed, "openai", "model")("text", user={"id": "1"})
+
+    assert len(embed.calls) == 4
+
+
+def test_wrap_failed_embedding(clock):
+    cache = EmbeddingCache(max_size=100)
+    cached = cache.wrap(lambda query, prefix=None, user=None: None, "openai", "m")
+
+    assert cached(["a"]) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl(clock):
+    cache = EmbeddingCache(max_size=100, ttl=60)
+    embed = EmbeddingFunction()
+    cached = cache.wrap(embed, "openai", "model")
+
+    cached("a")
+    clock.now += 59
+    cached("a")
+    clock.now += 2
+    cached("a")
+
+    assert len(embed.calls) == 2
+
+
+def test_least_recently_used_are_evicted(clock):
+    cache = EmbeddingCache(max_size=2)
+    embed = EmbeddingFunction()
+    cached = cache.wrap(embed, "openai", "model")
+
+    cached(["a", "b"])
+    cached("a")
+    cached("c")
+    embed.calls.clear()
+    cached(["a", "b", "c"])
+
+    assert embed.calls == [["b"]]
+    assert cache.stats()["size"] == 2
+
+
+def test_disabled():
+    cache = EmbeddingCache(max_size=0)
+    embed = EmbeddingFunction()
+
+    assert cache.wrap(embed, "openai", "model") is embed
+
+
+def test_store_embeds_only_missing_texts(clock, tmp_path):
+    store = EmbeddingStore(tmp_path, max_size=1 << 20)
+    embed = EmbeddingFunction()
+    cached = store.wrap(embed, "openai", "model")
+
+    assert cached(["a b", "cde"]) == [[3.0, 2.0], [3.0, 1.0]]
+    assert cached(["cde", "a b"]) == [[3.0, 1.0], [3.0, 2.0]]
+
+    assert embed.calls == [["a b", "cde"]]
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"], stats["calls_saved"]) == (2, 2, 1)
+    assert (stats["entries"], stats["size"]) == (2, 16)
+
+
+def test_store_persists(clock, tmp_path):
+    embed = EmbeddingFunction()
+    store = EmbeddingStore(tmp_path, max_size=1 << 20)
+    store.wrap(embed, "openai", "model")(["a", "b"])
+
+    store = EmbeddingStore(tmp_path, max_size=1 << 20)
+    assert store.wrap(embed, "openai", "model")(["b", "c"]) == [
+        [1.0, 1.0],
+        [1.0, 1.0],
+    ]
+    assert embed.calls == [["a", "b"], ["c"]]
+
+    store.clear()
+    assert store.stats()["entries"] == 0
+
+
+def test_store_evicts_least_recently_used(clock, tmp_path):
+    # Room for 5 embeddings of 8 bytes, evicted down to 4
+    store = EmbeddingStore(tmp_path, max_size=40)
+    embed = EmbeddingFunction()
+    cached = store.wrap(embed, "openai", "model")
+
+    for text in ["a", "b", "c", "d", "e"]:
+        cached(text)
+        clock.now += 1
+    cached("a")
+    clock.now += 1
+    cached("f")
+
+    stats = store.stats()
+    assert (stats["evictions"], stats["entries"], stats["size"]) == (2, 4, 32)
+
+    embed.calls.clear()
+    cached(["a", "b", "c", "d", "e", "f"])
+    assert embed.calls == [["b", "c"]]
+
+
+def test_store_errors_are_misses(clock, tmp_path):
+    (tmp_path / "embeddings.db").write_bytes(b"not a database" * 100)
+    store = EmbeddingStore(tmp_path, max_size=1 << 20)
+    embed = EmbeddingFunction()
+
+    assert store.wrap(embed, "openai", "model")(["a", "b"]) == [
+        [1.0, 1.0],
+        [1.0, 1.0],
+    ]
+    assert embed.calls == [["a", "b"]]
+    assert store.stats()["entries"] is None
+
+
+def test_store_disabled(tmp_path):
+    store = EmbeddingStore(tmp_path, max_size=0)
+    embed = EmbeddingFunction()
+
+    assert store.wrap(embed, "openai", "model") is embed
+    assert not (tmp_path / "embeddings.db").exists()
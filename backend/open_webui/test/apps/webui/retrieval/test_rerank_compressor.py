@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from open_webui.retrieval.utils import RerankCompressor
+
+VECTORS = {
+    "cats": [1.0, 0.2, 0.0],
+    "dogs": [0.1, 1.0, 0.3],
+    "a chunk about cats": [0.9, 0.1, 0.2],
+    "a chunk about dogs": [0.0, 0.8, 0.5],
+    "a chunk about both": [0.7, 0.7, 0.1],
+    "a chunk about neither": [0.0, 0.1, 1.0],
+}
+
+
+class EmbeddingFunction:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, prefix=None, user=None):
+        self.calls.append(list(texts))
+        return [VECTORS[text] for text in texts]
+
+
+def cosine(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def make_compressor(embedding_function, top_n=10, r_score=0.0, **kwargs):
+    return RerankCompressor(
+        embedding_function=embedding_function,
+        top_n=top_n,
+        reranking_function=None,
+        r_score=r_score,
+        **kwargs,
+    )
+
+
+def test_scores_of_documents_embedded_by_content():
+    embed = EmbeddingFunction()
+    documents = [
+        Document(page_content="a chunk about cats"),
+        Document(page_content="a chunk about dogs"),
+    ]
+
+    scores = make_compressor(embed)._get_similarity_scores([("cats", documents)])
+
+    assert scores == [
+        pytest.approx(
+            [cosine(VECTORS["cats"], VECTORS[doc.page_content]) for doc in documents]
+        )
+    ]
+    assert embed.calls == [["cats"], ["a chunk about cats", "a chunk about dogs"]]
+
+
+def test_scores_of_stored_vectors():
+    embed = EmbeddingFunction()
+    stored = {"id1": [0.2, 0.9, 0.0], "id2": [5.0, 0.0, 1.0], "id3": [1.0, 1.0]}
+    documents = [
+        Document(id="id1", page_content="a chunk about cats"),
+        Document(id="id2", page_content="a chunk about dogs"),
+        # The stored vector is from another model, embedded by content
+        Document(id="id3", page_content="a chunk about both"),
+        # Without a stored vector, embedded by content
+        Document(id="id4", page_content="a chunk about neither"),
+    ]
+    compressor = make_compressor(
+        embed, query_vectors={"dogs": VECTORS["dogs"]}, vectors=stored
+    )
+
+    scores = compressor._get_similarity_scores([("dogs", documents)])
+
+    assert scores == [
+        pytest.approx(
+            [
+                cosine(VECTORS["dogs"], stored["id1"]),
+                cosine(VECTORS["dogs"], stored["id2"]),
+                cosine(VECTORS["dogs"], VECTORS["a chunk about both"]),
+                cosine(VECTORS["dogs"], VECTORS["a chunk about neither"]),
+            ]
+        )
+    ]
+    assert embed.calls == [["a chunk about both", "a chunk about neither"]]
+
+
+def test_scores_of_documents_shared_by_queries():
+    embed = EmbeddingFunction()
+    both = Document(id="id1", page_content="a chunk about both")
+    cats = Document(page_content="a chunk about cats")
+    dogs = Document(page_content="a chunk about dogs")
+    items = [("cats", [cats, both]), ("dogs", [both, dogs]), ("cats", [dogs])]
+
+    scores = make_compressor(embed)._get_similarity_scores(items)
+
+    assert scores == [
+        pytest.approx(
+            [cosine(VECTORS[query], VECTORS[doc.page_content]) for doc in documents]
+        )
+        for query, documents in items
+    ]
+    assert embed.calls == [
+        ["cats", "dogs"],
+        ["a chunk about cats", "a chunk about both", "a chunk about dogs"],
+    ]
+
+
+def test_scores_without_documents():
+    embed = EmbeddingFunction()
+
+    scores = make_compressor(embed)._get_similarity_scores([("cats", [])])
+
+    assert scores == [[]]
+
+
+def test_compress_documents_selects_top_n_above_r_score():
+    documents = [
+        Document(page_content=text, metadata={"name": text})
+        for text in [
+            "a chunk about neither",
+            "a chunk about dogs",
+            "a chunk about cats",
+            "a chunk about both",
+        ]
+    ]
+    compressor = make_compressor(EmbeddingFunction(), top_n=2, r_score=0.5)
+
+    results = compressor.compress_documents(documents, "cats")
+
+    assert [doc.page_content for doc in results] == [
+        "a chunk about cats",
+        "a chunk about both",
+    ]
+    for doc in results:
+        assert doc.metadata == {
+            "name": doc.page_content,
+            "score": pytest.approx(cosine(VECTORS["cats"], VECTORS[doc.page_content])),
+        }
+    # The scores of one query don't end up in the documents of another
+    assert all("score" not in doc.metadata for doc in documents)
+
+    compressor = make_compressor(EmbeddingFunction(), top_n=2, r_score=0.99)
+    assert compressor.compress_documents(documents, "cats") == []
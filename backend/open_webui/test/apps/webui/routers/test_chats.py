@@ -1,5 +1,8 @@
+import importlib.util
 import uuid
 
+from sqlalchemy import text
+
 from test.util.abstract_integration_test import AbstractPostgresTest
 from test.util.mock_user import mock_webui_user
 
@@ -234,3 +237,59 @@ class TestChats(AbstractPostgresTest):
 
         chat = self.chats.get_chat_by_id(chat_id)
         assert chat.share_id is None
+
+    def test_search_chats_saved_before_the_index(self):
+        from alembic.migration import MigrationContext
+        from alembic.operations import Operations
+        from open_webui.env import OPEN_WEBUI_DIR
+        from open_webui.internal.db import Session
+
+        chat_id = self.chats.get_chats()[0].id
+        self.chats.update_chat_by_id(
+            chat_id,
+            {
+                "title": "Penguin facts",
+                "history": {
+                    "currentId": "1",
+                    "messages": {
+                        "1": {
+                            "id": "1",
+                            "role": "user",
+                            "content": "How fast do they swim?",
+                        }
+                    },
+                },
+            },
+        )
+        # Chats saved before the index was added have no rows in it
+        Session.execute(text("DELETE FROM chat_search"))
+        Session.commit()
+
+        # The migration adding the index indexes them
+        spec = importlib.util.spec_from_file_location(
+            "add_chat_search_table",
+            OPEN_WEBUI_DIR
+            / "migrations"
+            / "versions"
+            / "2c5f8e1a9b37_add_chat_search_table.py",
+        )
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        with Operations.context(MigrationContext.configure(Session.connection())):
+            migration.backfill_chat_search()
+        Session.commit()
+
+        for search_text in ["penguin", "swim", "FAST swim"]:
+            with mock_webui_user(id="2"):
+                response = self.fast_api_client.get(
+                    self.create_url("/search", {"text": search_text})
+                )
+            assert response.status_code == 200
+            assert [chat["id"] for chat in response.json()] == [chat_id]
+
+        with mock_webui_user(id="2"):
+            response = self.fast_api_client.get(
+                self.create_url("/search", {"text": "walrus"})
+            )
+        assert response.status_code == 200
+        assert response.json() == []
@@ -0,0 +1,102 @@
+from test.util.abstract_integration_test import AbstractPostgresTest
+
+
+class TestAccessControl(AbstractPostgresTest):
+    BASE_PATH = "/api/v1/groups"
+
+    def setup_class(cls):
+        super().setup_class()
+
+    def setup_method(self):
+        super().setup_method()
+        from open_webui.models.groups import GroupForm, Groups
+
+        self.groups = Groups
+        self.group = self.groups.insert_new_group(
+            "admin",
+            GroupForm(
+                name="Editors",
+                description="",
+                permissions={"workspace": {"models": True}},
+            ),
+        )
+        self.update_group(user_ids=["1"])
+
+    def update_group(self, **kwargs):
+        from open_webui.models.groups import GroupUpdateForm
+
+        return self.groups.update_group_by_id(
+            self.group.id,
+            GroupUpdateForm(name="Editors", description="", **kwargs),
+        )
+
+    def test_group_changes_are_seen(self):
+        from open_webui.utils.access_control import (
+            get_permissions,
+            has_access,
+            has_permission,
+        )
+
+        def check(user_id):
+            defaults = {"workspace": {"models": False}}
+            permissions = get_permissions(user_id, defaults)
+            return (
+                has_permission(user_id, "workspace.models", defaults),
+                permissions["workspace"]["models"],
+                has_access(user_id, "read", {"read": {"group_ids": [self.group.id]}}),
+            )
+
+        # Checked twice, the second time from the cache
+        assert check("1") == check("1") == (True, True, True)
+        assert check("2") == check("2") == (False, False, False)
+
+        self.update_group(user_ids=["1", "2"])
+        assert check("2") == (True, True, True)
+
+        self.update_group(permissions={"workspace": {"models": False}})
+        assert check("1") == (False, False, True)
+        assert check("2") == (False, False, True)
+
+        self.update_group(user_ids=["2"])
+        assert check("1") == (False, False, False)
+
+        self.groups.delete_group_by_id(self.group.id)
+        assert check("2") == (False, False, False)
+
+    def test_changed_default_permissions(self):
+        from open_webui.utils.access_control import get_permissions
+
+        denied = get_permissions("1", {"chat": {"delete": False}})
+        allowed = get_permissions("1", {"chat": {"delete": True}})
+
+        assert denied == {"workspace": {"models": True}, "chat": {"delete": False}}
+        assert allowed == {"workspace": {"models": True}, "chat": {"delete": True}}
+        assert get_permissions("1", {"chat": {"delete": False}}) is denied
+
+    def test_entries_read_during_a_change_are_not_kept(self):
+        from open_webui.models.groups import MemberGroups
+
+        cache = self.groups.cache
+        self.groups.get_member_groups("1")
+        assert cache.get("1") is not None
+
+        # Read before the change, stored after it
+        version = cache.version
+        member = MemberGroups(self.groups.get_groups_by_member_id("1"))
+        self.update_group(user_ids=["2"])
+        cache.set("1", member, version)
+
+        assert cache.get("1") is None
+        assert self.groups.get_group_ids_by_member_id("1") == frozenset()
+
+        version = cache.version
+        cache.set("1", member, version)
+        assert cache.get("1") is member
+
+    def test_disabled_cache(self):
+        from open_webui.models.groups import GroupCache, MemberGroups
+
+        cache = GroupCache(ttl=0)
+        cache.set("1", MemberGroups([]), cache.version)
+
+        assert cache.get("1") is None
@@ -0,0 +1,99 @@
+import pytest
+
+from open_webui.utils.content_tags import StreamingTagParser
+
+TAGS = {
+    "reasoning": [("think", "/think"), ("|begin_of_thought|", "|end_of_thought|")],
+    "code_interpreter": [("code_interpreter", "/code_interpreter")],
+}
+
+CONTENT = (
+    "Let me see. <think>First, 2 < 3.</think> So the answer is "
+    '<code_interpreter type="code" lang="python">print(2 + 3)</code_interpreter>'
+)
+
+
+def feed(chunks, tags=TAGS):
+    parser = StreamingTagParser(tags)
+    content_blocks = [{"type": "text", "content": ""}]
+    ended = False
+    for chunk in chunks:
+        if parser.feed(chunk, content_blocks):
+            ended = True
+            break
+    else:
+        parser.flush(content_blocks)
+    return content_blocks, ended
+
+
+def summarize(content_blocks):
+    return [
+        (block["type"], block["content"], block.get("attributes"))
+        for block in content_blocks
+    ]
+
+
+def test_feed_whole_content():
+    content_blocks, ended = feed([CONTENT])
+
+    assert ended
+    assert summarize(content_blocks) == [
+        ("text", "Let me see. ", None),
+        ("reasoning", "First, 2 < 3.", {}),
+        ("text", "So the answer is ", None),
+        ("code_interpreter", "print(2 + 3)", {"type": "code", "lang": "python"}),
+    ]
+    assert "duration" in content_blocks[1]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7])
+def test_feed_tags_split_across_chunks(size):
+    chunks = [CONTENT[i : i + size] for i in range(0, len(CONTENT), size)]
+
+    assert summarize(feed(chunks)[0]) == summarize(feed([CONTENT])[0])
+
+
+def test_block_content_only_grows():
+    parser = StreamingTagParser(TAGS)
+    content_blocks = [{"type": "text", "content": ""}]
+    seen = {}
+
+    for char in "Hi <thi<think>a <b> <c</thi</think>done":
+        parser.feed(char, content_blocks)
+        for i, block in enumerate(content_blocks):
+            previous = seen.get((i, block["type"]), "")
+            assert block["content"].startswith(previous.strip())
+            seen[(i, block["type"])] = block["content"]
+    parser.flush(content_blocks)
+
+    assert summarize(content_blocks) == [
+        ("text", "Hi <thi", None),
+        ("reasoning", "a <b> <c</thi", {}),
+        ("text", "done", None),
+    ]
+
+
+def test_incomplete_tag_at_stream_end():
+    content_blocks, ended = feed(["Hello <thi", "nk"])
+
+    assert not ended
+    assert summarize(content_blocks) == [("text", "Hello <think", None)]
+
+
+def test_unknown_tags_are_text():
+    content_blocks, _ = feed(["<b>bold</b> <", "thinker>"])
+
+    assert summarize(content_blocks) == [("text", "<b>bold</b> <thinker>", None)]
+
+
+def test_empty_block_is_removed():
+    content_blocks, _ = feed(["<|begin_of_", "thought|>  <|end_of_thought|>", "Hi"])
+
+    assert summarize(content_blocks) == [("text", "Hi", None)]
+
+    content_blocks, _ = feed(["Hello <think> </think>", " Hi"])
+
+    assert summarize(content_blocks) == [
+        ("text", "Hello ", None),
+        ("text", "Hi", None),
+    ]
@@ -0,0 +1,87 @@
+import pytest
+
+from open_webui.utils import message_buffer as message_buffer_module
+from open_webui.utils.message_buffer import MessageWriteBuffer
+
+
+class Upserts:
+    """Records upserted messages, raising once if `fail` is set"""
+
+    def __init__(self, fail=False, during_write=None):
+        self.fail = fail
+        self.during_write = during_write
+        self.messages = []
+
+    def __call__(self, chat_id, message_id, message):
+        if self.during_write is not None:
+            during_write, self.during_write = self.during_write, None
+            during_write()
+        if self.fail:
+            self.fail = False
+            raise RuntimeError("database is locked")
+        self.messages.append((chat_id, message_id, dict(message)))
+        return message
+
+
+@pytest.fixture
+def buffer():
+    return MessageWriteBuffer(flush_interval=60, max_size=1 << 20)
+
+
+def patch_upserts(monkeypatch, upserts):
+    monkeypatch.setattr(
+        message_buffer_module.Chats,
+        "upsert_message_to_chat_by_id_and_message_id",
+        upserts,
+    )
+
+
+def test_flush_writes_merged_updates(monkeypatch, buffer):
+    upserts = Upserts()
+    patch_upserts(monkeypatch, upserts)
+
+    buffer.update("chat", "message", {"content": "Hel", "done": False})
+    buffer.update("chat", "message", {"content": "Hello"})
+
+    assert upserts.messages == []
+    assert buffer.get_content("chat", "message") == "Hello"
+
+    buffer.flush("chat", "message")
+    assert upserts.messages == [
+        ("chat", "message", {"content": "Hello", "done": False})
+    ]
+    assert buffer.stats()["pending"] == 0
+    assert buffer.flush("chat", "message") is None
+
+
+def test_failed_flush_keeps_updates(monkeypatch, buffer):
+    upserts = Upserts(
+        fail=True,
+        # An update that arrives while the failing write is in progress
+        during_write=lambda: buffer.update("chat", "message", {"content": "Hello"}),
+    )
+    patch_upserts(monkeypatch, upserts)
+
+    buffer.update("chat", "message", {"content": "Hel", "sources": ["a"]})
+    assert buffer.flush("chat", "message") is None
+    assert upserts.messages == []
+
+    # Newer updates win over the message of the failed write
+    assert buffer.get_content("chat", "message") == "Hello"
+    buffer.update("chat", "message", {"done": True})
+
+    buffer.flush("chat", "message")
+    assert upserts.messages == [
+        ("chat", "message", {"content": "Hello", "sources": ["a"], "done": True})
+    ]
+    assert buffer.stats()["pending"] == 0
+
+
+def test_failed_flush_is_retried_by_flush_all(monkeypatch, buffer):
+    upserts = Upserts(fail=True)
+    patch_upserts(monkeypatch, upserts)
+
+    buffer.write("chat", "message", {"content": "Hello"})
+    buffer.flush_all()
+
+    assert upserts.messages == [("chat", "message", {"content": "Hello"})]
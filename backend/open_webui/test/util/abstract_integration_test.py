@@ -148,8 +148,11 @@ class AbstractPostgresTest(AbstractIntegrationTest):
         tables = [
             "auth",
             "chat",
+            "chat_message",
+            "chat_search",
             "chatidtag",
             "document",
+            '"group"',
             "memory",
             "model",
             "prompt",
@@ -25,6 +25,35 @@ def fill_missing_permissions(
     return permissions
 
 
+def combine_permissions(
+    permissions: Dict[str, Any], group_permissions: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Combine permissions from multiple groups by taking the most permissive value."""
+    for key, value in group_permissions.items():
+        if isinstance(value, dict):
+            if key not in permissions:
+                permissions[key] = {}
+            permissions[key] = combine_permissions(permissions[key], value)
+        else:
+            if key not in permissions:
+                permissions[key] = value
+            else:
+                permissions[key] = (
+                    permissions[key] or value
+                )  # Use the most permissive value (True > False)
+    return permissions
+
+
+def get_permission(permissions: Dict[str, Any], keys: List[str]) -> bool:
+    """Traverse permissions dict using a list of keys (from dot-split permission_key)."""
+    for key in keys:
+        if key not in permissions:
+            return False  # If any part of the hierarchy is missing, deny access
+        permissions = permissions[key]  # Traverse one level deeper
+
+    return bool(permissions)  # Return the boolean at the final level
+
+
 def get_permissions(
     user_id: str,
     default_permissions: Dict[str, Any],
@@ -33,38 +62,28 @@ def get_permissions(
     Get all permissions for a user by combining the permissions of all groups the user is a member of.
     If a permission is defined in multiple groups, the most permissive value is used (True > False).
     Permissions are nested in a dict with the permission key as the key and a boolean as the value.
+
+    The result is cached with the user's groups until a group changes, it must not be modified.
     """
+    member = Groups.get_member_groups(user_id)
 
-    def combine_permissions(
-        permissions: Dict[str, Any], group_permissions: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Combine permissions from multiple groups by taking the most permissive value."""
-        for key, value in group_permissions.items():
-            if isinstance(value, dict):
-                if key not in permissions:
-                    permissions[key] = {}
-                permissions[key] = combine_permissions(permissions[key], value)
-            else:
-                if key not in permissions:
-                    permissions[key] = value
-                else:
-                    permissions[key] = (
-                        permissions[key] or value
-                    )  # Use the most permissive value (True > False)
-        return permissions
+    # The defaults can change at runtime, so they are part of the key
+    defaults = json.dumps(default_permissions, sort_keys=True)
+    key = ("permissions", defaults)
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    permissions = member.derived.get(key)
+    if permissions is None:
+        # Deep copy default permissions to avoid modifying the original dict
+        permissions = json.loads(defaults)
 
-    # Deep copy default permissions to avoid modifying the original dict
-    permissions = json.loads(json.dumps(default_permissions))
+        # Combine permissions from all user groups
+        for group in member.groups:
+            permissions = combine_permissions(permissions, group.permissions)
 
-    # Combine permissions from all user groups
-    for group in user_groups:
-        group_permissions = group.permissions
-        permissions = combine_permissions(permissions, group_permissions)
+        # Ensure all fields from default_permissions are present and filled in
+        permissions = fill_missing_permissions(permissions, json.loads(defaults))
 
-    # Ensure all fields from default_permissions are present and filled in
-    permissions = fill_missing_permissions(permissions, default_permissions)
+        member.derived[key] = permissions
 
     return permissions
 
@@ -80,31 +99,27 @@ def has_permission(
 
     Permission keys can be hierarchical and separated by dots ('.').
     """
-
-    def get_permission(permissions: Dict[str, Any], keys: List[str]) -> bool:
-        """Traverse permissions dict using a list of keys (from dot-split permission_key)."""
-        for key in keys:
-            if key not in permissions:
-                return False  # If any part of the hierarchy is missing, deny access
-            permissions = permissions[key]  # Traverse one level deeper
-
-        return bool(permissions)  # Return the boolean at the final level
-
-    permission_hierarchy = permission_key.split(".")
-
-    # Retrieve user group permissions
-    user_groups = Groups.get_groups_by_member_id(user_id)
-
-    for group in user_groups:
-        group_permissions = group.permissions
-        if get_permission(group_permissions, permission_hierarchy):
-            return True
+    member = Groups.get_member_groups(user_id)
+
+    # Whether any of the user's groups grants the permission
+    key = ("permission", permission_key)
+    granted = member.derived.get(key)
+    if granted is None:
+        permission_hierarchy = permission_key.split(".")
+        granted = any(
+            get_permission(group.permissions, permission_hierarchy)
+            for group in member.groups
+        )
+        member.derived[key] = granted
+
+    if granted:
+        return True
 
     # Check default permissions afterward if the group permissions don't allow it
     default_permissions = fill_missing_permissions(
         default_permissions, DEFAULT_USER_PERMISSIONS
     )
-    return get_permission(default_permissions, permission_hierarchy)
+    return get_permission(default_permissions, permission_key.split("."))
 
 
 def has_access(
@@ -115,15 +130,17 @@ def has_access(
     if access_control is None:
         return type == "read"
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
-    user_group_ids = [group.id for group in user_groups]
     permission_access = access_control.get(type, {})
     permitted_group_ids = permission_access.get("group_ids", [])
     permitted_user_ids = permission_access.get("user_ids", [])
 
-    return user_id in permitted_user_ids or any(
-        group_id in permitted_group_ids for group_id in user_group_ids
-    )
+    if user_id in permitted_user_ids:
+        return True
+    if not permitted_group_ids:
+        return False
+
+    user_group_ids = Groups.get_group_ids_by_member_id(user_id)
+    return not user_group_ids.isdisjoint(permitted_group_ids)
 
 
 # Get all users with access to a resource
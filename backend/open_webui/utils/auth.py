@@ -16,6 +16,7 @@ from typing import Optional, Union, List, Dict
 from opentelemetry import trace
 
 from open_webui.models.users import Users
+from open_webui.utils.last_active import last_active_writer
 
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.env import (
@@ -218,7 +219,7 @@ def get_current_user(
         )
 
     if data is not None and "id" in data:
-        user = Users.get_user_by_id(data["id"])
+        user = Users.get_cached_user_by_id(data["id"])
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -233,10 +234,9 @@ def get_current_user(
                 current_span.set_attribute("client.user.role", user.role)
                 current_span.set_attribute("client.auth.type", "jwt")
 
-            # Refresh the user's last active timestamp asynchronously
-            # to prevent blocking the request
-            if background_tasks:
-                background_tasks.add_task(Users.update_user_last_active_by_id, user.id)
+            # Refresh the user's last active timestamp, written in batches
+            # to prevent a write on every request
+            last_active_writer.update(user.id)
         return user
     else:
         raise HTTPException(
@@ -262,7 +262,7 @@ def get_current_user_by_api_key(api_key: str):
             current_span.set_attribute("client.user.role", user.role)
             current_span.set_attribute("client.auth.type", "api_key")
 
-        Users.update_user_last_active_by_id(user.id)
+        last_active_writer.update(user.id)
 
     return user
 
@@ -0,0 +1,107 @@
+import base64
+import hashlib
+import io
+import json
+import logging
+import uuid
+from typing import Any, Dict
+
+from open_webui.env import SRC_LOG_LEVELS, CODE_EXECUTION_ARTIFACT_INLINE_MAX_SIZE
+from open_webui.models.files import Files, FileForm
+from open_webui.storage.provider import Storage
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+# Namespace for deterministic artifact file ids, see `get_artifact_id`
+ARTIFACT_NAMESPACE = uuid.UUID("6f1c2a9e-3b4d-4e8f-9a7b-0c5d1e2f3a4b")
+
+# Rich MIME types kept from display_data / execute_result messages
+ARTIFACT_MIME_TYPES = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/svg+xml": ".svg",
+    "text/html": ".html",
+    "application/json": ".json",
+}
+
+BASE64_MIME_TYPES = {"image/png", "image/jpeg"}
+
+
+def decode_payload(mime_type: str, value: Any) -> bytes:
+    """Raw bytes of a Jupyter MIME bundle entry"""
+    if mime_type in BASE64_MIME_TYPES:
+        return base64.b64decode(value)
+    if mime_type == "application/json":
+        return json.dumps(value).encode("utf-8")
+    if isinstance(value, list):
+        value = "".join(value)
+    return str(value).encode("utf-8")
+
+
+def get_artifact_id(user_id: str, hash: str) -> str:
+    """
+    Artifacts are content-addressed per user: the same bytes produced again
+    by the same user map to the same file and are only uploaded once.
+    """
+    return str(uuid.uuid5(ARTIFACT_NAMESPACE, f"{user_id}:{hash}"))
+
+
+def store_artifact(content: bytes, content_type: str, user) -> Dict[str, Any]:
+    """Save `content` to storage unless already stored, returning a reference"""
+    hash = hashlib.sha256(content).hexdigest()
+    id = get_artifact_id(user.id, hash)
+
+    if Files.get_file_by_id(id) is None:
+        name = f"output-{hash[:12]}{ARTIFACT_MIME_TYPES.get(content_type, '')}"
+        tags = {
+            "OpenWebUI-User-Email": user.email,
+            "OpenWebUI-User-Id": user.id,
+            "OpenWebUI-User-Name": user.name,
+            "OpenWebUI-File-Id": id,
+        }
+        _, file_path = Storage.upload_file(io.BytesIO(content), f"{id}_{name}", tags)
+        Files.insert_new_file(
+            user.id,
+            FileForm(
+                id=id,
+                hash=hash,
+                filename=name,
+                path=file_path,
+                meta={"name": name, "content_type": content_type, "size": len(content)},
+            ),
+        )
+        log.debug(f"Stored code execution artifact {id} ({len(content)} bytes)")
+
+    return {
+        "file_id": id,
+        "url": f"/api/v1/files/{id}/content",
+        "content_type": content_type,
+        "size": len(content),
+    }
+
+
+def extract_rich_output(data: Dict[str, Any], user) -> Dict[str, Any]:
+    """
+    Reduce a display_data / execute_result MIME bundle to text/plain plus the
+    supported rich types. Payloads larger than
+    CODE_EXECUTION_ARTIFACT_INLINE_MAX_SIZE are offloaded to storage and
+    replaced by a file reference.
+    """
+    output = {}
+    for mime_type, value in data.items():
+        if mime_type == "text/plain":
+            output[mime_type] = "".join(value) if isinstance(value, list) else value
+            continue
+        if mime_type not in ARTIFACT_MIME_TYPES:
+            continue
+
+        try:
+            content = decode_payload(mime_type, value)
+            if len(content) <= CODE_EXECUTION_ARTIFACT_INLINE_MAX_SIZE:
+                output[mime_type] = value
+            else:
+                output[mime_type] = store_artifact(content, mime_type, user)
+        except Exception as e:
+            log.warning(f"Failed to capture {mime_type} output: {e}")
+    return output
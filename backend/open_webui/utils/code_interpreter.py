@@ -1,11 +1,11 @@
 import asyncio
 import json
 import logging
+import time
 import uuid
 from typing import Optional
 
 import aiohttp
-import websockets
 from pydantic import BaseModel
 
 from open_webui.env import SRC_LOG_LEVELS
@@ -13,6 +13,15 @@ from open_webui.env import SRC_LOG_LEVELS
 logger = logging.getLogger(__name__)
 logger.setLevel(SRC_LOG_LEVELS["MAIN"])
 
+# Messages buffered per execution before the websocket reader waits for the
+# consumer, so slow consumers apply backpressure instead of growing memory.
+# Queues of abandoned executions are drained so the reader never stays
+# blocked on them
+EXECUTION_QUEUE_SIZE = 256
+
+# Seconds to wait for an interrupted execution to go idle before giving up
+INTERRUPT_GRACE_PERIOD = 5
+
 
 class ResultModel(BaseModel):
     """
@@ -24,64 +33,63 @@ class ResultModel(BaseModel):
     result: Optional[str] = ""
 
 
-class JupyterCodeExecuter:
+def build_execute_request(msg_id: str, code: str) -> dict:
+    return {
+        "header": {
+            "msg_id": msg_id,
+            "msg_type": "execute_request",
+            "username": "user",
+            "session": uuid.uuid4().hex,
+            "date": "",
+            "version": "5.3",
+        },
+        "parent_header": {},
+        "metadata": {},
+        "content": {
+            "code": code,
+            "silent": False,
+            "store_history": True,
+            "user_expressions": {},
+            "allow_stdin": False,
+            "stop_on_error": True,
+        },
+        "channel": "shell",
+    }
+
+
+class JupyterKernelClient:
     """
-    Execute code in jupyter notebook
+    Asyncio client for a single Jupyter kernel.
+
+    One reader task per websocket routes every reply to the request that
+    caused it by parent msg_id, so many executions can be in flight on one
+    event loop without threads or polling.
     """
 
-    def __init__(
-        self,
-        base_url: str,
-        code: str,
-        token: str = "",
-        password: str = "",
-        timeout: int = 60,
-        working_dir: Optional[str] = None,
-    ):
+    def __init__(self, base_url: str, token: str = "", password: str = ""):
         """
         :param base_url: Jupyter server URL (e.g., "http://localhost:8888")
-        :param code: Code to execute
         :param token: Jupyter authentication token (optional)
         :param password: Jupyter password (optional)
-        :param timeout: WebSocket timeout in seconds (default: 60s)
-        :param working_dir: Working directory to set before code execution (optional)
         """
+        if base_url[-1] != "/":
+            base_url += "/"
         self.base_url = base_url
-        self.code = code
         self.token = token
         self.password = password
-        self.timeout = timeout
-        self.working_dir = working_dir
-        self.kernel_id = "omics-runner"
-        if self.base_url[-1] != "/":
-            self.base_url += "/"
+        self.kernel_id = None
         self.session = aiohttp.ClientSession(trust_env=True, base_url=self.base_url)
         self.params = {}
-        self.result = ResultModel()
-
-    async def __aenter__(self):
-        return self
-
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.kernel_id:
-            try:
-                async with self.session.delete(
-                    f"api/kernels/{self.kernel_id}", params=self.params
-                ) as response:
-                    response.raise_for_status()
-            except Exception as err:
-                logger.exception("close kernel failed, %s", err)
-        await self.session.close()
+        self.ws = None
+        self._reader = None
+        self._pending: dict[str, asyncio.Queue] = {}
+        self._running = None
 
-    async def run(self) -> ResultModel:
-        try:
-            await self.sign_in()
-            await self.init_kernel()
-            await self.execute_code()
-        except Exception as err:
-            logger.exception("execute code failed, %s", err)
-            self.result.stderr = f"Error: {err}"
-        return self.result
+    async def start(self) -> None:
+        """Sign in, create a kernel and connect to its websocket"""
+        await self.sign_in()
+        await self.create_kernel()
+        await self.connect()
 
     async def sign_in(self) -> None:
         # password authentication
@@ -105,42 +113,241 @@ class JupyterCodeExecuter:
         if self.token:
             self.params.update({"token": self.token})
 
-    async def init_kernel(self) -> None:
+    async def create_kernel(self) -> str:
         async with self.session.post(url="api/kernels", params=self.params) as response:
             response.raise_for_status()
             kernel_data = await response.json()
             self.kernel_id = kernel_data["id"]
+        logger.info(f"Created kernel: {self.kernel_id}")
+        return self.kernel_id
 
-    def init_ws(self) -> (str, dict):
-        ws_base = self.base_url.replace("http", "ws", 1)
-        ws_params = "?" + "&".join([f"{key}={val}" for key, val in self.params.items()])
-        websocket_url = f"{ws_base}api/kernels/{self.kernel_id}/channels{ws_params if len(ws_params) > 1 else ''}"
-        ws_headers = {}
-        if self.password and not self.token:
-            ws_headers = {
-                "Cookie": "; ".join(
-                    [
-                        f"{cookie.key}={cookie.value}"
-                        for cookie in self.session.cookie_jar
-                    ]
-                ),
-                **self.session.headers,
-            }
-        return websocket_url, ws_headers
+    async def connect(self) -> None:
+        # session cookies and XSRF header are sent with the upgrade request
+        self.ws = await self.session.ws_connect(
+            f"api/kernels/{self.kernel_id}/channels",
+            params=self.params,
+            heartbeat=30,
+            max_msg_size=0,
+        )
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self) -> None:
+        try:
+            async for msg in self.ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                try:
+                    data = json.loads(msg.data)
+                except ValueError:
+                    continue
+                queue = self._pending.get(data.get("parent_header", {}).get("msg_id"))
+                if queue is not None:
+                    await queue.put(data)
+        except Exception as err:
+            logger.warning(f"Kernel {self.kernel_id} websocket failed: {err}")
+        finally:
+            # wake up every waiter, the connection is gone
+            for queue in self._pending.values():
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def is_connected(self) -> bool:
+        return bool(self.ws is not None and not self.ws.closed and self._reader)
+
+    def is_idle(self) -> bool:
+        """Whether the last execution finished (the kernel is not still busy)"""
+        return self._running is None
+
+    async def is_alive(self) -> bool:
+        """Check the websocket and the kernel state on the Jupyter server"""
+        if not self.is_connected():
+            return False
+        try:
+            async with self.session.get(
+                f"api/kernels/{self.kernel_id}",
+                params=self.params,
+                timeout=aiohttp.ClientTimeout(total=5),
+            ) as response:
+                response.raise_for_status()
+                kernel_data = await response.json()
+                return kernel_data.get("execution_state") != "dead"
+        except Exception as err:
+            logger.warning(f"Kernel {self.kernel_id} health check failed: {err}")
+            return False
+
+    async def iter_execute(self, code: str, timeout: int = 60):
+        """
+        Execute code and yield its iopub output messages (stream, display_data,
+        execute_result, error) as they arrive. Raises asyncio.TimeoutError when
+        the execution does not finish within `timeout` seconds.
+        """
+        if not self.is_connected():
+            raise ConnectionError("Kernel websocket is not connected")
 
-    async def execute_code(self) -> None:
-        # initialize ws
-        websocket_url, ws_headers = self.init_ws()
-        # execute
-        async with websockets.connect(
-            websocket_url, additional_headers=ws_headers
-        ) as ws:
-            await self.execute_in_jupyter(ws)
-
-    async def execute_in_jupyter(self, ws) -> None:
-        # send message
         msg_id = uuid.uuid4().hex
+        queue = asyncio.Queue(maxsize=EXECUTION_QUEUE_SIZE)
+        self._pending[msg_id] = queue
+        self._running = msg_id
 
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            await self.ws.send_json(build_execute_request(msg_id, code))
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), max(deadline - loop.time(), 0)
+                    )
+                except asyncio.TimeoutError:
+                    await self.interrupt(queue)
+                    raise
+                if message is None:
+                    raise ConnectionError("Kernel websocket closed")
+
+                msg_type = message.get("msg_type")
+                if msg_type == "status":
+                    if message["content"].get("execution_state") == "idle":
+                        self._running = None
+                        return
+                elif msg_type in ("stream", "display_data", "execute_result", "error"):
+                    yield message
+        finally:
+            self._pending.pop(msg_id, None)
+            # The reader may be waiting to put a message into the queue when
+            # the consumer stops early, make room so it moves on (later
+            # replies to this execution are dropped)
+            while not queue.empty():
+                queue.get_nowait()
+
+    async def interrupt(self, queue: Optional[asyncio.Queue] = None) -> None:
+        """
+        Interrupt the running execution and, given its reply queue, wait
+        briefly for the kernel to go idle so it stays usable (and keeps its
+        variables) instead of having to be restarted.
+        """
+        try:
+            async with self.session.post(
+                f"api/kernels/{self.kernel_id}/interrupt", params=self.params
+            ) as response:
+                response.raise_for_status()
+
+            if queue is None:
+                return
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + INTERRUPT_GRACE_PERIOD
+            while True:
+                message = await asyncio.wait_for(
+                    queue.get(), max(deadline - loop.time(), 0)
+                )
+                if message is None:
+                    return
+                if (
+                    message.get("msg_type") == "status"
+                    and message["content"].get("execution_state") == "idle"
+                ):
+                    self._running = None
+                    return
+        except Exception as err:
+            logger.warning(f"Kernel {self.kernel_id} interrupt failed: {err}")
+
+    async def execute(self, code: str, timeout: int = 60) -> dict:
+        """Execute code to completion and return its collected output"""
+        stdout, stderr, results, traceback = "", "", [], []
+        error, timed_out = None, False
+        start_time = time.time()
+        try:
+            async for message in self.iter_execute(code, timeout):
+                msg_type = message["msg_type"]
+                content = message.get("content", {})
+                if msg_type == "stream":
+                    if content.get("name") == "stderr":
+                        stderr += content.get("text", "")
+                    else:
+                        stdout += content.get("text", "")
+                elif msg_type in ("execute_result", "display_data"):
+                    results.append(content.get("data", {}))
+                elif msg_type == "error":
+                    error = f"{content.get('ename', 'Error')}: {content.get('evalue', 'Unknown error')}"
+                    traceback = content.get("traceback", [])
+        except asyncio.TimeoutError:
+            timed_out = True
+            error = f"Execution timed out after {timeout}s"
+
+        return {
+            "stdout": stdout,
+            "stderr": stderr,
+            "results": results,
+            "error": error,
+            "traceback": traceback,
+            "timed_out": timed_out,
+            "execution_time": time.time() - start_time,
+        }
+
+    async def shutdown_kernel(self) -> None:
+        """Close the websocket, delete the kernel and release the session"""
+        if self._reader:
+            # Don't wait for the reader, it may be blocked on a slow consumer
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+        if self.ws is not None:
+            await self.ws.close()
+        if self.kernel_id:
+            try:
+                async with self.session.delete(
+                    f"api/kernels/{self.kernel_id}", params=self.params
+                ) as response:
+                    response.raise_for_status()
+            except Exception as err:
+                logger.exception("close kernel failed, %s", err)
+        await self.session.close()
+
+
+class JupyterCodeExecuter:
+    """
+    Execute code in jupyter notebook
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        code: str,
+        token: str = "",
+        password: str = "",
+        timeout: int = 60,
+        working_dir: Optional[str] = None,
+    ):
+        """
+        :param base_url: Jupyter server URL (e.g., "http://localhost:8888")
+        :param code: Code to execute
+        :param token: Jupyter authentication token (optional)
+        :param password: Jupyter password (optional)
+        :param timeout: Execution timeout in seconds (default: 60s)
+        :param working_dir: Working directory to set before code execution (optional)
+        """
+        self.code = code
+        self.timeout = timeout
+        self.working_dir = working_dir
+        self.client = JupyterKernelClient(base_url, token, password)
+        self.result = ResultModel()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.client.shutdown_kernel()
+
+    async def run(self) -> ResultModel:
+        try:
+            await self.client.start()
+            await self.execute_code()
+        except Exception as err:
+            logger.exception("execute code failed, %s", err)
+            self.result.stderr = f"Error: {err}"
+        return self.result
+
+    async def execute_code(self) -> None:
         # Prepare code with working directory change if specified
         code_to_run = self.code
         if self.working_dir:
@@ -149,64 +356,20 @@ class JupyterCodeExecuter:
                 + code_to_run
             )
 
-        await ws.send(
-            json.dumps(
-                {
-                    "header": {
-                        "msg_id": msg_id,
-                        "msg_type": "execute_request",
-                        "username": "user",
-                        "session": uuid.uuid4().hex,
-                        "date": "",
-                        "version": "5.3",
-                    },
-                    "parent_header": {},
-                    "metadata": {},
-                    "content": {
-                        "code": code_to_run,
-                        "silent": False,
-                        "store_history": True,
-                        "user_expressions": {},
-                        "allow_stdin": False,
-                        "stop_on_error": True,
-                    },
-                    "channel": "shell",
-                }
-            )
-        )
-        # parse message
-        stdout, stderr, result = "", "", []
-        while True:
-            try:
-                # wait for message
-                message = await asyncio.wait_for(ws.recv(), self.timeout)
-                message_data = json.loads(message)
-                # msg id not match, skip
-                if message_data.get("parent_header", {}).get("msg_id") != msg_id:
-                    continue
-                # check message type
-                msg_type = message_data.get("msg_type")
-                if msg_type == "stream":
-                    if message_data["content"]["name"] == "stdout":
-                        stdout += message_data["content"]["text"]
-                    elif message_data["content"]["name"] == "stderr":
-                        stderr += message_data["content"]["text"]
-                elif msg_type in ["execute_result", "display_data"]:
-                    data = message_data["content"]["data"]
-                    if "image/png" in data:
-                        result.append(f"data:image/png;base64,{data['image/png']}")
-                    elif "text/plain" in data:
-                        result.append(data["text/plain"])
-                elif msg_type == "error":
-                    stderr += "\n".join(message_data["content"]["traceback"])
-                elif msg_type == "status":
-                    if message_data["content"]["execution_state"] == "idle":
-                        break
-
-            except asyncio.TimeoutError:
-                stderr += "\nExecution timed out."
-                break
-        self.result.stdout = stdout.strip()
+        output = await self.client.execute(code_to_run, self.timeout)
+
+        stderr = output["stderr"] + "\n".join(output["traceback"])
+        if output["timed_out"]:
+            stderr += "\nExecution timed out."
+
+        result = []
+        for data in output["results"]:
+            if "image/png" in data:
+                result.append(f"data:image/png;base64,{data['image/png']}")
+            elif "text/plain" in data:
+                result.append(data["text/plain"])
+
+        self.result.stdout = output["stdout"].strip()
         self.result.stderr = stderr.strip()
         self.result.result = "\n".join(result).strip() if result else ""
 
@@ -0,0 +1,209 @@
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Longest start tag, attributes included, that is held back while it is
+# incomplete. Anything longer is treated as text.
+MAX_TAG_LENGTH = 1024
+
+ATTRIBUTE_PATTERN = re.compile(r'(\w+)\s*=\s*"([^"]+)"')
+
+
+def extract_attributes(tag_content: str) -> dict:
+    """Extract attributes in the format key="value" from a start tag"""
+    if not tag_content:
+        return {}
+    return {key: value for key, value in ATTRIBUTE_PATTERN.findall(tag_content)}
+
+
+class StreamingTagParser:
+    """
+    Splits streamed content into blocks on tags like <think>...</think>.
+
+    `feed` consumes only the new delta of the content and appends it to the
+    last of the content blocks, opening a block of the tag's type on a start
+    tag and closing it on the matching end tag. A tag that is split across
+    chunks is held back until it is complete, or known not to be a tag, so
+    the content of a block only ever grows while it streams.
+
+    Start tags are `<name>` or `<name attr="value" ...>` on one line and are
+    only detected in text blocks, end tags are exactly `<end_tag>`.
+
+    The state is the last content block, so blocks appended by the caller
+    between streams (e.g. tool calls) are picked up.
+    """
+
+    def __init__(self, tags: Dict[str, List[Tuple[str, str]]]):
+        # start tag name -> (content type, start tag, end tag)
+        self.start_tags = {
+            start_tag: (content_type, start_tag, end_tag)
+            for content_type, pairs in tags.items()
+            for start_tag, end_tag in pairs
+        }
+        self.content_types = set(tags)
+        # Incomplete tag at the end of the content fed so far
+        self.pending = ""
+
+    def feed(self, delta: str, content_blocks: list) -> bool:
+        """
+        Add `delta` to the content blocks. Returns True once a code
+        interpreter block was closed, the rest of the stream is ignored then.
+        """
+        data = f"{self.pending}{delta}"
+        self.pending = ""
+
+        while data:
+            if not content_blocks:
+                content_blocks.append({"type": "text", "content": ""})
+
+            block = content_blocks[-1]
+            if block["type"] == "text":
+                data = self._feed_text(data, content_blocks)
+            elif self._is_open(block):
+                data, end = self._feed_block(data, content_blocks)
+                if end:
+                    return True
+            else:
+                self._append(block, data)
+                data = ""
+
+        return False
+
+    def flush(self, content_blocks: list):
+        """Add content held back for an incomplete tag as is, at stream end"""
+        if self.pending and content_blocks:
+            self._append(content_blocks[-1], self.pending)
+        self.pending = ""
+
+    def _is_open(self, block: dict) -> bool:
+        return (
+            block["type"] in self.content_types
+            and "end_tag" in block
+            and "ended_at" not in block
+        )
+
+    @staticmethod
+    def _append(block: dict, text: str):
+        if text:
+            block["content"] = f"{block['content']}{text}"
+
+    def _feed_text(self, data: str, content_blocks: list) -> str:
+        """Append text up to the next start tag, returns what follows it"""
+        previous = content_blocks[-2] if len(content_blocks) > 1 else None
+        if (
+            not content_blocks[-1]["content"]
+            and previous is not None
+            and (
+                previous["type"] == "text"
+                or (previous["type"] in self.content_types and "ended_at" in previous)
+            )
+        ):
+            # The text after an end tag starts at its first non-whitespace,
+            # also if the end tag ended the previous chunk. Two text blocks
+            # follow each other only where an empty block was removed.
+            data = data.lstrip()
+
+        position = 0
+        while True:
+            start = data.find("<", position)
+            if start == -1:
+                self._append(content_blocks[-1], data)
+                return ""
+
+            match = self._match_start_tag(data, start)
+            if match is None:
+                position = start + 1
+                continue
+
+            self._append(content_blocks[-1], data[:start])
+            if match is True:
+                # Wait for the rest of the tag
+                self.pending = data[start:]
+                return ""
+
+            (content_type, start_tag, end_tag), attributes, end = match
+            if not content_blocks[-1]["content"].strip():
+                content_blocks.pop()
+
+            content_blocks.append(
+                {
+                    "type": content_type,
+                    "start_tag": start_tag,
+                    "end_tag": end_tag,
+                    "attributes": attributes,
+                    "content": "",
+                    "started_at": time.time(),
+                }
+            )
+            return data[end:]
+
+    def _match_start_tag(self, data: str, start: int):
+        """
+        Match a start tag at `data[start]`, which is "<". Returns the tag,
+        its attributes and where it ends, True if the data ends before it
+        is known whether this is a start tag, or None if it is not one.
+        """
+        incomplete = False
+        rest = start + 1
+
+        for name, tag in self.start_tags.items():
+            name_end = rest + len(name)
+            if not data.startswith(name, rest):
+                if name.startswith(data[rest:name_end]) and name_end > len(data):
+                    incomplete = True
+                continue
+
+            if name_end == len(data):
+                incomplete = True
+                continue
+
+            char = data[name_end]
+            if char == ">":
+                return tag, {}, name_end + 1
+            if not char.isspace():
+                continue
+
+            # Attributes run up to the first ">" on the same line
+            close = data.find(">", name_end + 1)
+            newline = data.find("\n", name_end + 1)
+            if close != -1 and (newline == -1 or close < newline):
+                attributes = extract_attributes(data[name_end:close])
+                return tag, attributes, close + 1
+            if newline == -1 and len(data) - start < MAX_TAG_LENGTH:
+                incomplete = True
+
+        return True if incomplete else None
+
+    def _feed_block(self, data: str, content_blocks: list) -> Tuple[str, bool]:
+        """Append content up to the end tag, returns what follows it"""
+        block = content_blocks[-1]
+        end_tag = f"<{block['end_tag']}>"
+
+        end = data.find(end_tag)
+        if end == -1:
+            # Hold back what could be the start of the end tag
+            for size in range(min(len(end_tag) - 1, len(data)), 0, -1):
+                if data.endswith(end_tag[:size]):
+                    self.pending = data[-size:]
+                    data = data[:-size]
+                    break
+            self._append(block, data)
+            return "", False
+
+        self._append(block, data[:end])
+        leftover = data[end + len(end_tag) :]
+
+        block["content"] = block["content"].strip()
+        if block["content"]:
+            block["ended_at"] = time.time()
+            block["duration"] = int(block["ended_at"] - block["started_at"])
+
+            if block["type"] == "code_interpreter":
+                # The code is run before the response continues
+                return "", True
+        else:
+            # Remove the block if content is empty
+            content_blocks.pop()
+
+        content_blocks.append({"type": "text", "content": ""})
+        return leftover, False
@@ -0,0 +1,293 @@
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+KERNEL_WARMUP_CODE = """
+import os
+import sys
+import pandas as pd
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+"""
+
+
+def preamble_fingerprint(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+class PooledKernel:
+    """
+    A kernel owned by the pool, together with its lease bookkeeping
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.lease_key: Optional[str] = None
+        self.persistent = False
+        # fingerprints of the setup code already executed in this kernel
+        self.preambles: Set[str] = set()
+        self.executions = 0
+        self.last_used = time.time()
+        self.retired = False
+        self.lock = asyncio.Lock()
+
+    @property
+    def kernel_id(self) -> Optional[str]:
+        return self.client.kernel_id
+
+
+class KernelPool:
+    """
+    Keeps warm Jupyter kernels ready and leases them per user or chat.
+
+    The client returned by `client_factory` must provide the coroutines
+    `start()`, `execute(code, timeout)`, `is_alive()` and `shutdown_kernel()`
+    and the plain methods `is_connected()` and `is_idle()`, as
+    `open_webui.utils.code_interpreter.JupyterKernelClient` does.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        size: int = 2,
+        max_kernels: int = 16,
+        max_executions: int = 100,
+        idle_ttl: int = 900,
+        warmup_code: Optional[str] = KERNEL_WARMUP_CODE,
+        warmup_timeout: int = 120,
+    ):
+        """
+        :param client_factory: Callable returning a new, unconnected kernel client
+        :param size: Number of warm spare kernels to keep ready
+        :param max_kernels: Maximum number of kernels (spare + leased + starting)
+        :param max_executions: Recycle a kernel after this many executions
+        :param idle_ttl: Recycle a leased kernel after this many idle seconds
+        :param warmup_code: Code executed on every new kernel before it is pooled
+        :param warmup_timeout: Timeout in seconds for the warm-up execution
+        """
+        self.client_factory = client_factory
+        self.size = size
+        self.max_kernels = max(max_kernels, 1)
+        self.max_executions = max_executions
+        self.idle_ttl = idle_ttl
+        self.warmup_code = warmup_code
+        self.warmup_timeout = warmup_timeout
+
+        self._spares: List[PooledKernel] = []
+        self._leases: Dict[str, PooledKernel] = {}
+        self._starting = 0
+        self._refill_task: Optional[asyncio.Task] = None
+        self._reaper_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def _total(self) -> int:
+        return len(self._spares) + len(self._leases) + self._starting
+
+    def status(self) -> dict:
+        return {
+            "spare": len(self._spares),
+            "leased": len(self._leases),
+            "starting": self._starting,
+            "max_kernels": self.max_kernels,
+        }
+
+    async def start(self):
+        self._closed = False
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap())
+        self._schedule_refill()
+
+    async def shutdown(self):
+        """
+        Stop background tasks and delete every kernel owned by this pool
+        """
+        self._closed = True
+        for task in (self._reaper_task, self._refill_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+        kernels = self._spares + list(self._leases.values())
+        await asyncio.gather(
+            *[self._retire(kernel) for kernel in kernels], return_exceptions=True
+        )
+        log.info(f"Kernel pool shut down, culled {len(kernels)} kernels")
+
+    async def release(self, key: str) -> bool:
+        """Discard the kernel (and all its state) bound to `key`"""
+        kernel = self._leases.get(key)
+        if kernel is None:
+            return False
+        async with kernel.lock:
+            await self._retire(kernel)
+        return True
+
+    @asynccontextmanager
+    async def lease(self, key: str, persistent: bool = False):
+        """
+        Lease the kernel bound to `key`, binding a warm one on first use.
+        Executions on the same lease are serialized. Persistent leases keep
+        their kernel (and its variables) until idle for `idle_ttl` seconds
+        instead of recycling it after `max_executions`.
+        """
+        while True:
+            kernel = await self._checkout(key, persistent)
+            await kernel.lock.acquire()
+            if not kernel.retired and kernel.client.is_connected():
+                break
+            kernel.lock.release()
+            await self._retire(kernel)
+
+        try:
+            yield kernel
+        finally:
+            kernel.executions += 1
+            kernel.last_used = time.time()
+            kernel.lock.release()
+
+            if not kernel.client.is_idle():
+                log.info(f"Recycling busy kernel {kernel.kernel_id}")
+                asyncio.create_task(self._retire(kernel))
+            elif not kernel.persistent and kernel.executions >= self.max_executions:
+                log.info(
+                    f"Recycling kernel {kernel.kernel_id} after {kernel.executions} executions"
+                )
+                asyncio.create_task(self._retire(kernel))
+
+    async def _checkout(self, key: str, persistent: bool) -> PooledKernel:
+        kernel = self._leases.get(key)
+        if kernel and not kernel.retired:
+            kernel.last_used = time.time()
+            return kernel
+
+        if self._spares:
+            kernel = self._spares.pop(0)
+        else:
+            if self._total() >= self.max_kernels:
+                await self._evict_idle_lease()
+            kernel = await self._start_kernel()
+
+            # Another request for the same key may have bound a kernel meanwhile
+            existing = self._leases.get(key)
+            if existing and not existing.retired:
+                self._spares.append(kernel)
+                return existing
+
+        kernel.lease_key = key
+        kernel.persistent = persistent
+        kernel.last_used = time.time()
+        self._leases[key] = kernel
+        self._schedule_refill()
+        return kernel
+
+    async def _evict_idle_lease(self):
+        idle = [kernel for kernel in self._leases.values() if not kernel.lock.locked()]
+        if not idle:
+            raise HTTPException(
+                status_code=503,
+                detail="All code execution kernels are busy, please try again later",
+            )
+        await self._retire(min(idle, key=lambda kernel: kernel.last_used))
+
+    async def _start_kernel(self) -> PooledKernel:
+        self._starting += 1
+        try:
+            client = self.client_factory()
+            try:
+                await client.start()
+                if self.warmup_code:
+                    result = await client.execute(self.warmup_code, self.warmup_timeout)
+                    if result.get("timed_out"):
+                        raise TimeoutError(
+                            f"Kernel {client.kernel_id} warm-up timed out"
+                        )
+                    if result.get("error"):
+                        log.warning(
+                            f"Kernel {client.kernel_id} warm-up failed: {result['error']}"
+                        )
+            except Exception:
+                await client.shutdown_kernel()
+                raise
+            return PooledKernel(client)
+        finally:
+            self._starting -= 1
+
+    async def _retire(self, kernel: PooledKernel):
+        if kernel.retired:
+            return
+        kernel.retired = True
+
+        if kernel.lease_key and self._leases.get(kernel.lease_key) is kernel:
+            self._leases.pop(kernel.lease_key, None)
+        if kernel in self._spares:
+            self._spares.remove(kernel)
+
+        try:
+            await kernel.client.shutdown_kernel()
+        except Exception as e:
+            log.warning(f"Failed to shut down kernel {kernel.kernel_id}: {e}")
+
+        self._schedule_refill()
+
+    def _schedule_refill(self):
+        if self._closed:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self):
+        while (
+            not self._closed
+            and len(self._spares) + self._starting < self.size
+            and self._total() < self.max_kernels
+        ):
+            try:
+                kernel = await self._start_kernel()
+            except Exception as e:
+                log.error(f"Failed to start warm kernel: {e}")
+                return
+
+            if self._closed:
+                await self._retire(kernel)
+                return
+            self._spares.append(kernel)
+            log.debug(f"Warm kernel {kernel.kernel_id} ready ({self.status()})")
+
+    async def _reap(self):
+        interval = max(min(self.idle_ttl / 2, 60), 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                now = time.time()
+                for kernel in list(self._leases.values()):
+                    if (
+                        not kernel.lock.locked()
+                        and now - kernel.last_used > self.idle_ttl
+                    ):
+                        log.info(f"Recycling idle kernel {kernel.kernel_id}")
+                        await self._retire(kernel)
+
+                for kernel in list(self._spares):
+                    if not await kernel.client.is_alive():
+                        log.info(f"Replacing unhealthy kernel {kernel.kernel_id}")
+                        await self._retire(kernel)
+
+                self._schedule_refill()
+            except Exception as e:
+                log.error(f"Kernel pool maintenance failed: {e}")
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from open_webui.env import SRC_LOG_LEVELS, USER_LAST_ACTIVE_UPDATE_INTERVAL
+from open_webui.models.users import Users
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class LastActiveWriter:
+    """
+    Batches updates of users' last active time.
+
+    Requests only record the time in memory. Every `interval` seconds the
+    recorded times are written in one statement, so a user's row is written
+    at most once per interval however many requests it makes.
+    """
+
+    def __init__(self, interval: float = 60.0):
+        self.interval = interval
+        self._pending: Dict[str, int] = {}
+        self._flusher_task: Optional[asyncio.Task] = None
+
+        self.updates = 0
+        self.writes = 0
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "updates": self.updates,
+            "writes": self.writes,
+        }
+
+    def update(self, user_id: str):
+        self._pending[user_id] = int(time.time())
+        self.updates += 1
+
+        if self.interval <= 0:
+            self.flush()
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        self.writes += 1
+        if not Users.update_users_last_active_by_ids(pending):
+            # Retry with the next flush, unless the user was active since,
+            # in which case the newer time is written
+            for user_id, last_active_at in pending.items():
+                self._pending.setdefault(user_id, last_active_at)
+
+    async def start(self):
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = asyncio.create_task(self._flush_periodically())
+
+    async def shutdown(self):
+        if self._flusher_task and not self._flusher_task.done():
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except asyncio.CancelledError:
+                pass
+        self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(max(self.interval, 1.0))
+            self.flush()
+
+
+last_active_writer = LastActiveWriter(interval=USER_LAST_ACTIVE_UPDATE_INTERVAL)
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from open_webui.env import (
+    CHAT_MESSAGE_FLUSH_INTERVAL,
+    CHAT_MESSAGE_FLUSH_MAX_SIZE,
+    SRC_LOG_LEVELS,
+)
+from open_webui.models.chats import Chats
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class PendingMessage:
+    def __init__(self):
+        self.message: dict = {}
+        self.since = time.monotonic()
+        # characters changed since the last write
+        self.size = 0
+
+    def update(self, message: dict):
+        for key, value in message.items():
+            previous = self.message.get(key)
+            if isinstance(value, str):
+                self.size += abs(
+                    len(value) - (len(previous) if isinstance(previous, str) else 0)
+                )
+            else:
+                self.size += 1
+            self.message[key] = value
+
+
+class MessageWriteBuffer:
+    """
+    Write-behind buffer for chat messages that are updated while streaming.
+
+    Updates of a message are merged in memory and written as one upsert once
+    `flush_interval` seconds passed or `max_size` characters changed, when
+    the response finishes (`flush`) and on shutdown (`flush_all`). Failed
+    writes stay buffered and are retried by the next flush. Readers
+    in this process see buffered updates through `get_message` and
+    `get_content`.
+    """
+
+    def __init__(self, flush_interval: float = 2.0, max_size: int = 65536):
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._pending: Dict[Tuple[str, str], PendingMessage] = {}
+        self._flusher_task: Optional[asyncio.Task] = None
+
+        self.updates = 0
+        self.writes = 0
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "updates": self.updates,
+            "writes": self.writes,
+        }
+
+    def update(self, chat_id: str, message_id: str, message: dict):
+        """Merge `message` into the buffered message, writing it when due"""
+        key = (chat_id, message_id)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = PendingMessage()
+        pending.update(message)
+        self.updates += 1
+
+        if (
+            pending.size >= self.max_size
+            or time.monotonic() - pending.since >= self.flush_interval
+        ):
+            self.flush(chat_id, message_id)
+
+    def write(self, chat_id: str, message_id: str, message: dict):
+        """Merge `message` into the buffered message and write it now"""
+        self.update(chat_id, message_id, message)
+        self.flush(chat_id, message_id)
+
+    def flush(self, chat_id: str, message_id: str) -> Optional[dict]:
+        key = (chat_id, message_id)
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return None
+
+        self.writes += 1
+        try:
+            return Chats.upsert_message_to_chat_by_id_and_message_id(
+                chat_id, message_id, pending.message
+            )
+        except Exception as e:
+            log.error(f"Failed to save message {message_id} of chat {chat_id}: {e}")
+            # Keep the message buffered under any newer updates, so that it
+            # is written again after the next flush interval
+            newer = self._pending.get(key)
+            if newer is not None:
+                pending.update(newer.message)
+            pending.since = time.monotonic()
+            self._pending[key] = pending
+            return None
+
+    def flush_all(self):
+        for chat_id, message_id in list(self._pending):
+            self.flush(chat_id, message_id)
+
+    def get_message(self, chat_id: str, message_id: str) -> Optional[dict]:
+        message = Chats.get_message_by_id_and_message_id(chat_id, message_id)
+        pending = self._pending.get((chat_id, message_id))
+        if message is None or pending is None:
+            return message
+        return {**message, **pending.message}
+
+    def get_content(self, chat_id: str, message_id: str) -> Optional[str]:
+        """The message content, read from the database only if not buffered"""
+        pending = self._pending.get((chat_id, message_id))
+        if pending is not None and "content" in pending.message:
+            return pending.message["content"]
+
+        message = Chats.get_message_by_id_and_message_id(chat_id, message_id)
+        if not message:
+            return None
+        return message.get("content", "")
+
+    async def start(self):
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = asyncio.create_task(self._flush_due())
+
+    async def shutdown(self):
+        if self._flusher_task and not self._flusher_task.done():
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except asyncio.CancelledError:
+                pass
+        self.flush_all()
+
+    async def _flush_due(self):
+        """Write buffered messages that stopped receiving updates"""
+        while True:
+            await asyncio.sleep(max(self.flush_interval, 0.5))
+            now = time.monotonic()
+            for key, pending in list(self._pending.items()):
+                if now - pending.since >= self.flush_interval:
+                    self.flush(*key)
+
+
+message_buffer = MessageWriteBuffer(
+    flush_interval=CHAT_MESSAGE_FLUSH_INTERVAL,
+    max_size=CHAT_MESSAGE_FLUSH_MAX_SIZE,
+)
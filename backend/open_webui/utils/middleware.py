@@ -23,6 +23,7 @@ from starlette.responses import Response, StreamingResponse
 
 
 from open_webui.models.chats import Chats
+from open_webui.utils.message_buffer import message_buffer
 from open_webui.models.users import Users
 from open_webui.socket.main import (
     get_event_call,
@@ -68,13 +69,14 @@ from open_webui.utils.misc import (
     prepend_to_first_user_message_content,
     convert_logit_bias_input_to_json,
 )
-from open_webui.utils.tools import get_tools
+from open_webui.utils.tools import get_tools, call_tool_function, gather_tool_calls
 from open_webui.utils.plugin import load_function_module_by_id
 from open_webui.utils.filter import (
     get_sorted_filter_ids,
     process_filter_functions,
 )
 from open_webui.utils.code_interpreter import execute_code_jupyter
+from open_webui.utils.content_tags import StreamingTagParser
 
 from open_webui.tasks import create_task
 
@@ -88,6 +90,8 @@ from open_webui.env import (
     GLOBAL_LOG_LEVEL,
     BYPASS_MODEL_ACCESS_CONTROL,
     ENABLE_REALTIME_CHAT_SAVE,
+    ENABLE_CHAT_MESSAGE_DELTA_EVENTS,
+    CHAT_MESSAGE_DELTA_SNAPSHOT_INTERVAL,
 )
 from open_webui.constants import TASKS
 
@@ -178,13 +182,11 @@ async def chat_completion_tools_handler(
             result = json.loads(content)
 
             async def tool_call_handler(tool_call):
-                nonlocal skip_files
-
                 log.debug(f"{tool_call=}")
 
                 tool_function_name = tool_call.get("name", None)
                 if tool_function_name not in tools:
-                    return body, {}
+                    return None
 
                 tool_function_params = tool_call.get("parameters", {})
 
@@ -215,12 +217,18 @@ async def chat_completion_tools_handler(
                             }
                         )
                     else:
-                        tool_function = tool["callable"]
-                        tool_result = await tool_function(**tool_function_params)
+                        tool_result = await call_tool_function(
+                            tool, tool_function_params
+                        )
 
                 except Exception as e:
                     tool_result = str(e)
 
+                return tool_function_name, tool_result
+
+            def tool_result_handler(tool_function_name, tool_result):
+                nonlocal skip_files
+
                 tool_result_files = []
                 if isinstance(tool_result, list):
                     for item in tool_result:
@@ -269,11 +277,15 @@ async def chat_completion_tools_handler(
                         skip_files = True
 
             # check if "tool_calls" in result
-            if result.get("tool_calls"):
-                for tool_call in result.get("tool_calls"):
-                    await tool_call_handler(tool_call)
-            else:
-                await tool_call_handler(result)
+            tool_calls = result.get("tool_calls") or [result]
+
+            # Tools run concurrently, their results are applied in call order
+            tool_results = await gather_tool_calls(
+                [tool_call_handler(tool_call) for tool_call in tool_calls]
+            )
+            for tool_result in tool_results:
+                if tool_result is not None:
+                    tool_result_handler(*tool_result)
 
         except Exception as e:
             log.debug(f"Error: {e}")
@@ -1095,7 +1107,7 @@ async def process_chat_response(
         if event_emitter:
             if "error" in response:
                 error = response["error"].get("detail", response["error"])
-                Chats.upsert_message_to_chat_by_id_and_message_id(
+                message_buffer.write(
                     metadata["chat_id"],
                     metadata["message_id"],
                     {
@@ -1104,7 +1116,7 @@ async def process_chat_response(
                 )
 
             if "selected_model_id" in response:
-                Chats.upsert_message_to_chat_by_id_and_message_id(
+                message_buffer.write(
                     metadata["chat_id"],
                     metadata["message_id"],
                     {
@@ -1139,7 +1151,7 @@ async def process_chat_response(
                     )
 
                     # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                    message_buffer.write(
                         metadata["chat_id"],
                         metadata["message_id"],
                         {
@@ -1201,7 +1213,7 @@ async def process_chat_response(
         task_id = str(uuid4())  # Create a unique task ID.
         model_id = form_data.get("model", "")
 
-        Chats.upsert_message_to_chat_by_id_and_message_id(
+        message_buffer.write(
             metadata["chat_id"],
             metadata["message_id"],
             {
@@ -1225,117 +1237,214 @@ async def process_chat_response(
 
         # Handle as a background task
         async def post_response_handler(response, events):
-            def serialize_content_blocks(content_blocks, raw=False):
-                content = ""
+            # Content the client has, as sent through content_event_emitter,
+            # its length in UTF-16 code units (as counted by the client) and
+            # when it was last sent in full
+            emitted_content = None
+            emitted_length = 0
+            emitted_at = 0.0
+
+            def get_client_length(text):
+                return len(text.encode("utf-16-le")) // 2
+
+            async def content_event_emitter(event):
+                """
+                Send streamed content that only grew since the last event as
+                the appended text, with the `offset` it is appended at.
+                Clients whose content doesn't end there (they missed events,
+                or joined mid-stream) skip deltas until the full content is
+                sent again, at least every CHAT_MESSAGE_DELTA_SNAPSHOT_INTERVAL
+                seconds. Any other event is sent as is, so events with more
+                than the content (e.g. when done) carry the full content.
+                """
+                nonlocal emitted_content, emitted_length, emitted_at
+
+                data = event.get("data") or {}
+                if event.get("type") == "chat:completion" and isinstance(
+                    data.get("content"), str
+                ):
+                    content = data["content"]
+                    if (
+                        ENABLE_CHAT_MESSAGE_DELTA_EVENTS
+                        and emitted_content is not None
+                        and data.keys() == {"content"}
+                        and content.startswith(emitted_content)
+                        and time.monotonic() - emitted_at
+                        < CHAT_MESSAGE_DELTA_SNAPSHOT_INTERVAL
+                    ):
+                        delta = content[len(emitted_content) :]
+                        offset = emitted_length
+                        emitted_content = content
+                        emitted_length += get_client_length(delta)
+                        if delta:
+                            await event_emitter(
+                                {
+                                    "type": "chat:message:delta",
+                                    "data": {"content": delta, "offset": offset},
+                                }
+                            )
+                        return
+                    emitted_content = content
+                    emitted_length = get_client_length(content)
+                    emitted_at = time.monotonic()
+                elif event.get("type") in (
+                    "chat:message",
+                    "chat:message:delta",
+                    "message",
+                    "replace",
+                ):
+                    # The client's content changed in another way
+                    emitted_content = None
 
-                for block in content_blocks:
-                    if block["type"] == "text":
-                        content = f"{content}{block['content'].strip()}\n"
-                    elif block["type"] == "tool_calls":
-                        attributes = block.get("attributes", {})
+                await event_emitter(event)
 
-                        tool_calls = block.get("content", [])
-                        results = block.get("results", [])
+            def serialize_content_block(content, block, raw=False):
+                if block["type"] == "text":
+                    content = f"{content}{block['content'].strip()}\n"
+                elif block["type"] == "tool_calls":
+                    attributes = block.get("attributes", {})
 
-                        if results:
+                    tool_calls = block.get("content", [])
+                    results = block.get("results", [])
 
-                            tool_calls_display_content = ""
-                            for tool_call in tool_calls:
+                    if results:
 
-                                tool_call_id = tool_call.get("id", "")
-                                tool_name = tool_call.get("function", {}).get(
-                                    "name", ""
-                                )
-                                tool_arguments = tool_call.get("function", {}).get(
-                                    "arguments", ""
-                                )
+                        tool_calls_display_content = ""
+                        for tool_call in tool_calls:
 
-                                tool_result = None
-                                tool_result_files = None
-                                for result in results:
-                                    if tool_call_id == result.get("tool_call_id", ""):
-                                        tool_result = result.get("content", None)
-                                        tool_result_files = result.get("files", None)
-                                        break
+                            tool_call_id = tool_call.get("id", "")
+                            tool_name = tool_call.get("function", {}).get("name", "")
+                            tool_arguments = tool_call.get("function", {}).get(
+                                "arguments", ""
+                            )
 
-                                if tool_result:
-                                    tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="true" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}" result="{html.escape(json.dumps(tool_result))}" files="{html.escape(json.dumps(tool_result_files)) if tool_result_files else ""}">\n<summary>Tool Executed</summary>\n</details>\n'
-                                else:
-                                    tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>'
+                            tool_result = None
+                            tool_result_files = None
+                            for result in results:
+                                if tool_call_id == result.get("tool_call_id", ""):
+                                    tool_result = result.get("content", None)
+                                    tool_result_files = result.get("files", None)
+                                    break
 
-                            if not raw:
-                                content = f"{content}\n{tool_calls_display_content}\n\n"
-                        else:
-                            tool_calls_display_content = ""
+                            if tool_result:
+                                tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="true" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}" result="{html.escape(json.dumps(tool_result))}" files="{html.escape(json.dumps(tool_result_files)) if tool_result_files else ""}">\n<summary>Tool Executed</summary>\n</details>\n'
+                            else:
+                                tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>'
 
-                            for tool_call in tool_calls:
-                                tool_call_id = tool_call.get("id", "")
-                                tool_name = tool_call.get("function", {}).get(
-                                    "name", ""
-                                )
-                                tool_arguments = tool_call.get("function", {}).get(
-                                    "arguments", ""
-                                )
+                        if not raw:
+                            content = f"{content}\n{tool_calls_display_content}\n\n"
+                    else:
+                        tool_calls_display_content = ""
 
-                                tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>'
+                        for tool_call in tool_calls:
+                            tool_call_id = tool_call.get("id", "")
+                            tool_name = tool_call.get("function", {}).get("name", "")
+                            tool_arguments = tool_call.get("function", {}).get(
+                                "arguments", ""
+                            )
 
-                            if not raw:
-                                content = f"{content}\n{tool_calls_display_content}\n\n"
+                            tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>'
 
-                    elif block["type"] == "reasoning":
-                        reasoning_display_content = "\n".join(
-                            (f"> {line}" if not line.startswith(">") else line)
-                            for line in block["content"].splitlines()
-                        )
+                        if not raw:
+                            content = f"{content}\n{tool_calls_display_content}\n\n"
 
-                        reasoning_duration = block.get("duration", None)
+                elif block["type"] == "reasoning":
+                    reasoning_display_content = "\n".join(
+                        (f"> {line}" if not line.startswith(">") else line)
+                        for line in block["content"].splitlines()
+                    )
 
-                        if reasoning_duration is not None:
-                            if raw:
-                                content = f'{content}\n<{block["start_tag"]}>{block["content"]}<{block["end_tag"]}>\n'
-                            else:
-                                content = f'{content}\n<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
+                    reasoning_duration = block.get("duration", None)
+
+                    if reasoning_duration is not None:
+                        if raw:
+                            content = f'{content}\n<{block["start_tag"]}>{block["content"]}<{block["end_tag"]}>\n'
                         else:
-                            if raw:
-                                content = f'{content}\n<{block["start_tag"]}>{block["content"]}<{block["end_tag"]}>\n'
-                            else:
-                                content = f'{content}\n<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
+                            content = f'{content}\n<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
+                    else:
+                        if raw:
+                            content = f'{content}\n<{block["start_tag"]}>{block["content"]}<{block["end_tag"]}>\n'
+                        else:
+                            content = f'{content}\n<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
 
-                    elif block["type"] == "code_interpreter":
-                        attributes = block.get("attributes", {})
-                        output = block.get("output", None)
-                        lang = attributes.get("lang", "")
+                elif block["type"] == "code_interpreter":
+                    attributes = block.get("attributes", {})
+                    output = block.get("output", None)
+                    lang = attributes.get("lang", "")
 
-                        content_stripped, original_whitespace = (
-                            split_content_and_whitespace(content)
+                    content_stripped, original_whitespace = (
+                        split_content_and_whitespace(content)
+                    )
+                    if is_opening_code_block(content_stripped):
+                        # Remove trailing backticks that would open a new block
+                        content = (
+                            content_stripped.rstrip("`").rstrip() + original_whitespace
                         )
-                        if is_opening_code_block(content_stripped):
-                            # Remove trailing backticks that would open a new block
-                            content = (
-                                content_stripped.rstrip("`").rstrip()
-                                + original_whitespace
-                            )
-                        else:
-                            # Keep content as is - either closing backticks or no backticks
-                            content = content_stripped + original_whitespace
+                    else:
+                        # Keep content as is - either closing backticks or no backticks
+                        content = content_stripped + original_whitespace
 
-                        if output:
-                            output = html.escape(json.dumps(output))
+                    if output:
+                        output = html.escape(json.dumps(output))
 
-                            if raw:
-                                content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
-                            else:
-                                content = f'{content}\n<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+                        if raw:
+                            content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
                         else:
-                            if raw:
-                                content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
-                            else:
-                                content = f'{content}\n<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
-
+                            content = f'{content}\n<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
                     else:
-                        block_content = str(block["content"]).strip()
-                        content = f"{content}{block['type']}: {block_content}\n"
+                        if raw:
+                            content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
+                        else:
+                            content = f'{content}\n<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+
+                else:
+                    block_content = str(block["content"]).strip()
+                    content = f"{content}{block['type']}: {block_content}\n"
+
+                return content
+
+            # Content rendered up to and including each block, per `raw`.
+            # Streaming only changes the last block, so everything before it
+            # is reused instead of rendered again for every token.
+            serialized_blocks = {False: [], True: []}
+
+            def get_block_state(block):
+                # These blocks are changed by assigning new values to their
+                # keys, any other block is always rendered again
+                if block["type"] not in ("text", "reasoning", "code_interpreter"):
+                    return None
+                return list(block.items())
+
+            def is_same_block_state(state, other):
+                return (
+                    state is not None
+                    and other is not None
+                    and len(state) == len(other)
+                    and all(
+                        key == other_key and value is other_value
+                        for (key, value), (other_key, other_value) in zip(state, other)
+                    )
+                )
+
+            def serialize_content_blocks(content_blocks, raw=False):
+                cache = serialized_blocks[raw]
+                content = ""
+
+                for idx, block in enumerate(content_blocks):
+                    state = get_block_state(block)
+                    if idx < len(cache):
+                        cached_block, cached_state, cached_content = cache[idx]
+                        if cached_block is block and is_same_block_state(
+                            state, cached_state
+                        ):
+                            content = cached_content
+                            continue
+                        del cache[idx:]
+
+                    content = serialize_content_block(content, block, raw)
+                    cache.append((block, state, content))
 
+                del cache[len(content_blocks) :]
                 return content.strip()
 
             def convert_content_blocks_to_messages(content_blocks):
@@ -1378,157 +1487,7 @@ async def process_chat_response(
 
                 return messages
 
-            def tag_content_handler(content_type, tags, content, content_blocks):
-                end_flag = False
-
-                def extract_attributes(tag_content):
-                    """Extract attributes from a tag if they exist."""
-                    attributes = {}
-                    if not tag_content:  # Ensure tag_content is not None
-                        return attributes
-                    # Match attributes in the format: key="value" (ignores single quotes for simplicity)
-                    matches = re.findall(r'(\w+)\s*=\s*"([^"]+)"', tag_content)
-                    for key, value in matches:
-                        attributes[key] = value
-                    return attributes
-
-                if content_blocks[-1]["type"] == "text":
-                    for start_tag, end_tag in tags:
-                        # Match start tag e.g., <tag> or <tag attr="value">
-                        start_tag_pattern = rf"<{re.escape(start_tag)}(\s.*?)?>"
-                        match = re.search(start_tag_pattern, content)
-                        if match:
-                            attr_content = (
-                                match.group(1) if match.group(1) else ""
-                            )  # Ensure it's not None
-                            attributes = extract_attributes(
-                                attr_content
-                            )  # Extract attributes safely
-
-                            # Capture everything before and after the matched tag
-                            before_tag = content[
-                                : match.start()
-                            ]  # Content before opening tag
-                            after_tag = content[
-                                match.end() :
-                            ]  # Content after opening tag
-
-                            # Remove the start tag and after from the currently handling text block
-                            content_blocks[-1]["content"] = content_blocks[-1][
-                                "content"
-                            ].replace(match.group(0) + after_tag, "")
-
-                            if before_tag:
-                                content_blocks[-1]["content"] = before_tag
-
-                            if not content_blocks[-1]["content"]:
-                                content_blocks.pop()
-
-                            # Append the new block
-                            content_blocks.append(
-                                {
-                                    "type": content_type,
-                                    "start_tag": start_tag,
-                                    "end_tag": end_tag,
-                                    "attributes": attributes,
-                                    "content": "",
-                                    "started_at": time.time(),
-                                }
-                            )
-
-                            if after_tag:
-                                content_blocks[-1]["content"] = after_tag
-                                tag_content_handler(
-                                    content_type, tags, after_tag, content_blocks
-                                )
-
-                            break
-                elif content_blocks[-1]["type"] == content_type:
-                    start_tag = content_blocks[-1]["start_tag"]
-                    end_tag = content_blocks[-1]["end_tag"]
-                    # Match end tag e.g., </tag>
-                    end_tag_pattern = rf"<{re.escape(end_tag)}>"
-
-                    # Check if the content has the end tag
-                    if re.search(end_tag_pattern, content):
-                        end_flag = True
-
-                        block_content = content_blocks[-1]["content"]
-                        # Strip start and end tags from the content
-                        start_tag_pattern = rf"<{re.escape(start_tag)}(.*?)>"
-                        block_content = re.sub(
-                            start_tag_pattern, "", block_content
-                        ).strip()
-
-                        end_tag_regex = re.compile(end_tag_pattern, re.DOTALL)
-                        split_content = end_tag_regex.split(block_content, maxsplit=1)
-
-                        # Content inside the tag
-                        block_content = (
-                            split_content[0].strip() if split_content else ""
-                        )
-
-                        # Leftover content (everything after `</tag>`)
-                        leftover_content = (
-                            split_content[1].strip() if len(split_content) > 1 else ""
-                        )
-
-                        if block_content:
-                            content_blocks[-1]["content"] = block_content
-                            content_blocks[-1]["ended_at"] = time.time()
-                            content_blocks[-1]["duration"] = int(
-                                content_blocks[-1]["ended_at"]
-                                - content_blocks[-1]["started_at"]
-                            )
-
-                            # Reset the content_blocks by appending a new text block
-                            if content_type != "code_interpreter":
-                                if leftover_content:
-
-                                    content_blocks.append(
-                                        {
-                                            "type": "text",
-                                            "content": leftover_content,
-                                        }
-                                    )
-                                else:
-                                    content_blocks.append(
-                                        {
-                                            "type": "text",
-                                            "content": "",
-                                        }
-                                    )
-
-                        else:
-                            # Remove the block if content is empty
-                            content_blocks.pop()
-
-                            if leftover_content:
-                                content_blocks.append(
-                                    {
-                                        "type": "text",
-                                        "content": leftover_content,
-                                    }
-                                )
-                            else:
-                                content_blocks.append(
-                                    {
-                                        "type": "text",
-                                        "content": "",
-                                    }
-                                )
-
-                        # Clean processed content
-                        content = re.sub(
-                            rf"<{re.escape(start_tag)}(.*?)>(.|\n)*?<{re.escape(end_tag)}>",
-                            "",
-                            content,
-                            flags=re.DOTALL,
-                        )
-
-                return content, content_blocks, end_flag
-
-            message = Chats.get_message_by_id_and_message_id(
+            message = message_buffer.get_message(
                 metadata["chat_id"], metadata["message_id"]
             )
 
@@ -1577,9 +1536,21 @@ async def process_chat_response(
 
             solution_tags = [("|begin_of_solution|", "|end_of_solution|")]
 
+            tag_parser = StreamingTagParser(
+                {
+                    **({"reasoning": reasoning_tags} if DETECT_REASONING else {}),
+                    **(
+                        {"code_interpreter": code_interpreter_tags}
+                        if DETECT_CODE_INTERPRETER
+                        else {}
+                    ),
+                    **({"solution": solution_tags} if DETECT_SOLUTION else {}),
+                }
+            )
+
             try:
                 for event in events:
-                    await event_emitter(
+                    await content_event_emitter(
                         {
                             "type": "chat:completion",
                             "data": event,
@@ -1587,7 +1558,7 @@ async def process_chat_response(
                     )
 
                     # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                    message_buffer.write(
                         metadata["chat_id"],
                         metadata["message_id"],
                         {
@@ -1596,7 +1567,6 @@ async def process_chat_response(
                     )
 
                 async def stream_body_handler(response):
-                    nonlocal content
                     nonlocal content_blocks
 
                     response_tool_calls = []
@@ -1629,11 +1599,11 @@ async def process_chat_response(
 
                             if data:
                                 if "event" in data:
-                                    await event_emitter(data.get("event", {}))
+                                    await content_event_emitter(data.get("event", {}))
 
                                 if "selected_model_id" in data:
                                     model_id = data["selected_model_id"]
-                                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                                    message_buffer.write(
                                         metadata["chat_id"],
                                         metadata["message_id"],
                                         {
@@ -1645,7 +1615,7 @@ async def process_chat_response(
                                     if not choices:
                                         error = data.get("error", {})
                                         if error:
-                                            await event_emitter(
+                                            await content_event_emitter(
                                                 {
                                                     "type": "chat:completion",
                                                     "data": {
@@ -1655,7 +1625,7 @@ async def process_chat_response(
                                             )
                                         usage = data.get("usage", {})
                                         if usage:
-                                            await event_emitter(
+                                            await content_event_emitter(
                                                 {
                                                     "type": "chat:completion",
                                                     "data": {
@@ -1782,55 +1752,15 @@ async def process_chat_response(
                                                 }
                                             )
 
-                                        content = f"{content}{value}"
-                                        if not content_blocks:
-                                            content_blocks.append(
-                                                {
-                                                    "type": "text",
-                                                    "content": "",
-                                                }
-                                            )
-
-                                        content_blocks[-1]["content"] = (
-                                            content_blocks[-1]["content"] + value
-                                        )
-
-                                        if DETECT_REASONING:
-                                            content, content_blocks, _ = (
-                                                tag_content_handler(
-                                                    "reasoning",
-                                                    reasoning_tags,
-                                                    content,
-                                                    content_blocks,
-                                                )
-                                            )
-
-                                        if DETECT_CODE_INTERPRETER:
-                                            content, content_blocks, end = (
-                                                tag_content_handler(
-                                                    "code_interpreter",
-                                                    code_interpreter_tags,
-                                                    content,
-                                                    content_blocks,
-                                                )
-                                            )
-
-                                            if end:
-                                                break
-
-                                        if DETECT_SOLUTION:
-                                            content, content_blocks, _ = (
-                                                tag_content_handler(
-                                                    "solution",
-                                                    solution_tags,
-                                                    content,
-                                                    content_blocks,
-                                                )
-                                            )
+                                        # Only the new value is parsed for
+                                        # tags, held back while incomplete
+                                        if tag_parser.feed(value, content_blocks):
+                                            break
 
                                         if ENABLE_REALTIME_CHAT_SAVE:
-                                            # Save message in the database
-                                            Chats.upsert_message_to_chat_by_id_and_message_id(
+                                            # Save message in the database,
+                                            # coalesced by the write buffer
+                                            message_buffer.update(
                                                 metadata["chat_id"],
                                                 metadata["message_id"],
                                                 {
@@ -1846,7 +1776,7 @@ async def process_chat_response(
                                                 ),
                                             }
 
-                                await event_emitter(
+                                await content_event_emitter(
                                     {
                                         "type": "chat:completion",
                                         "data": data,
@@ -1860,6 +1790,8 @@ async def process_chat_response(
                                 log.debug("Error: ", e)
                                 continue
 
+                    tag_parser.flush(content_blocks)
+
                     if content_blocks:
                         # Clean up the last text block
                         if content_blocks[-1]["type"] == "text":
@@ -1901,7 +1833,7 @@ async def process_chat_response(
                         }
                     )
 
-                    await event_emitter(
+                    await content_event_emitter(
                         {
                             "type": "chat:completion",
                             "data": {
@@ -1912,8 +1844,7 @@ async def process_chat_response(
 
                     tools = metadata.get("tools", {})
 
-                    results = []
-                    for tool_call in response_tool_calls:
+                    async def tool_call_handler(tool_call):
                         tool_call_id = tool_call.get("id", "")
                         tool_name = tool_call.get("function", {}).get("name", "")
 
@@ -1971,9 +1902,8 @@ async def process_chat_response(
                                     )
 
                                 else:
-                                    tool_function = tool["callable"]
-                                    tool_result = await tool_function(
-                                        **tool_function_params
+                                    tool_result = await call_tool_function(
+                                        tool, tool_function_params
                                     )
 
                             except Exception as e:
@@ -1992,17 +1922,23 @@ async def process_chat_response(
                         ):
                             tool_result = json.dumps(tool_result, indent=2)
 
-                        results.append(
-                            {
-                                "tool_call_id": tool_call_id,
-                                "content": tool_result,
-                                **(
-                                    {"files": tool_result_files}
-                                    if tool_result_files
-                                    else {}
-                                ),
-                            }
-                        )
+                        return {
+                            "tool_call_id": tool_call_id,
+                            "content": tool_result,
+                            **(
+                                {"files": tool_result_files}
+                                if tool_result_files
+                                else {}
+                            ),
+                        }
+
+                    # Independent tool calls run concurrently, results keep call order
+                    results = await gather_tool_calls(
+                        [
+                            tool_call_handler(tool_call)
+                            for tool_call in response_tool_calls
+                        ]
+                    )
 
                     content_blocks[-1]["results"] = results
 
@@ -2013,7 +1949,7 @@ async def process_chat_response(
                         }
                     )
 
-                    await event_emitter(
+                    await content_event_emitter(
                         {
                             "type": "chat:completion",
                             "data": {
@@ -2053,7 +1989,7 @@ async def process_chat_response(
                         content_blocks[-1]["type"] == "code_interpreter"
                         and retries < MAX_RETRIES
                     ):
-                        await event_emitter(
+                        await content_event_emitter(
                             {
                                 "type": "chat:completion",
                                 "data": {
@@ -2191,7 +2127,7 @@ async def process_chat_response(
                             }
                         )
 
-                        await event_emitter(
+                        await content_event_emitter(
                             {
                                 "type": "chat:completion",
                                 "data": {
@@ -2234,15 +2170,15 @@ async def process_chat_response(
                     "title": title,
                 }
 
-                if not ENABLE_REALTIME_CHAT_SAVE:
-                    # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        metadata["chat_id"],
-                        metadata["message_id"],
-                        {
-                            "content": serialize_content_blocks(content_blocks),
-                        },
-                    )
+                # Save message in the database, replacing what is still
+                # buffered from realtime saving
+                message_buffer.write(
+                    metadata["chat_id"],
+                    metadata["message_id"],
+                    {
+                        "content": serialize_content_blocks(content_blocks),
+                    },
+                )
 
                 # Send a webhook notification if the user is not active
                 if not get_active_status_by_user_id(user.id):
@@ -2260,7 +2196,7 @@ async def process_chat_response(
                             },
                         )
 
-                await event_emitter(
+                await content_event_emitter(
                     {
                         "type": "chat:completion",
                         "data": data,
@@ -2270,17 +2206,22 @@ async def process_chat_response(
                 await background_tasks_handler()
             except asyncio.CancelledError:
                 log.warning("Task was cancelled!")
-                await event_emitter({"type": "task-cancelled"})
+                await content_event_emitter({"type": "task-cancelled"})
 
                 if not ENABLE_REALTIME_CHAT_SAVE:
                     # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                    message_buffer.write(
                         metadata["chat_id"],
                         metadata["message_id"],
                         {
                             "content": serialize_content_blocks(content_blocks),
                         },
                     )
+            finally:
+                # Write what is still buffered, also if the response failed,
+                # and fold the written message rows back into the chat
+                message_buffer.flush(metadata["chat_id"], metadata["message_id"])
+                Chats.compact_messages_by_chat_id(metadata["chat_id"])
 
             if response.background is not None:
                 await response.background()
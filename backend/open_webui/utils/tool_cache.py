@@ -0,0 +1,342 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    TOOL_RESULT_CACHE_DIR,
+    TOOL_RESULT_CACHE_ENABLED,
+    TOOL_RESULT_CACHE_EXCLUDED_TOOLS,
+    TOOL_RESULT_CACHE_INCLUDED_TOOLS,
+    TOOL_RESULT_CACHE_MAX_SIZE,
+)
+from open_webui.models.files import Files
+from open_webui.utils.tool_jobs import BIO_TOOLS_WORKING_DIR
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+FILE_ID_PATTERN = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
+)
+HASH_CHUNK_SIZE = 1024 * 1024
+FILE_HASH_MEMO_SIZE = 10000
+
+
+def normalize_tool_kwargs(func: Callable, kwargs: dict) -> dict:
+    """Fill in defaults, so omitting an argument and passing its default match"""
+    try:
+        bound = inspect.signature(func).bind_partial(**kwargs)
+        bound.apply_defaults()
+        return dict(bound.arguments)
+    except (TypeError, ValueError):
+        return dict(kwargs)
+
+
+class ToolResultCache:
+    """
+    Disk cache for results of deterministic tool calls.
+
+    Keys are derived from the tool name, its normalized arguments and the
+    content hash of every input file they reference, either by path or by
+    the id of an uploaded file. Results are stored as JSON files and the
+    least recently used ones are evicted above `max_size` bytes.
+
+    Caching is opt-in: a hit doesn't run the tool, so output files it
+    would write are not written again. Only pure tools, with a
+    `cache = True` attribute or listed in `TOOL_RESULT_CACHE_INCLUDED_TOOLS`,
+    are cached, unless listed in `TOOL_RESULT_CACHE_EXCLUDED_TOOLS`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_size: int,
+        enabled: bool = True,
+        included_tools: Optional[list] = None,
+        excluded_tools: Optional[list] = None,
+        working_dir: Optional[str] = None,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.enabled = enabled
+        self.included_tools = set(included_tools or [])
+        self.excluded_tools = set(excluded_tools or [])
+        self.working_dir = working_dir
+
+        # key -> size in bytes, least recently used first
+        self._entries: Optional[OrderedDict] = None
+        self._size = 0
+        self._lock = threading.Lock()
+        # (path, size, mtime) -> content hash
+        self._file_hashes: Dict[Tuple[str, int, int], str] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load_entries()
+            entries, size = len(self._entries), self._size
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size": size,
+            "max_size": self.max_size,
+        }
+
+    def is_cacheable(self, name: str, func: Optional[Callable]) -> bool:
+        return (
+            self.enabled
+            and self.max_size > 0
+            and name not in self.excluded_tools
+            and (name in self.included_tools or getattr(func, "cache", False) is True)
+        )
+
+    async def call(
+        self,
+        name: str,
+        func: Callable,
+        kwargs: dict,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Return the cached result of `name(**kwargs)`, or await `call()` and
+        cache what it returns. Identical calls in flight share one run.
+        """
+        if not self.is_cacheable(name, func):
+            return await call()
+
+        try:
+            key = await asyncio.to_thread(self.get_key, name, func, kwargs)
+        except Exception as e:
+            log.warning(f"Unable to compute cache key for tool {name}: {e}")
+            return await call()
+
+        hit, value = await asyncio.to_thread(self.get, key)
+        if hit:
+            self.hits += 1
+            log.info(f"Tool result cache hit for {name}")
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+            # The shared run was stopped, run it for this caller instead
+            return await call()
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it, nobody else has to retrieve it
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(value)
+        if self._is_success(value):
+            await asyncio.to_thread(self.set, key, value)
+        return value
+
+    def get_key(self, name: str, func: Callable, kwargs: dict) -> str:
+        arguments = normalize_tool_kwargs(func, kwargs)
+        payload = json.dumps(
+            {
+                "tool": name,
+                "arguments": arguments,
+                "inputs": self._hash_inputs(arguments),
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        path = self._path(key)
+        with self._lock:
+            self._load_entries()
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+
+        try:
+            with open(path, "r") as f:
+                value = json.load(f)
+            os.utime(path)
+            return True, value
+        except (OSError, ValueError) as e:
+            log.warning(f"Dropping unreadable tool result cache entry {key}: {e}")
+            self._remove(key)
+            return False, None
+
+    def set(self, key: str, value: Any):
+        try:
+            data = json.dumps(value)
+        except (TypeError, ValueError):
+            # Only JSON results are cached
+            return
+
+        size = len(data.encode("utf-8"))
+        if size > self.max_size:
+            return
+
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning(f"Unable to write tool result cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            self._load_entries()
+            self._size += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            evicted = []
+            while self._size > self.max_size and self._entries:
+                old_key, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                evicted.append(old_key)
+
+        for old_key in evicted:
+            self.evictions += 1
+            try:
+                self._path(old_key).unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._load_entries()
+            keys = list(self._entries)
+        for key in keys:
+            self._remove(key)
+
+    def _remove(self, key: str):
+        with self._lock:
+            if self._entries is not None and key in self._entries:
+                self._size -= self._entries.pop(key)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _load_entries(self):
+        """Build the LRU index from the cache directory, on first use"""
+        if self._entries is not None:
+            return
+
+        self._entries = OrderedDict()
+        self._size = 0
+        if not self.cache_dir.is_dir():
+            return
+
+        files = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+
+    @staticmethod
+    def _is_success(value: Any) -> bool:
+        if isinstance(value, dict):
+            if value.get("success") is False:
+                return False
+            if value.get("returncode") not in (None, 0):
+                return False
+        return True
+
+    def _hash_inputs(self, value: Any) -> Any:
+        """Content hashes of the input files referenced by the arguments"""
+        if isinstance(value, dict):
+            hashes = {k: self._hash_inputs(v) for k, v in value.items()}
+            return {k: v for k, v in hashes.items() if v}
+        if isinstance(value, (list, tuple)):
+            hashes = [self._hash_inputs(v) for v in value]
+            return hashes if any(hashes) else None
+        if isinstance(value, str):
+            return self._hash_input(value)
+        return None
+
+    def _hash_input(self, value: str) -> Optional[str]:
+        if FILE_ID_PATTERN.match(value):
+            file = Files.get_file_by_id(value)
+            if file and file.hash:
+                return file.hash
+
+        if len(value) > 4096 or "\n" in value:
+            return None
+
+        path = Path(value)
+        if not path.is_absolute() and self.working_dir:
+            path = Path(self.working_dir) / path
+        try:
+            if not path.is_file():
+                return None
+            stat = path.stat()
+        except (OSError, ValueError):
+            return None
+
+        memo_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+        file_hash = self._file_hashes.get(memo_key)
+        if file_hash is None:
+            sha256 = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+            file_hash = sha256.hexdigest()
+            if len(self._file_hashes) >= FILE_HASH_MEMO_SIZE:
+                self._file_hashes.clear()
+            self._file_hashes[memo_key] = file_hash
+        return file_hash
+
+
+tool_result_cache = ToolResultCache(
+    TOOL_RESULT_CACHE_DIR,
+    TOOL_RESULT_CACHE_MAX_SIZE,
+    enabled=TOOL_RESULT_CACHE_ENABLED,
+    included_tools=TOOL_RESULT_CACHE_INCLUDED_TOOLS,
+    excluded_tools=TOOL_RESULT_CACHE_EXCLUDED_TOOLS,
+    working_dir=BIO_TOOLS_WORKING_DIR,
+)
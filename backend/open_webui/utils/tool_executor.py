@@ -0,0 +1,282 @@
+import asyncio
+import inspect
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from open_webui.env import SRC_LOG_LEVELS, BIO_TOOL_EXECUTOR_MAX_WORKERS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+def _forward_output(fd: int, conn) -> None:
+    with os.fdopen(fd, "r", errors="replace") as stream:
+        for line in stream:
+            try:
+                conn.send(line.rstrip("\n"))
+            except OSError:
+                break
+    conn.close()
+
+
+def _redirect_output(output_conn) -> threading.Thread:
+    """Send every line the tool (or its subprocesses) prints to `output_conn`"""
+    read_fd, write_fd = os.pipe()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(write_fd, 1)
+    os.dup2(write_fd, 2)
+    os.close(write_fd)
+    sys.stdout = open(1, "w", buffering=1, closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+    thread = threading.Thread(
+        target=_forward_output, args=(read_fd, output_conn), daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def _close_output(thread: threading.Thread) -> None:
+    sys.stdout.flush()
+    sys.stderr.flush()
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    os.close(devnull)
+    # Background subprocesses may still hold the pipe open
+    thread.join(5)
+
+
+def _call(func: Callable, kwargs: dict) -> Any:
+    """Call `func`, running it on a new event loop if it is a coroutine function"""
+    result = func(**kwargs)
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return result
+
+
+def _run_in_process(
+    func: Callable, kwargs: dict, cwd: Optional[str], conn, output_conn=None
+) -> None:
+    """Worker process entry point, sends (ok, result or exception) back"""
+    if hasattr(os, "setsid"):
+        # Own process group, so cancelling also stops the tool's subprocesses
+        os.setsid()
+
+    output_thread = _redirect_output(output_conn) if output_conn else None
+    try:
+        if cwd:
+            os.chdir(cwd)
+        ok, value = True, _call(func, kwargs)
+    except BaseException as e:
+        ok, value = False, e
+
+    if output_thread:
+        _close_output(output_thread)
+
+    try:
+        conn.send((ok, value))
+    except Exception as e:
+        # The result or exception could not be pickled
+        conn.send((False, RuntimeError(f"Unable to return tool result: {e}")))
+    finally:
+        conn.close()
+
+
+class ToolExecutor:
+    """
+    Runs tool functions off the event loop, coroutine functions on an event
+    loop of their own.
+
+    Every call gets its own worker process (at most `max_workers` at once,
+    the rest wait in a queue) with its own working directory, so tools never
+    change the server's cwd. Cancelling the awaiting task, e.g. through
+    `tasks.stop_task`, kills the worker's process group. With `on_output`,
+    every line the worker writes to stdout or stderr is passed to it.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._context = multiprocessing.get_context(
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else "spawn"
+        )
+        # Fallback for callables that cannot be sent to a worker process
+        self._thread_executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tool_executor"
+        )
+        self._chdir_lock = threading.Lock()
+        self._processes = set()
+
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+        }
+
+    async def run(
+        self,
+        func: Callable,
+        kwargs: dict,
+        cwd: Optional[str] = None,
+        on_output: Optional[Callable[[str], None]] = None,
+    ) -> Any:
+        """Call `func(**kwargs)` in a worker and return its result"""
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.running += 1
+        try:
+            result = await self._run(func, kwargs, cwd, on_output)
+            self.completed += 1
+            return result
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+    async def _run(
+        self,
+        func: Callable,
+        kwargs: dict,
+        cwd: Optional[str],
+        on_output: Optional[Callable[[str], None]],
+    ) -> Any:
+        parent_conn, child_conn = self._context.Pipe(duplex=False)
+        output_conn, child_output_conn = (
+            self._context.Pipe(duplex=False) if on_output else (None, None)
+        )
+        process = self._context.Process(
+            target=_run_in_process,
+            args=(func, kwargs, cwd, child_conn, child_output_conn),
+            daemon=True,
+        )
+        try:
+            process.start()
+        except Exception as e:
+            for conn in (parent_conn, child_conn, output_conn, child_output_conn):
+                if conn:
+                    conn.close()
+            log.warning(
+                f"Running {getattr(func, '__name__', func)} in a thread, "
+                f"it cannot be sent to a worker process: {e}"
+            )
+            return await asyncio.get_running_loop().run_in_executor(
+                self._thread_executor, self._run_in_thread, func, kwargs, cwd
+            )
+        child_conn.close()
+        self._processes.add(process)
+
+        output_task = None
+        if output_conn:
+            child_output_conn.close()
+            output_task = asyncio.create_task(self._read_output(output_conn, on_output))
+
+        try:
+            ok, value = await self._receive(parent_conn)
+            if output_task:
+                # The worker has flushed its output before sending the result
+                await asyncio.wait({output_task}, timeout=5)
+        except EOFError:
+            await asyncio.to_thread(process.join, 5)
+            raise RuntimeError(f"Tool process exited with code {process.exitcode}")
+        except asyncio.CancelledError:
+            self._kill(process)
+            raise
+        finally:
+            if output_task and not output_task.done():
+                output_task.cancel()
+            parent_conn.close()
+            self._processes.discard(process)
+            asyncio.get_running_loop().run_in_executor(None, process.join, 5)
+
+        if not ok:
+            raise value
+        return value
+
+    async def _receive(self, conn) -> Any:
+        if sys.platform == "win32":
+            return await asyncio.to_thread(conn.recv)
+
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = conn.fileno()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            loop.remove_reader(fd)
+        return conn.recv()
+
+    async def _read_output(self, conn, on_output: Callable[[str], None]) -> None:
+        try:
+            while True:
+                try:
+                    line = await self._receive(conn)
+                except (EOFError, OSError):
+                    return
+                try:
+                    on_output(line)
+                except Exception as e:
+                    log.warning(f"Tool output callback failed: {e}")
+        finally:
+            conn.close()
+
+    def _run_in_thread(self, func: Callable, kwargs: dict, cwd: Optional[str]) -> Any:
+        if not cwd:
+            return _call(func, kwargs)
+
+        # The working directory is process-wide, so these calls are serialized
+        with self._chdir_lock:
+            current_dir = os.getcwd()
+            os.chdir(cwd)
+            try:
+                return _call(func, kwargs)
+            finally:
+                os.chdir(current_dir)
+
+    @staticmethod
+    def _kill(process) -> None:
+        log.info(f"Killing tool process {process.pid}")
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+                return
+        except (ProcessLookupError, PermissionError):
+            pass
+        process.kill()
+
+    def shutdown(self) -> None:
+        for process in list(self._processes):
+            self._kill(process)
+        self._thread_executor.shutdown(wait=False, cancel_futures=True)
+
+
+tool_executor = ToolExecutor(BIO_TOOL_EXECUTOR_MAX_WORKERS)
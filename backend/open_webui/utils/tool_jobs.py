@@ -0,0 +1,331 @@
+import asyncio
+import html
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    TOOL_JOB_HEARTBEAT_INTERVAL,
+    TOOL_JOB_PROGRESS_INTERVAL,
+)
+from open_webui.models.tool_jobs import (
+    TOOL_JOB_PENDING_STATUSES,
+    ToolJobForm,
+    ToolJobModel,
+    ToolJobs,
+)
+from open_webui.socket.main import get_event_emitter
+from open_webui.utils.tool_executor import tool_executor
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+# Project root directory where bioinformatics_mcp is located
+BIO_TOOLS_WORKING_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+
+def serialize_tool_result(name: str, result: Any) -> Any:
+    """Turn a tool result into something that can be stored as JSON"""
+    # Return subprocess result info for AI agent
+    if hasattr(result, "returncode"):
+        result = {
+            "tool": name,
+            "returncode": result.returncode,
+            "success": result.returncode == 0,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "command_args": getattr(result, "args", []),
+        }
+    return json.loads(json.dumps(result, default=str))
+
+
+class ToolJobManager:
+    """
+    Runs bioinformatics tools as jobs persisted in the `tool_job` table.
+
+    Lines printed by a running tool are sent to its chat message as status
+    events. Jobs keep a heartbeat on their row; pending jobs whose owner
+    stopped (e.g. the server restarted) are picked up again by any worker
+    and their result is appended to the chat message they belong to.
+    """
+
+    def __init__(
+        self,
+        working_dir: str,
+        progress_interval: float = 1.0,
+        heartbeat_interval: int = 30,
+    ):
+        self.working_dir = working_dir
+        self.progress_interval = progress_interval
+        self.heartbeat_interval = heartbeat_interval
+
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._recovery_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def start(self):
+        self._closed = False
+        if self._recovery_task is None or self._recovery_task.done():
+            self._recovery_task = asyncio.create_task(self._recover())
+
+    async def shutdown(self):
+        """
+        Stop without cancelling the jobs in the database, they are picked up
+        again after the restart
+        """
+        self._closed = True
+        tasks = [self._recovery_task, *self._tasks.values()]
+        for task in tasks:
+            if task and not task.done():
+                task.cancel()
+        await asyncio.gather(*[task for task in tasks if task], return_exceptions=True)
+
+    def submit(
+        self,
+        func: Callable,
+        tool_name: str,
+        params: dict,
+        user_id: str,
+        metadata: Optional[dict] = None,
+    ) -> ToolJobModel:
+        metadata = metadata or {}
+        job = ToolJobs.insert_new_job(
+            user_id,
+            ToolJobForm(
+                tool_name=tool_name,
+                params=json.loads(json.dumps(params, default=str)),
+                chat_id=metadata.get("chat_id"),
+                message_id=metadata.get("message_id"),
+            ),
+        )
+        if job is None:
+            raise RuntimeError(f"Unable to create a job for tool {tool_name}")
+
+        self._start(job, func, params, metadata.get("session_id"))
+        return job
+
+    async def wait(self, job_id: str) -> Any:
+        """
+        Wait for a job and return its result. Cancelling the waiter cancels
+        the job.
+        """
+        task = self._tasks.get(job_id)
+        if task is not None:
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            if task.cancelled():
+                raise RuntimeError(f"Tool job {job_id} was cancelled")
+            return task.result()
+
+        job = ToolJobs.get_job_by_id(job_id)
+        if job is None:
+            raise ValueError(f"Tool job {job_id} not found")
+        if job.status == "completed":
+            return job.result
+        raise RuntimeError(job.error or f"Tool job {job_id} is {job.status}")
+
+    def cancel(self, job_id: str) -> bool:
+        job = ToolJobs.get_job_by_id(job_id)
+        if job is None or job.status not in TOOL_JOB_PENDING_STATUSES:
+            return False
+
+        ToolJobs.update_job_by_id(job_id, {"status": "cancelled"})
+        # Jobs owned by another worker notice this on their next heartbeat
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        return True
+
+    def _start(
+        self,
+        job: ToolJobModel,
+        func: Callable,
+        params: dict,
+        session_id: Optional[str] = None,
+        resumed: bool = False,
+    ) -> asyncio.Task:
+        task = asyncio.create_task(self._run(job, func, params, session_id, resumed))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return task
+
+    async def _run(
+        self,
+        job: ToolJobModel,
+        func: Callable,
+        params: dict,
+        session_id: Optional[str],
+        resumed: bool,
+    ) -> Any:
+        request_info = {
+            "user_id": job.user_id,
+            "chat_id": job.chat_id,
+            "message_id": job.message_id,
+            "session_id": session_id,
+        }
+        has_message = job.chat_id and job.message_id
+        event_emitter = get_event_emitter(request_info) if has_message else None
+        progress_emitter = (
+            get_event_emitter(request_info, update_db=False) if has_message else None
+        )
+
+        output = {"line": None}
+
+        def on_output(line: str):
+            if line.strip():
+                output["line"] = line.strip()
+
+        ToolJobs.update_job_by_id(job.id, {"status": "running"})
+        reporter = asyncio.create_task(
+            self._report_progress(job, output, progress_emitter)
+        )
+        try:
+            # Tools shell out to long pipelines, run them in a worker process
+            # that has its own working directory, the project root where
+            # bioinformatics_mcp is located, so the server's cwd never changes
+            result = await tool_executor.run(
+                func, params, cwd=self.working_dir, on_output=on_output
+            )
+            result = serialize_tool_result(job.tool_name, result)
+        except asyncio.CancelledError:
+            if not self._closed:
+                ToolJobs.update_job_by_id(job.id, {"status": "cancelled"})
+            raise
+        except Exception as e:
+            ToolJobs.update_job_by_id(job.id, {"status": "failed", "error": str(e)})
+            await self._emit_status(event_emitter, job, f"{job.tool_name} failed")
+            raise
+        finally:
+            reporter.cancel()
+
+        ToolJobs.update_job_by_id(
+            job.id,
+            {"status": "completed", "result": result, "progress": output["line"]},
+        )
+        await self._emit_status(event_emitter, job, f"{job.tool_name} completed")
+
+        if resumed and event_emitter:
+            # The completion that started this job is gone, attach the result
+            # to its message the way executed tool calls are rendered
+            await event_emitter(
+                {
+                    "type": "message",
+                    "data": {
+                        "content": f'\n<details type="tool_calls" done="true" id="{job.id}" name="{job.tool_name}" arguments="{html.escape(json.dumps(params))}" result="{html.escape(json.dumps(result))}" files="">\n<summary>Tool Executed</summary>\n</details>\n'
+                    },
+                }
+            )
+        return result
+
+    async def _report_progress(
+        self, job: ToolJobModel, output: dict, event_emitter: Optional[Callable]
+    ):
+        last_line = None
+        last_heartbeat = time.monotonic()
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            try:
+                line = output["line"]
+                if line != last_line and event_emitter:
+                    last_line = line
+                    await event_emitter(
+                        {
+                            "type": "status",
+                            "data": {
+                                "action": "tool_job",
+                                "job_id": job.id,
+                                "description": f"{job.tool_name}: {line}",
+                                "done": False,
+                            },
+                        }
+                    )
+
+                if time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                    last_heartbeat = time.monotonic()
+                    current = ToolJobs.update_job_by_id(job.id, {"progress": line})
+                    if current and current.status == "cancelled":
+                        log.info(f"Tool job {job.id} was cancelled")
+                        task = self._tasks.get(job.id)
+                        if task is not None:
+                            task.cancel()
+            except Exception as e:
+                log.warning(f"Failed to report progress of tool job {job.id}: {e}")
+
+    @staticmethod
+    async def _emit_status(
+        event_emitter: Optional[Callable], job: ToolJobModel, description: str
+    ):
+        if not event_emitter:
+            return
+        try:
+            await event_emitter(
+                {
+                    "type": "status",
+                    "data": {
+                        "action": "tool_job",
+                        "job_id": job.id,
+                        "description": description,
+                        "done": True,
+                    },
+                }
+            )
+        except Exception as e:
+            log.warning(f"Failed to emit status of tool job {job.id}: {e}")
+
+    async def _recover(self):
+        while True:
+            try:
+                self.resume_stale_jobs()
+            except Exception as e:
+                log.error(f"Tool job recovery failed: {e}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def resume_stale_jobs(self):
+        from open_webui.utils.tools_manager import tools_manager
+
+        stale_jobs = ToolJobs.get_stale_pending_jobs(
+            int(time.time()) - 2 * self.heartbeat_interval
+        )
+        for job in stale_jobs:
+            if job.id in self._tasks:
+                continue
+
+            func = tools_manager.get_tool(job.tool_name)
+            if func is None:
+                ToolJobs.update_job_by_id(
+                    job.id,
+                    {
+                        "status": "failed",
+                        "error": f"Tool {job.tool_name} is no longer available",
+                    },
+                )
+                continue
+
+            job = ToolJobs.claim_job(job.id, job.updated_at)
+            if job is None:
+                # Another worker took it over
+                continue
+
+            log.info(f"Resuming tool job {job.id} ({job.tool_name})")
+            task = self._start(job, func, job.params or {}, resumed=True)
+            task.add_done_callback(self._log_resumed_result)
+
+    @staticmethod
+    def _log_resumed_result(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            log.error(f"Resumed tool job failed: {task.exception()}")
+
+
+tool_job_manager = ToolJobManager(
+    BIO_TOOLS_WORKING_DIR,
+    progress_interval=TOOL_JOB_PROGRESS_INTERVAL,
+    heartbeat_interval=TOOL_JOB_HEARTBEAT_INTERVAL,
+)
@@ -4,7 +4,6 @@ import logging
 import re
 import aiohttp
 import yaml
-import os
 
 from pydantic import BaseModel
 from typing import (
@@ -26,13 +25,17 @@ from langchain_core.utils.function_calling import (
     convert_to_openai_function as convert_pydantic_model_to_openai_function_spec,
 )
 
-from open_webui.models.tools import Tools
+from open_webui.models.tools import ToolModel, Tools
 from open_webui.models.users import UserModel
 from open_webui.utils.plugin import load_tool_module_by_id
+from open_webui.utils.tool_cache import tool_result_cache
+from open_webui.utils.tool_jobs import tool_job_manager
 from open_webui.env import (
     SRC_LOG_LEVELS,
     AIOHTTP_CLIENT_TIMEOUT_TOOL_SERVER_DATA,
     AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL,
+    TOOL_CALL_CONCURRENCY,
+    TOOL_CALL_TIMEOUT,
 )
 
 import copy
@@ -60,6 +63,83 @@ def get_async_tool_function_and_apply_extra_params(
         return new_function
 
 
+async def call_tool_function(tool: dict, params: dict) -> Any:
+    """
+    Await a tool's callable, bounded by the tool's `timeout` metadata or
+    TOOL_CALL_TIMEOUT.
+    """
+    timeout = tool.get("metadata", {}).get("timeout") or TOOL_CALL_TIMEOUT
+    if not timeout:
+        return await tool["callable"](**params)
+
+    try:
+        return await asyncio.wait_for(tool["callable"](**params), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Tool call timed out after {timeout} seconds")
+
+
+async def gather_tool_calls(
+    coroutines: list[Awaitable], concurrency: int = TOOL_CALL_CONCURRENCY
+) -> list:
+    """
+    Await tool call coroutines concurrently, at most `concurrency` at a time,
+    and return their results in call order.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*[run(coroutine) for coroutine in coroutines])
+
+
+# tool id -> (updated_at, module, specs) of plugin tools
+TOOL_SPECS_CACHE: dict[str, tuple[int, object, list[dict]]] = {}
+
+
+def get_cached_tool_specs(tool: ToolModel, module: object) -> list[dict]:
+    """
+    Specs of a plugin tool as sent to the model, rebuilt only when the tool
+    or its module changed. The returned specs are shared, do not modify them.
+    """
+    cached = TOOL_SPECS_CACHE.get(tool.id)
+    if cached and cached[0] == tool.updated_at and cached[1] is module:
+        return cached[2]
+
+    specs = []
+    for spec in copy.deepcopy(tool.specs):
+        # TODO: Fix hack for OpenAI API
+        # Some times breaks OpenAI but others don't. Leaving the comment
+        for val in spec.get("parameters", {}).get("properties", {}).values():
+            if val["type"] == "str":
+                val["type"] = "string"
+
+        # Remove internal reserved parameters (e.g. __id__, __user__)
+        spec["parameters"]["properties"] = {
+            key: val
+            for key, val in spec["parameters"]["properties"].items()
+            if not key.startswith("__")
+        }
+
+        # TODO: Support Pydantic models as parameters
+        tool_function = getattr(module, spec["name"])
+        if tool_function.__doc__ and tool_function.__doc__.strip() != "":
+            s = re.split(":(param|return)", tool_function.__doc__, 1)
+            spec["description"] = s[0]
+        else:
+            spec["description"] = spec["name"]
+
+        specs.append(spec)
+
+    TOOL_SPECS_CACHE[tool.id] = (tool.updated_at, module, specs)
+    return specs
+
+
+def invalidate_tool_specs(tool_id: str):
+    TOOL_SPECS_CACHE.pop(tool_id, None)
+
+
 def get_tools(
     request: Request, tool_ids: list[str], user: UserModel, extra_params: dict
 ) -> dict[str, dict]:
@@ -75,31 +155,7 @@ def get_tools(
 
                 tool_function = tools_manager.get_tool(tool_name)
                 if tool_function:
-                    # Get the proper spec from the function signature
-                    try:
-                        pydantic_model = convert_function_to_pydantic_model(
-                            tool_function
-                        )
-                        spec = convert_pydantic_model_to_openai_function_spec(
-                            pydantic_model
-                        )
-                        # Override the name to match the tool_name
-                        spec["name"] = tool_name
-                    except Exception as e:
-                        log.error(
-                            f"Error creating spec for bioinformatics tool "
-                            f"{tool_name}: {str(e)}"
-                        )
-                        # Fallback to basic spec
-                        spec = {
-                            "name": tool_name,
-                            "description": f"Bioinformatics tool: {tool_name}",
-                            "parameters": {
-                                "type": "object",
-                                "properties": {},
-                                "required": [],
-                            },
-                        }
+                    spec = tools_manager.get_tool_spec(tool_name)
 
                     def make_bio_tool_function(func, name):
                         async def bio_tool_function(**kwargs):
@@ -109,47 +165,33 @@ def get_tools(
                                     f"with params: {kwargs}"
                                 )
 
-                                # Change to the project root directory where
-                                # bioinformatics_mcp is located
-                                current_dir = os.getcwd()
-                                project_root = os.path.dirname(
-                                    os.path.dirname(
-                                        os.path.dirname(os.path.dirname(__file__))
-                                    )
-                                )
-                                os.chdir(project_root)
-
-                                try:
-                                    # Ensure we're calling with keyword arguments
-                                    if hasattr(func, "__call__"):
-                                        if asyncio.iscoroutinefunction(func):
-                                            result = await func(**kwargs)
-                                        else:
-                                            result = func(**kwargs)
-                                        log.info(f"Tool {name} executed successfully")
-
-                                        # Return subprocess result info for AI agent
-                                        if hasattr(result, "returncode"):
-                                            result_info = {
-                                                "tool": name,
-                                                "returncode": result.returncode,
-                                                "success": result.returncode == 0,
-                                                "stdout": result.stdout,
-                                                "stderr": result.stderr,
-                                                "command_args": getattr(
-                                                    result, "args", []
-                                                ),
-                                            }
-                                            return result_info
-
-                                        return result
-                                    else:
-                                        return await tools_manager.execute_tool(
-                                            name, **kwargs
+                                # Ensure we're calling with keyword arguments
+                                if hasattr(func, "__call__"):
+
+                                    async def run_job():
+                                        # Long pipelines run as persisted jobs
+                                        # that report their output and survive
+                                        # restarts
+                                        job = tool_job_manager.submit(
+                                            func,
+                                            name,
+                                            kwargs,
+                                            user_id=user.id,
+                                            metadata=extra_params.get("__metadata__"),
                                         )
-                                finally:
-                                    # Always restore the original directory
-                                    os.chdir(current_dir)
+                                        return await tool_job_manager.wait(job.id)
+
+                                    # Repeated calls of pure tools on the same
+                                    # inputs are answered from the result cache
+                                    result = await tool_result_cache.call(
+                                        name, func, kwargs, run_job
+                                    )
+                                    log.info(f"Tool {name} executed successfully")
+                                    return result
+                                else:
+                                    return await tools_manager.execute_tool(
+                                        name, **kwargs
+                                    )
                             except Exception as e:
                                 log.error(
                                     f"Error executing bioinformatics tool "
@@ -251,20 +293,7 @@ def get_tools(
                     **Tools.get_user_valves_by_id_and_user_id(tool_id, user.id)
                 )
 
-            for spec in tool.specs:
-                # TODO: Fix hack for OpenAI API
-                # Some times breaks OpenAI but others don't. Leaving the comment
-                for val in spec.get("parameters", {}).get("properties", {}).values():
-                    if val["type"] == "str":
-                        val["type"] = "string"
-
-                # Remove internal reserved parameters (e.g. __id__, __user__)
-                spec["parameters"]["properties"] = {
-                    key: val
-                    for key, val in spec["parameters"]["properties"].items()
-                    if not key.startswith("__")
-                }
-
+            for spec in get_cached_tool_specs(tool, module):
                 # convert to function that takes only model params and inserts custom params
                 function_name = spec["name"]
                 tool_function = getattr(module, function_name)
@@ -272,13 +301,6 @@ def get_tools(
                     tool_function, extra_params
                 )
 
-                # TODO: Support Pydantic models as parameters
-                if callable.__doc__ and callable.__doc__.strip() != "":
-                    s = re.split(":(param|return)", callable.__doc__, 1)
-                    spec["description"] = s[0]
-                else:
-                    spec["description"] = function_name
-
                 tool_dict = {
                     "tool_id": tool_id,
                     "callable": callable,
@@ -288,6 +310,7 @@ def get_tools(
                         "file_handler": hasattr(module, "file_handler")
                         and module.file_handler,
                         "citation": hasattr(module, "citation") and module.citation,
+                        "timeout": getattr(module, "timeout", None),
                     },
                 }
 
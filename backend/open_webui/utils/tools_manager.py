@@ -1,5 +1,6 @@
+import inspect
 import logging
-from typing import List, Dict, Callable, Any
+from typing import List, Dict, Callable, Any, Optional
 
 
 class ToolsManager:
@@ -7,22 +8,68 @@ class ToolsManager:
         self._tools: Dict[str, Callable] = {}
         # Don't initialize tools in constructor
         self._tools = {}
+        # OpenAI function specs, built once per tool
+        self._specs: Dict[str, dict] = {}
 
     def _initialize_tools(self, tool_functions):
         """Initialize all tools from the provided tool functions"""
         for tool in tool_functions:
             self.add_tool(tool["function"], name=tool["name"])
 
+        # Build the specs up front instead of on the first chat requests
+        for name in self._tools:
+            self.get_tool_spec(name)
+
     def add_tool(self, tool_function: Callable, name: str = None):
         """Add a tool to the manager"""
         if name is None:
             name = tool_function.__name__
         self._tools[name] = tool_function
+        self._specs.pop(name, None)
 
     def get_tool(self, name: str) -> Callable:
         """Get a tool by name"""
         return self._tools.get(name)
 
+    def get_tool_spec(self, name: str) -> Optional[dict]:
+        """Get the cached spec of a tool, shared between requests, do not modify"""
+        spec = self._specs.get(name)
+        if spec is None:
+            tool = self.get_tool(name)
+            if tool is None:
+                return None
+            spec = self._specs[name] = self._build_tool_spec(tool, name)
+        return spec
+
+    @staticmethod
+    def _build_tool_spec(tool: Callable, name: str) -> dict:
+        from open_webui.utils.tools import (
+            convert_function_to_pydantic_model,
+            convert_pydantic_model_to_openai_function_spec,
+        )
+
+        # Get the proper spec from the function signature
+        try:
+            pydantic_model = convert_function_to_pydantic_model(tool)
+            spec = convert_pydantic_model_to_openai_function_spec(pydantic_model)
+            # Override the name to match the tool_name
+            spec["name"] = name
+        except Exception as e:
+            logging.error(
+                f"Error creating spec for bioinformatics tool {name}: {str(e)}"
+            )
+            # Fallback to basic spec
+            spec = {
+                "name": name,
+                "description": f"Bioinformatics tool: {name}",
+                "parameters": {
+                    "type": "object",
+                    "properties": {},
+                    "required": [],
+                },
+            }
+        return spec
+
     def list_tools(self) -> List[str]:
         """List all available tools"""
         return list(self._tools.keys())
@@ -33,9 +80,18 @@ class ToolsManager:
         if tool is None:
             raise ValueError(f"Tool {tool_name} not found")
 
+        from open_webui.utils.tool_cache import tool_result_cache
+        from open_webui.utils.tool_executor import tool_executor
+
+        async def call():
+            if inspect.iscoroutinefunction(tool):
+                return await tool(**kwargs)
+
+            # Run synchronous tools in a worker process, off the event loop
+            return await tool_executor.run(tool, kwargs)
+
         try:
-            result = tool(**kwargs)
-            return result
+            return await tool_result_cache.call(tool_name, tool, kwargs, call)
         except Exception as e:
             logging.error(f"Error executing tool {tool_name}: {str(e)}")
             raise